@@ -17,6 +17,9 @@ external_stylesheets = [
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 server = app.server
 
+# Rows parsed locally for the preview table
+PREVIEW_ROWS = 50
+
 # ------------------------------------------------------------------------------
 # Layout
 # ------------------------------------------------------------------------------
@@ -98,16 +101,17 @@ async def update_validation(contents, filenames, pipeline):
     if not contents or not filenames:
         return "", "", ""
 
-    # Decode & read each file
+    # Decode each file; only the preview rows are parsed here, the full
+    # file is validated by the API
     dfs = {}
     for content, fname in zip(contents, filenames):
         header, data = content.split(",")
         raw = base64.b64decode(data)
         try:
             if fname.lower().endswith(".csv"):
-                df = pd.read_csv(io.BytesIO(raw))
+                df = pd.read_csv(io.BytesIO(raw), nrows=PREVIEW_ROWS)
             else:
-                df = pd.read_excel(io.BytesIO(raw))
+                df = pd.read_excel(io.BytesIO(raw), nrows=PREVIEW_ROWS)
         except Exception as e:
             alert = dbc.Alert(f"Error reading {fname}: {e}", color="danger")
             return alert, alert, ""
@@ -117,11 +121,11 @@ async def update_validation(contents, filenames, pipeline):
             key = "media" if dfs == {} else "sales"
         else:
             key = "data"
-        dfs[key] = (fname, raw)
+        dfs[key] = (fname, raw, df)
 
     # Prepare files for request
     files_payload = []
-    for key, (fname, raw) in dfs.items():
+    for key, (fname, raw, _) in dfs.items():
         files_payload.append(("files", (fname, raw, "text/csv")))
 
     data = {"pipeline": pipeline}
@@ -187,12 +191,12 @@ async def update_validation(contents, filenames, pipeline):
 
     # Build preview
     # show first loaded df
-    first_df = pd.read_csv(io.BytesIO(dfs[next(iter(dfs))][1])) if filenames[0].lower().endswith(".csv") else pd.read_excel(io.BytesIO(dfs[next(iter(dfs))][1]))
+    first_df = dfs[next(iter(dfs))][2]
     preview = html.Div([
         html.H5("Preview"),
         dash_table.DataTable(
             columns=[{"name": c, "id": c} for c in first_df.columns],
-            data=first_df.head(50).to_dict("records"),
+            data=first_df.to_dict("records"),
             page_size=10,
             style_table={"overflowX": "auto"},
         )
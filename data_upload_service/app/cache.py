@@ -0,0 +1,317 @@
+"""
+Local caches keyed by upload content.
+
+``FrameCache`` keeps parsed Excel uploads on disk in Arrow IPC (Feather)
+format, so re-uploading an identical workbook skips the slow XLSX parse.
+``ReportCache`` keeps finished validation reports, so identical requests
+are answered without validating again.
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from . import config
+from .validators.base import ValidationReport
+
+# Bump when the way uploads are parsed changes, to orphan old entries
+_FRAME_FORMAT = "1"
+
+
+def content_key(*parts: Any) -> str:
+    """Stable hex digest of ``parts`` (their ``repr``s)."""
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        h.update(repr(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class FrameCache:
+    """
+    Content-addressed, size-bounded on-disk cache of parsed uploads.
+
+    An entry is a directory with one Feather file per parsed chunk, so a
+    hit replays exactly the chunks a fresh parse would yield – with the
+    same bounded memory. Headers are cached alongside as small JSON files.
+    Entries are written to a temp name and renamed into place, so server
+    workers sharing the directory never see partial entries. The least
+    recently used entries are evicted once the cache exceeds ``max_bytes``.
+    """
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get_header(self, key: str) -> Optional[List[str]]:
+        path = self._path(key) + ".json"
+        try:
+            with open(path) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _touch(path)
+        return header
+
+    def put_header(self, key: str, header: List[str]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(header, f)
+            os.replace(tmp, self._path(key) + ".json")
+        except (OSError, TypeError, ValueError):
+            # best effort: e.g. column names JSON cannot hold
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+
+    def get(self, key: str) -> Optional[Iterator[pd.DataFrame]]:
+        """The cached chunks for ``key``, or None on a miss."""
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        _touch(path)
+        return self._replay(path, sorted(os.listdir(path)))
+
+    @staticmethod
+    def _replay(path: str, names: List[str]) -> Iterator[pd.DataFrame]:
+        for name in names:
+            yield pd.read_feather(os.path.join(path, name))
+
+    def store(self, key: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Pass ``chunks`` through while writing them to the cache. The entry
+        is committed only if every chunk was consumed and could be stored.
+        """
+        tmp = tempfile.mkdtemp(dir=self.directory, suffix=".tmp")
+        storing = True
+        try:
+            for i, chunk in enumerate(chunks):
+                if storing:
+                    try:
+                        chunk.to_feather(os.path.join(tmp, f"{i:08d}.feather"))
+                    except Exception:
+                        # e.g. mixed-type object columns Arrow cannot hold
+                        storing = False
+                yield chunk
+            if storing:
+                try:
+                    os.rename(tmp, self._path(key))
+                except OSError:
+                    pass  # another worker stored the same entry first
+                else:
+                    _evict_lru(self.directory, self.max_bytes)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _touch(path: str) -> None:
+    # mtime doubles as the last-used time for eviction
+    with contextlib.suppress(OSError):
+        os.utime(path)
+
+
+def _size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(e.stat().st_size for e in os.scandir(path))
+
+
+def _evict_lru(directory: str, max_bytes: int) -> None:
+    """Delete the least recently used entries of ``directory`` beyond ``max_bytes``."""
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(".tmp"):
+            continue
+        try:
+            entries.append((os.stat(path).st_mtime, _size(path), path))
+        except OSError:
+            continue
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        total -= size
+
+
+class ReportCache:
+    """
+    Two-tier cache of validation reports.
+
+    The first tier is an in-process LRU of serialised reports bounded by
+    ``max_bytes``. The optional second tier is a ``directory`` shared by
+    every server worker on the host, bounded by ``disk_max_bytes``. Disk
+    hits are promoted to memory. A ``max_bytes`` of 0 turns off both
+    tiers, so nothing is cached. Hit/miss counters are kept for
+    ``stats()``. On the event loop use ``get_async``/``put_async``, which
+    do the disk tier's file I/O on a worker thread.
+    """
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory if max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[ValidationReport]:
+        report = self._get_memory(key)
+        if report is not None:
+            return report
+        return self._promote(key, self._read_disk(key))
+
+    async def get_async(self, key: str) -> Optional[ValidationReport]:
+        report = self._get_memory(key)
+        if report is not None:
+            return report
+        blob = await asyncio.to_thread(self._read_disk, key) if self.directory else None
+        return self._promote(key, blob)
+
+    def put(self, key: str, report: ValidationReport) -> None:
+        self._write_disk(key, self._put_memory(key, report))
+
+    async def put_async(self, key: str, report: ValidationReport) -> None:
+        blob = self._put_memory(key, report)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, blob)
+
+    def _get_memory(self, key: str) -> Optional[ValidationReport]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+        return _load_report(blob)
+
+    def _promote(self, key: str, blob: Optional[bytes]) -> Optional[ValidationReport]:
+        # the outcome of a disk lookup after a memory miss
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, blob)
+        return _load_report(blob)
+
+    def _put_memory(self, key: str, report: ValidationReport) -> bytes:
+        blob = json.dumps(report.rows()).encode()
+        with self._lock:
+            self._remember(key, blob)
+        return blob
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.memory_hits + self.disk_hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        # caller holds the lock
+        if len(blob) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, key + ".json")
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        _touch(path)
+        return blob
+
+    def _write_disk(self, key: str, blob: bytes) -> None:
+        if not self.directory:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, os.path.join(self.directory, key + ".json"))
+            _evict_lru(self.directory, self.disk_max_bytes)
+        except OSError:
+            pass  # the disk tier is best effort
+
+
+def _load_report(blob: bytes) -> ValidationReport:
+    return ValidationReport.from_rows(json.loads(blob))
+
+
+_frame_cache: Optional[FrameCache] = None
+
+
+def frame_cache() -> Optional[FrameCache]:
+    """The process-wide parse cache, or None if disabled or pyarrow is missing."""
+    global _frame_cache
+    if not config.FRAME_CACHE_DIR or config.FRAME_CACHE_BYTES <= 0:
+        return None
+    try:
+        import pyarrow  # noqa: F401  (Feather support)
+    except ImportError:
+        return None
+    if _frame_cache is None or _frame_cache.directory != config.FRAME_CACHE_DIR:
+        _frame_cache = FrameCache(config.FRAME_CACHE_DIR, config.FRAME_CACHE_BYTES)
+    _frame_cache.max_bytes = config.FRAME_CACHE_BYTES
+    return _frame_cache
+
+
+def frame_key(digest: str, *parts: Any) -> str:
+    """Cache key for a parse of the upload with content ``digest``."""
+    return content_key(_FRAME_FORMAT, digest, *parts)
+
+
+_report_cache: Optional[ReportCache] = None
+
+
+def report_cache() -> ReportCache:
+    """The process-wide report cache."""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            config.REPORT_CACHE_BYTES,
+            directory=config.REPORT_CACHE_DIR,
+            disk_max_bytes=config.REPORT_CACHE_DISK_BYTES,
+        )
+    return _report_cache
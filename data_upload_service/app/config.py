@@ -0,0 +1,100 @@
+"""
+Service settings, read once at import time from environment variables.
+"""
+import os
+import tempfile
+
+# Where parsing and validation run: "thread" or "process"
+EXECUTOR = os.getenv("VALIDATION_EXECUTOR", "thread")
+
+# Worker count of the validation pool
+MAX_WORKERS = int(os.getenv("VALIDATION_MAX_WORKERS", os.cpu_count() or 4))
+
+# Threads a validation fans its independent per-column work out to (NumPy
+# releases the GIL); shared by all validations of a process, 1 disables
+COLUMN_THREADS = int(os.getenv("VALIDATION_COLUMN_THREADS", min(8, os.cpu_count() or 1)))
+
+# Validations allowed in flight per server worker; the rest wait their turn
+MAX_CONCURRENCY = int(os.getenv("VALIDATION_MAX_CONCURRENCY", MAX_WORKERS))
+
+# Seconds a request may spend waiting for and running parse + validation
+# (0 disables the limit)
+TIMEOUT_S = float(os.getenv("VALIDATION_TIMEOUT_S", "120"))
+
+# Uploads larger than this are spooled to a temp file and memory-mapped
+# instead of being held in memory as bytes
+SPOOL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPOOL_THRESHOLD_BYTES", 16 * 1024 * 1024))
+
+# Directory for spooled uploads (default: the system temp dir)
+SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+# Spooled CSV uploads of at least this many bytes are split into byte
+# ranges at line boundaries and scanned in parallel (0 disables). Only
+# for files whose quoted values never span lines.
+CSV_SHARD_MIN_BYTES = int(os.getenv("CSV_SHARD_MIN_BYTES", 0))
+
+# Target size of a CSV shard, and the processes scanning them
+CSV_SHARD_BYTES = int(os.getenv("CSV_SHARD_BYTES", 64 * 1024 * 1024))
+CSV_SHARD_WORKERS = int(os.getenv("CSV_SHARD_WORKERS", os.cpu_count() or 4))
+
+# Rows per DataFrame chunk within a CSV shard
+CSV_SHARD_CHUNK_ROWS = int(os.getenv("CSV_SHARD_CHUNK_ROWS", 100_000))
+
+# Rows drawn at random for a mode=sample validation
+SAMPLE_ROWS = int(os.getenv("VALIDATION_SAMPLE_ROWS", 10_000))
+
+# Port of the Arrow Flight front end for service-to-service validation
+# (see ``flight``; 0 disables it), and the address it listens on
+FLIGHT_PORT = int(os.getenv("VALIDATION_FLIGHT_PORT", 0))
+FLIGHT_HOST = os.getenv("VALIDATION_FLIGHT_HOST", "localhost")
+
+# Memory budget of the datasets staged with Flight DoPut, and the seconds
+# they are kept for the DoExchange that validates them
+FLIGHT_STAGE_BYTES = int(os.getenv("VALIDATION_FLIGHT_STAGE_BYTES", 1024 ** 3))
+FLIGHT_STAGE_TTL_S = float(os.getenv("VALIDATION_FLIGHT_STAGE_TTL_S", "600"))
+
+# Rows per DataFrame chunk when streaming an Excel worksheet
+XLSX_CHUNK_ROWS = int(os.getenv("XLSX_CHUNK_ROWS", 50_000))
+
+# Parsed Excel uploads are cached here by content hash ("" disables)
+FRAME_CACHE_DIR = os.getenv(
+    "FRAME_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data-upload-frame-cache")
+)
+
+# Size budget of the parse cache; least recently used entries go first
+FRAME_CACHE_BYTES = int(os.getenv("FRAME_CACHE_BYTES", 2 * 1024 ** 3))
+
+# In-process budget of the validation report cache (0 disables caching,
+# the shared on-disk tier included)
+REPORT_CACHE_BYTES = int(os.getenv("REPORT_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Optional directory for a report cache tier shared by all server workers
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR") or None
+
+# Size budget of the shared on-disk report tier
+REPORT_CACHE_DISK_BYTES = int(os.getenv("REPORT_CACHE_DISK_BYTES", 256 * 1024 * 1024))
+
+# Durable store of background validation jobs: a SQLite database plus the
+# uploads of unfinished jobs
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "data-upload-jobs"))
+
+# Jobs each server worker runs at a time
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", max(1, MAX_CONCURRENCY // 2)))
+
+# Seconds a job may run before it is failed (0 disables the limit)
+JOB_TIMEOUT_S = float(os.getenv("JOB_TIMEOUT_S", "3600"))
+
+# A running job whose worker has not checked in for this long is presumed
+# dead and run again, at most JOB_MAX_ATTEMPTS times in total
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Seconds between polls of the job store for new or abandoned jobs
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "1"))
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", 7 * 24 * 3600))
+
+# Optional directory of pipeline definitions: one JSON (or YAML) rule spec
+# per file, registered under the file name (see ``pipelines``)
+PIPELINE_DIR = os.getenv("PIPELINE_DIR") or None
@@ -0,0 +1,201 @@
+"""
+Runs the CPU-bound parse and validation stages off the event loop.
+
+Routes only await I/O; everything pandas does goes through ``run_blocking``
+onto a shared thread or process pool (see ``config.EXECUTOR``). In-flight
+work is bounded by ``config.MAX_CONCURRENCY`` and each call by
+``config.TIMEOUT_S``. A timed-out call stops being awaited but its worker
+finishes the task before picking up the next one. ``run_coalesced`` lets
+concurrent identical calls share a single run. Shards of large CSV
+uploads are scanned on a separate process pool, ``shard_executor``, owned
+by the server process – pool workers never start pools of their own –
+and per-column work within a validation runs on ``column_executor``.
+"""
+import asyncio
+import functools
+import importlib
+import multiprocessing
+import os
+import queue
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import config
+
+_executor: Optional[Executor] = None
+_shard_executor: Optional[Executor] = None
+_column_executor: Optional[Executor] = None
+_manager = None
+_in_pool_worker = False
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _warm_up(package: str) -> None:
+    """Process-pool initializer: pay the pandas/validator imports once per worker."""
+    global _in_pool_worker
+    _in_pool_worker = True
+    importlib.import_module(f"{package}.validator_dispatcher")
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if config.EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(
+                max_workers=config.MAX_WORKERS,
+                initializer=_warm_up,
+                initargs=(__package__,),
+            )
+        elif config.EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(
+                max_workers=config.MAX_WORKERS,
+                thread_name_prefix="validation",
+            )
+        else:
+            raise ValueError(f"Unknown executor: {config.EXECUTOR}")
+    return _executor
+
+
+def in_pool_worker() -> bool:
+    """Whether this is a worker process of one of the pools here."""
+    return _in_pool_worker
+
+
+def shard_executor() -> Executor:
+    """
+    Process pool scanning CSV shards, ``config.CSV_SHARD_WORKERS`` wide.
+    Not for pool workers (see ``in_pool_worker``).
+    """
+    global _shard_executor
+    if _shard_executor is None:
+        # spawned, not forked: the server may be running column threads
+        _shard_executor = ProcessPoolExecutor(
+            max_workers=config.CSV_SHARD_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+            initargs=(__package__,),
+        )
+    return _shard_executor
+
+
+def column_executor() -> Optional[Executor]:
+    """
+    Thread pool for column-parallel checks (see ``validators.base.column_threads``),
+    ``config.COLUMN_THREADS`` wide; None when that is 1 or less.
+    """
+    global _column_executor
+    if _column_executor is None and config.COLUMN_THREADS > 1:
+        _column_executor = ThreadPoolExecutor(
+            max_workers=config.COLUMN_THREADS,
+            thread_name_prefix="columns",
+        )
+    return _column_executor
+
+
+def _forget_column_executor() -> None:
+    # a forked child inherits the pool object but none of its threads
+    global _column_executor
+    _column_executor = None
+
+
+os.register_at_fork(after_in_child=_forget_column_executor)
+
+
+def shutdown_executor() -> None:
+    global _executor, _shard_executor, _column_executor, _manager
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _shard_executor is not None:
+        _shard_executor.shutdown(wait=False, cancel_futures=True)
+        _shard_executor = None
+    if _column_executor is not None:
+        _column_executor.shutdown(wait=False, cancel_futures=True)
+        _column_executor = None
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
+
+
+def event_queue() -> "queue.Queue":
+    """A queue executor tasks can report events through."""
+    global _manager
+    if config.EXECUTOR != "process":
+        return queue.Queue()
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+    return _manager.Queue()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    # asyncio primitives are bound to a loop; keep one per running loop
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(config.MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+
+async def run_within(timeout: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run ``fn(*args, **kwargs)`` on the validation executor.
+
+    Raises ``asyncio.TimeoutError`` when the call (including time spent
+    waiting for a free slot) exceeds ``timeout`` seconds (0: no limit).
+    """
+    async def _run() -> Any:
+        async with _semaphore():
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            return await loop.run_in_executor(get_executor(), call)
+
+    return await asyncio.wait_for(_run(), timeout=timeout or None)
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """``run_within`` the request timeout, ``config.TIMEOUT_S``."""
+    return await run_within(config.TIMEOUT_S, fn, *args, **kwargs)
+
+
+def _forget(calls: Dict[str, asyncio.Task], key: str, task: asyncio.Task) -> None:
+    if calls.get(key) is task:
+        del calls[key]
+    if not task.cancelled():
+        task.exception()  # retrieved here in case every waiter went away
+
+
+async def run_coalesced(
+    key: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    timeout: Optional[float] = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    ``run_within`` ``timeout`` (default ``config.TIMEOUT_S``) with
+    single-flight semantics: while a call for ``key`` is in flight,
+    further calls with the same ``key`` wait for it and get its result
+    (or exception) instead of starting another run. A waiter that is
+    cancelled, e.g. because its client disconnected, leaves the shared
+    run going for the others.
+    """
+    loop = asyncio.get_running_loop()
+    calls = _inflight.setdefault(loop, {})
+    task = calls.get(key)
+    if task is None:
+        if timeout is None:
+            timeout = config.TIMEOUT_S
+        task = loop.create_task(run_within(timeout, fn, *args, **kwargs))
+        calls[key] = task
+        task.add_done_callback(functools.partial(_forget, calls, key))
+    return await asyncio.shield(task)
+
+
+def in_flight(key: str) -> Optional[asyncio.Task]:
+    """The shared ``run_coalesced`` run for ``key``, while it is going."""
+    return _inflight.get(asyncio.get_running_loop(), {}).get(key)
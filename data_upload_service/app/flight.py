@@ -0,0 +1,246 @@
+"""
+Arrow Flight front end for service-to-service validation.
+
+Callers that already hold their data as Arrow – e.g. a forecasting batch
+run validating hundreds of frames – stream record batches here instead
+of encoding them as CSV for ``/validate/file``. The batches are kept as
+received, without a copy to text, and once the stream ends validated
+with the same pipelines (see ``validator_dispatcher.dispatch_tables``)
+on the validation executor, within the limits HTTP requests have: a slot
+of ``config.MAX_CONCURRENCY`` and the pipeline's timeout (see
+``executor.run_within``). The report comes back as a record batch too.
+
+- ``DoPut`` with the descriptor path ``[batch, dataset]`` stages a
+  dataset, for pipelines with several (e.g. the media of ``mmm``). The
+  staged datasets of all batches share a budget of
+  ``config.FLIGHT_STAGE_BYTES`` and are dropped if not validated within
+  ``config.FLIGHT_STAGE_TTL_S``;
+- ``DoExchange`` with a JSON descriptor command,
+  ``{"pipeline": ..., "dataset": "data", "batch": ..., "fail_fast": false}``,
+  validates the batches it streams as ``dataset`` along with the
+  datasets staged under ``batch`` (which are then dropped), and answers
+  with the report: one row per check, in the columns of ``REPORT_SCHEMA``,
+  and ``ok`` in the schema metadata.
+
+``validate_remote`` is the client side. The server listens on
+``config.FLIGHT_HOST``:``config.FLIGHT_PORT`` alongside the HTTP app
+(see ``start_flight_server``).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.flight as flight
+
+from . import config
+from .executor import run_within
+from .pipelines import request_timeout
+from .validator_dispatcher import dispatch_tables
+from .validators.base import ValidationReport
+
+logger = logging.getLogger(__name__)
+
+REPORT_SCHEMA = pa.schema([
+    ("check", pa.string()),
+    ("status", pa.string()),
+    ("msg", pa.string()),
+    ("column", pa.string()),
+])
+
+
+def _report_table(report: ValidationReport) -> pa.Table:
+    rows = report.rows()
+    table = pa.Table.from_pydict(
+        {name: [row[name] for row in rows] for name in REPORT_SCHEMA.names},
+        schema=REPORT_SCHEMA,
+    )
+    return table.replace_schema_metadata({"ok": json.dumps(report.ok)})
+
+
+def _read_report(table: pa.Table) -> ValidationReport:
+    return ValidationReport.from_rows(table.to_pylist())
+
+
+class _Staging:
+    """
+    Datasets staged by ``DoPut``, by batch, until the ``DoExchange`` that
+    validates them takes them: ``max_bytes`` of tables at most, the least
+    recently staged batches evicted first, and each batch for ``ttl``
+    seconds after its last dataset.
+    """
+    def __init__(self, max_bytes: int, ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._batches: "OrderedDict[str, Tuple[float, Dict[str, pa.Table]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, batch: str, dataset: str, table: pa.Table) -> None:
+        with self._lock:
+            self._expire()
+            _, tables = self._batches.pop(batch, (0.0, {}))
+            old = tables.pop(dataset, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            tables[dataset] = table
+            self._bytes += table.nbytes
+            self._batches[batch] = (time.monotonic() + self.ttl, tables)
+            while self._bytes > self.max_bytes:
+                evicted, (_, dropped) = self._batches.popitem(last=False)
+                self._bytes -= sum(t.nbytes for t in dropped.values())
+                if evicted == batch:
+                    raise flight.FlightServerError(
+                        f"batch {batch} exceeds the staging budget of {self.max_bytes} bytes"
+                    )
+
+    def take(self, batch: Optional[str]) -> Dict[str, pa.Table]:
+        """The datasets staged under ``batch``, no longer staged."""
+        with self._lock:
+            self._expire()
+            _, tables = self._batches.pop(batch, (0.0, {}))
+            self._bytes -= sum(t.nbytes for t in tables.values())
+            return tables
+
+    def _expire(self) -> None:
+        # caller holds the lock; batches are in deadline order
+        now = time.monotonic()
+        while self._batches and next(iter(self._batches.values()))[0] <= now:
+            _, (_, dropped) = self._batches.popitem(last=False)
+            self._bytes -= sum(t.nbytes for t in dropped.values())
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+
+class ValidationFlightServer(flight.FlightServerBase):
+    """
+    Validates record batches streamed by Flight clients: see the module
+    docstring. Validations are run from ``loop`` – the app's event loop,
+    so they share its executor slots – or a loop of the server's own.
+    """
+    def __init__(
+        self, location: str, *, loop: Optional[asyncio.AbstractEventLoop] = None, **kwargs: Any
+    ) -> None:
+        super().__init__(location, **kwargs)
+        self._staging = _Staging(config.FLIGHT_STAGE_BYTES, config.FLIGHT_STAGE_TTL_S)
+        self._own_loop = loop is None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=_run_loop, args=(loop,), name="flight", daemon=True).start()
+        self._loop = loop
+
+    def do_put(self, context, descriptor, reader, writer) -> None:
+        if len(descriptor.path) != 2:
+            raise flight.FlightServerError("DoPut expects the descriptor path [batch, dataset]")
+        batch, dataset = (part.decode() for part in descriptor.path)
+        self._staging.put(batch, dataset, reader.read_all())  # batches as received: not copied
+
+    def do_exchange(self, context, descriptor, reader, writer) -> None:
+        try:
+            request = json.loads(descriptor.command)
+            pipeline = request["pipeline"]
+        except (TypeError, ValueError, KeyError):
+            raise flight.FlightServerError(
+                'DoExchange expects a JSON command with a "pipeline"'
+            ) from None
+        tables = self._staging.take(request.get("batch"))
+        try:
+            tables[request.get("dataset", "data")] = reader.read_all()
+        except OSError:
+            pass  # no batches sent: every dataset is staged
+        table = _report_table(self._validate(pipeline, tables, bool(request.get("fail_fast"))))
+        writer.begin(table.schema)
+        writer.write_table(table)
+
+    def _validate(
+        self, pipeline: str, tables: Dict[str, pa.Table], fail_fast: bool
+    ) -> ValidationReport:
+        """``dispatch_tables`` on the validation executor, as HTTP requests run it."""
+        timeout = request_timeout(pipeline)
+        call = run_within(timeout, dispatch_tables, pipeline, tables, fail_fast=fail_fast)
+        try:
+            return asyncio.run_coroutine_threadsafe(call, self._loop).result()
+        except asyncio.TimeoutError:
+            raise flight.FlightTimedOutError(
+                f"Validation did not finish within {timeout:g}s"
+            ) from None
+        except Exception as e:
+            raise flight.FlightServerError(str(e)) from None
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        if self._own_loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+def validate_remote(
+    client: flight.FlightClient,
+    pipeline: str,
+    tables: Dict[str, pa.Table],
+    *,
+    fail_fast: bool = False,
+) -> ValidationReport:
+    """
+    Validate Arrow ``tables`` by dataset key on a ``ValidationFlightServer``:
+    all but the last are staged with ``DoPut``, the last is streamed
+    through the ``DoExchange`` that returns the report.
+    """
+    batch = uuid.uuid4().hex
+    *staged, (dataset, last) = tables.items()
+    for key, table in staged:
+        writer, _ = client.do_put(flight.FlightDescriptor.for_path(batch, key), table.schema)
+        writer.write_table(table)
+        writer.close()
+    command = json.dumps({
+        "pipeline": pipeline, "dataset": dataset, "batch": batch, "fail_fast": fail_fast,
+    })
+    writer, reader = client.do_exchange(flight.FlightDescriptor.for_command(command))
+    with writer:
+        writer.begin(last.schema)
+        writer.write_table(last)
+        writer.done_writing()
+        return _read_report(reader.read_all())
+
+
+_server: Optional[ValidationFlightServer] = None
+
+
+def start_flight_server(
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> Optional[ValidationFlightServer]:
+    """
+    Start the process's Flight server on ``config.FLIGHT_PORT``, unless
+    that is 0 or it runs already, validating from ``loop`` (see
+    ``ValidationFlightServer``). Of several server workers only the
+    first binds the port; the others go without.
+    """
+    global _server
+    if _server is None and config.FLIGHT_PORT:
+        location = f"grpc://{config.FLIGHT_HOST}:{config.FLIGHT_PORT}"
+        try:
+            _server = ValidationFlightServer(location, loop=loop)
+        except pa.ArrowException:
+            logger.warning("Flight front end not started: %s is taken", location)
+    return _server
+
+
+def stop_flight_server() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server = None
@@ -0,0 +1,380 @@
+"""
+Background validation jobs for uploads too large to validate within a
+request.
+
+Jobs, and the uploads of unfinished ones, live in ``config.JOB_DIR``: a
+SQLite database next to a directory of upload files. Every server worker
+runs a ``JobWorker`` that claims queued jobs from the store and validates
+them on the shared executor. A running job is leased to its worker, which
+renews the lease as it goes; if the worker dies, the lease lapses and
+another worker (or the restarted one) runs the job again.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import time
+import uuid
+import weakref
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from . import config
+from .cache import report_cache
+from .executor import run_within
+from .loaders import ParseProgress, SheetSelector, SpooledFile, Upload, persist
+from .validator_dispatcher import dispatch_uploads, uploads_key
+from .validators.base import ValidationReport
+
+logger = logging.getLogger(__name__)
+
+# Job states, in lifecycle order
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Progress is written to the store in steps of this size
+_PROGRESS_STEP = 0.01
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    pipeline    TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    uploads     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    progress    REAL NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    owner       TEXT,
+    heartbeat   REAL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    result      TEXT,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class Job(NamedTuple):
+    """A validation job as kept in the store."""
+    id: str
+    pipeline: str
+    status: str
+    progress: float
+    created_at: float
+    updated_at: float
+    uploads: Dict[str, Upload]
+    chunksize: Optional[int] = None
+    sheet: SheetSelector = None
+    report: Optional[ValidationReport] = None
+    error: Optional[str] = None
+
+
+def _job(row: sqlite3.Row) -> Job:
+    options = json.loads(row["options"])
+    uploads = {
+        key: Upload(u["filename"], SpooledFile(u["path"], u["size"]), u["digest"])
+        for key, u in json.loads(row["uploads"]).items()
+    }
+    report = None
+    if row["result"] is not None:
+        report = ValidationReport.from_rows(json.loads(row["result"]))
+    return Job(
+        row["id"], row["pipeline"], row["status"], row["progress"],
+        row["created_at"], row["updated_at"], uploads,
+        options.get("chunksize"), options.get("sheet"), report, row["error"],
+    )
+
+
+class JobStore:
+    """
+    SQLite-backed job queue shared by every server worker on the host.
+    Each call opens its own connection, so a store can be used from any
+    thread or process.
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        os.makedirs(self._uploads_root, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @property
+    def _uploads_root(self) -> str:
+        return os.path.join(self.directory, "uploads")
+
+    def _upload_dir(self, job_id: str) -> str:
+        return os.path.join(self._uploads_root, job_id)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def create(
+        self,
+        pipeline: str,
+        uploads: Dict[str, Upload],
+        *,
+        chunksize: Optional[int] = None,
+        sheet: SheetSelector = None,
+    ) -> Job:
+        """Queue a job, moving its uploads into the store."""
+        job_id = uuid.uuid4().hex
+        directory = self._upload_dir(job_id)
+        os.makedirs(directory)
+        try:
+            kept = {key: persist(upload, directory) for key, upload in uploads.items()}
+            files = {
+                key: {
+                    "filename": u.filename, "path": u.source.path,
+                    "size": u.source.size, "digest": u.digest,
+                }
+                for key, u in kept.items()
+            }
+            now = time.time()
+            with self._connect() as db:
+                db.execute(
+                    "INSERT INTO jobs (id, pipeline, options, uploads, status, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, pipeline, json.dumps({"chunksize": chunksize, "sheet": sheet}),
+                     json.dumps(files), QUEUED, now, now),
+                )
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return Job(job_id, pipeline, QUEUED, 0.0, now, now, kept, chunksize, sheet)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else _job(row)
+
+    def claim(self, owner: str) -> Optional[Job]:
+        """
+        Lease the oldest queued job – or a running one whose lease lapsed –
+        to ``owner``. Jobs that already used up their attempts are failed.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = db.execute(
+                        "SELECT * FROM jobs WHERE status = ? OR (status = ? AND heartbeat < ?)"
+                        " ORDER BY created_at LIMIT 1",
+                        (QUEUED, RUNNING, now - config.JOB_LEASE_S),
+                    ).fetchone()
+                    if row is None:
+                        db.execute("COMMIT")
+                        return None
+                    if row["attempts"] >= config.JOB_MAX_ATTEMPTS:
+                        db.execute(
+                            "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated_at = ?"
+                            " WHERE id = ?",
+                            (FAILED, f"Job abandoned after {row['attempts']} attempts", now, row["id"]),
+                        )
+                        continue
+                    db.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, progress = 0,"
+                        " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (RUNNING, owner, now, now, row["id"]),
+                    )
+                    db.execute("COMMIT")
+                    return _job(row)._replace(status=RUNNING, progress=0.0, updated_at=now)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def _update_running(self, job_id: str, owner: str, sql: str, *params: Any) -> bool:
+        # only the current lease holder may touch a running job
+        with self._connect() as db:
+            cur = db.execute(
+                f"UPDATE jobs SET {sql} WHERE id = ? AND owner = ? AND status = ?",
+                (*params, job_id, owner, RUNNING),
+            )
+        return cur.rowcount > 0
+
+    def set_progress(self, job_id: str, owner: str, progress: float) -> None:
+        now = time.time()
+        self._update_running(
+            job_id, owner, "progress = ?, heartbeat = ?, updated_at = ?", progress, now, now
+        )
+
+    def heartbeat(self, owner: str) -> None:
+        """Renew the leases of every job ``owner`` is running."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = ?",
+                (time.time(), owner, RUNNING),
+            )
+
+    def finish(self, job_id: str, owner: str, report: ValidationReport) -> None:
+        now = time.time()
+        if self._update_running(
+            job_id, owner,
+            "status = ?, progress = 1, result = ?, owner = NULL, updated_at = ?",
+            DONE, json.dumps(report.rows()), now,
+        ):
+            shutil.rmtree(self._upload_dir(job_id), ignore_errors=True)
+
+    def fail(self, job_id: str, owner: str, error: str) -> None:
+        now = time.time()
+        if self._update_running(
+            job_id, owner, "status = ?, error = ?, owner = NULL, updated_at = ?", FAILED, error, now
+        ):
+            shutil.rmtree(self._upload_dir(job_id), ignore_errors=True)
+
+    def requeue(self, owner: str) -> None:
+        """Hand back the jobs ``owner`` is running, e.g. on shutdown."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, attempts = attempts - 1, updated_at = ?"
+                " WHERE owner = ? AND status = ?",
+                (QUEUED, time.time(), owner, RUNNING),
+            )
+
+    def purge(self, before: float) -> None:
+        """Forget finished jobs last updated before ``before``."""
+        with self._connect() as db:
+            ids: List[str] = [
+                row["id"] for row in db.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                    (DONE, FAILED, before),
+                )
+            ]
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        for job_id in ids:
+            shutil.rmtree(self._upload_dir(job_id), ignore_errors=True)
+
+
+def run_job(directory: str, job_id: str, owner: str) -> ValidationReport:
+    """
+    Parse and validate a stored job, writing its progress to the store.
+    Runs on the validation executor.
+    """
+    store = JobStore(directory)
+    job = store.get(job_id)
+    reported = 0.0
+
+    def _progress(progress: ParseProgress) -> None:
+        nonlocal reported
+        if progress.fraction - reported >= _PROGRESS_STEP:
+            reported = progress.fraction
+            store.set_progress(job_id, owner, reported)
+
+    return dispatch_uploads(
+        job.pipeline, job.uploads, chunksize=job.chunksize, sheet=job.sheet, progress=_progress
+    )
+
+
+class JobWorker:
+    """Runs up to ``concurrency`` jobs from ``store`` on the current event loop."""
+    def __init__(self, store: JobStore, concurrency: int) -> None:
+        self.store = store
+        self.concurrency = concurrency
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = asyncio.Event()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    def wake(self) -> None:
+        """Look for new jobs now rather than at the next poll."""
+        self._wake.set()
+
+    async def stop(self) -> None:
+        """Stop polling and hand unfinished jobs back to the queue."""
+        tasks = [t for t in (self._task, *self._running.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(self.store.requeue, self.owner)
+
+    async def _poll(self) -> None:
+        purged = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now - purged > 3600:
+                    await asyncio.to_thread(self.store.purge, now - config.JOB_TTL_S)
+                    purged = now
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                while len(self._running) < self.concurrency:
+                    job = await asyncio.to_thread(self.store.claim, self.owner)
+                    if job is None:
+                        break
+                    self._start(job)
+            except Exception:
+                logger.exception("Polling the job store failed")
+
+            self._wake.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                interval = min(config.JOB_POLL_S, config.JOB_LEASE_S / 3)
+                await asyncio.wait_for(self._wake.wait(), interval)
+
+    def _start(self, job: Job) -> None:
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._running[job.id] = task
+
+        def _done(_: asyncio.Task) -> None:
+            self._running.pop(job.id, None)
+            self.wake()
+        task.add_done_callback(_done)
+
+    async def _run(self, job: Job) -> None:
+        key = uploads_key(job.pipeline, job.uploads, chunksize=job.chunksize, sheet=job.sheet)
+        cache = report_cache()
+        try:
+            report = await cache.get_async(key)
+            if report is None:
+                report = await run_within(
+                    config.JOB_TIMEOUT_S, run_job, self.store.directory, job.id, self.owner
+                )
+                await cache.put_async(key, report)
+        except asyncio.TimeoutError:
+            error = f"Validation did not finish within {config.JOB_TIMEOUT_S:g}s"
+            await asyncio.to_thread(self.store.fail, job.id, self.owner, error)
+        except Exception as e:
+            await asyncio.to_thread(self.store.fail, job.id, self.owner, str(e))
+        else:
+            await asyncio.to_thread(self.store.finish, job.id, self.owner, report)
+
+
+_store: Optional[JobStore] = None
+_workers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, JobWorker]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def job_store() -> JobStore:
+    """The process-wide job store (in ``config.JOB_DIR``)."""
+    global _store
+    if _store is None or _store.directory != config.JOB_DIR:
+        _store = JobStore(config.JOB_DIR)
+    return _store
+
+
+def job_worker() -> JobWorker:
+    """The running event loop's job worker, started on first use."""
+    loop = asyncio.get_running_loop()
+    worker = _workers.get(loop)
+    if worker is None:
+        worker = _workers[loop] = JobWorker(job_store(), config.JOB_CONCURRENCY)
+        worker.start()
+    return worker
+
+
+async def stop_job_worker() -> None:
+    worker = _workers.pop(asyncio.get_running_loop(), None)
+    if worker is not None:
+        await worker.stop()
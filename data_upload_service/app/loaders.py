@@ -0,0 +1,814 @@
+import asyncio
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from . import config
+from .cache import frame_cache, frame_key
+from .pipelines import expected_keys
+from .validators.base import ColumnPlan, FrameSource
+from .validators.sampling import Sample
+
+# Parquet and Arrow IPC uploads (file or stream format), read through pyarrow
+ARROW_EXTENSIONS = (".parquet", ".arrow", ".arrows", ".feather")
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx") + ARROW_EXTENSIONS
+UNSUPPORTED_MSG = "Unsupported file type. Please upload .csv, .xlsx, .parquet or .arrow"
+
+# Block size used when copying large uploads to disk
+SPOOL_BLOCK_BYTES = 1 << 20
+
+
+class SpooledFile(NamedTuple):
+    """An upload copied to a temp file; parsed through a memory map."""
+    path: str
+    size: int
+
+
+# Raw upload handed to the parse stage: small uploads as bytes, larger ones
+# spooled to disk. Both can be sent to a process pool.
+UploadSource = Union[bytes, SpooledFile]
+
+
+class Upload(NamedTuple):
+    """A received file: its name, raw content and content digest."""
+    filename: str
+    source: UploadSource
+    digest: str
+
+
+def is_supported(filename: str) -> bool:
+    return filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def is_arrow(filename: str) -> bool:
+    return filename.lower().endswith(ARROW_EXTENSIONS)
+
+
+def file_key(pipeline: str, index: int, n_files: int, keys: Dict[str, str]) -> str:
+    """
+    Determine the DataFrame key for the index-th uploaded file: files go
+    to the keys the pipeline expects (e.g. media, then sales) in order.
+    """
+    if str(index) in keys:
+        return keys[str(index)]
+    elif n_files == 1:
+        return "data"
+    expected = expected_keys(pipeline)
+    if index < len(expected):
+        return expected[index]
+    return f"data_{index}"
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+async def spool_upload(file) -> Upload:
+    """
+    Read an ``UploadFile``, hashing its content on the way. Uploads up to
+    ``config.SPOOL_THRESHOLD_BYTES`` are kept as bytes; larger ones are
+    streamed block by block to a temp file, which the caller must
+    ``release`` once parsing is done.
+    """
+    digest = _hasher()
+    head = await file.read(config.SPOOL_THRESHOLD_BYTES + 1)
+    digest.update(head)
+    if len(head) <= config.SPOOL_THRESHOLD_BYTES:
+        return Upload(file.filename, head, digest.hexdigest())
+
+    async def blocks() -> AsyncIterator[bytes]:
+        while block := await file.read(SPOOL_BLOCK_BYTES):
+            yield block
+
+    return await _spill(file.filename, head, digest, blocks())
+
+
+async def spool_stream(filename: str, blocks: AsyncIterator[bytes]) -> Upload:
+    """
+    ``spool_upload`` for a request body read as a stream of ``blocks``
+    (e.g. ``Request.stream()``), named ``filename``.
+    """
+    digest = _hasher()
+    head = bytearray()
+    blocks = aiter(blocks)
+    async for block in blocks:
+        digest.update(block)
+        head += block
+        if len(head) > config.SPOOL_THRESHOLD_BYTES:
+            return await _spill(filename, bytes(head), digest, blocks)
+    return Upload(filename, bytes(head), digest.hexdigest())
+
+
+async def _spill(filename: str, head: bytes, digest, blocks: AsyncIterator[bytes]) -> Upload:
+    """Write ``head`` and the rest of an upload's ``blocks`` to a temp file."""
+    suffix = os.path.splitext(filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=config.SPOOL_DIR)
+    try:
+        size = len(head)
+        with os.fdopen(fd, "wb") as out:
+            await asyncio.to_thread(out.write, head)
+            async for block in blocks:
+                await asyncio.to_thread(out.write, block)
+                digest.update(block)
+                size += len(block)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Upload(filename, SpooledFile(path, size), digest.hexdigest())
+
+
+def release(upload: Upload) -> None:
+    """Delete the temp file behind a spooled upload, if any."""
+    if isinstance(upload.source, SpooledFile):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(upload.source.path)
+
+
+def persist(upload: Upload, directory: str) -> Upload:
+    """
+    Keep an upload as a file in ``directory``: bytes are written out,
+    spooled files are moved there. The result is always a ``SpooledFile``.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=directory)
+    os.close(fd)
+    if isinstance(upload.source, SpooledFile):
+        shutil.move(upload.source.path, path)
+        size = upload.source.size
+    else:
+        with open(path, "wb") as out:
+            out.write(upload.source)
+        size = len(upload.source)
+    return upload._replace(source=SpooledFile(path, size))
+
+
+def source_size(source: UploadSource) -> int:
+    return source.size if isinstance(source, SpooledFile) else len(source)
+
+
+class _MappedFile(io.RawIOBase):
+    """Seekable read-only file over an mmap (zipfile needs ``seekable()``)."""
+    def __init__(self, mm: mmap.mmap, path: str) -> None:
+        self._mm = mm
+        self.path = path
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._mm.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        self._mm.seek(pos, whence)
+        return self._mm.tell()
+
+    def tell(self) -> int:
+        return self._mm.tell()
+
+
+@contextlib.contextmanager
+def open_source(source: UploadSource) -> Iterator[BinaryIO]:
+    """Open an upload for parsing; spooled files are memory-mapped."""
+    if isinstance(source, SpooledFile):
+        with open(source.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield _MappedFile(mm, source.path)
+    else:
+        yield io.BytesIO(source)
+
+
+class _RangeFile(io.RawIOBase):
+    """Reads ``raw`` from its current position up to byte ``end``."""
+    def __init__(self, raw: BinaryIO, end: int) -> None:
+        self._raw = raw
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        left = self._end - self._raw.tell()
+        if left <= 0:
+            return 0
+        view = memoryview(b)[:left]
+        return self._raw.readinto(view) or 0
+
+
+def csv_ranges(source: SpooledFile, shard_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file's rows – everything after the header line – into
+    byte ranges of about ``shard_bytes``, each starting at a line
+    boundary. A line break inside a quoted value would be taken for one.
+    """
+    with open(source.path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        bounds = [start]
+        pos = start + shard_bytes
+        while pos < source.size:
+            f.seek(pos)
+            f.readline()  # to the start of the next line
+            if f.tell() >= source.size:
+                break
+            bounds.append(f.tell())
+            pos = f.tell() + shard_bytes
+    bounds.append(source.size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def read_csv_range(
+    source: SpooledFile,
+    start: int,
+    end: int,
+    *,
+    header: List[str],
+    columns: Optional[ColumnPlan] = None,
+    chunksize: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Row chunks of the byte range ``start:end`` of a CSV file (see
+    ``csv_ranges``), read with the file's ``header`` and, as in
+    ``read_upload``, only the planned columns.
+    """
+    usecols, dtype = None, None
+    if columns is not None:
+        usecols, dtype = columns.resolve(header)
+        if not usecols:
+            usecols, dtype = None, None
+    with open(source.path, "rb") as f:
+        f.seek(start)
+        yield from pd.read_csv(
+            io.BufferedReader(_RangeFile(f, end)), header=None, names=header,
+            usecols=usecols, dtype=dtype, chunksize=chunksize or config.CSV_SHARD_CHUNK_ROWS,
+        )
+
+
+@contextlib.contextmanager
+def _raw_bytes(source: UploadSource) -> Iterator[Union[bytes, mmap.mmap]]:
+    """The bytes of an upload; spooled files are memory-mapped."""
+    if isinstance(source, SpooledFile) and source.size:
+        with open(source.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+    else:
+        yield source if isinstance(source, bytes) else b""
+
+
+def _line_end(data: Union[bytes, mmap.mmap], pos: int) -> int:
+    nl = data.find(b"\n", pos)
+    return len(data) if nl < 0 else nl + 1
+
+
+def sample_csv(
+    source: UploadSource,
+    size: int,
+    *,
+    header: List[str],
+    columns: Optional[ColumnPlan] = None,
+    seed: int = 0,
+) -> Sample:
+    """
+    ``size`` rows of a CSV upload drawn at random without reading all of
+    it. The rows after the header line are split into ``size`` byte ranges
+    of equal length, and from each the first line starting after a random
+    offset within it is taken – a sample stratified by position in the
+    file, where a line's chance goes with the length of the line before
+    it. The row count is estimated from the mean length of the lines
+    drawn. A file of at most ``size`` rows is read whole and counted
+    exactly. Only the planned ``columns`` are parsed, as in
+    ``read_upload``, but duplicates are told by the lines' hashes. Like
+    ``csv_ranges``, line breaks inside quoted values are taken for row
+    ends.
+    """
+    usecols, dtype = None, None
+    if columns is not None:
+        usecols, dtype = columns.resolve(header)
+        if not usecols:
+            usecols, dtype = None, None
+
+    def _parse(head: bytes, lines: List[bytes]) -> Tuple[pd.DataFrame, np.ndarray]:
+        frame = pd.read_csv(io.BytesIO(head + b"".join(lines)), usecols=usecols, dtype=dtype)
+        content = [line.rstrip(b"\r\n") for line in lines]
+        hashes = pd.util.hash_array(np.array([c for c in content if c], dtype=object))
+        return frame, hashes
+
+    with _raw_bytes(source) as data:
+        end = len(data)
+        start = _line_end(data, 0)
+        head = bytes(data[:start])
+        if not head.endswith(b"\n"):
+            head += b"\n"
+
+        # small files: fewer than ``size`` line ends after the header
+        pos, rows = start, 0
+        while rows <= size and pos < end:
+            pos, rows = _line_end(data, pos), rows + 1
+        if pos >= end:
+            frame, hashes = _parse(head, bytes(data[start:end]).splitlines(keepends=True))
+            return Sample(frame, len(frame), row_hashes=hashes)
+
+        rng = np.random.default_rng(seed)
+        width = (end - start) / size
+        offsets = (start + (np.arange(size) + rng.random(size)) * width).astype(np.int64)
+        lines, taken = [], set()
+        for offset in offsets.tolist():
+            first = offset if data[offset - 1:offset] == b"\n" else _line_end(data, offset)
+            if first >= end or first in taken:
+                continue
+            taken.add(first)
+            line = bytes(data[first:_line_end(data, first)])
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+    mean_bytes = sum(map(len, lines)) / len(lines)
+    frame, hashes = _parse(head, lines)
+    return Sample(frame, round((end - start) / mean_bytes), exact=False, row_hashes=hashes)
+
+
+def read_ndjson(source: UploadSource) -> pd.DataFrame:
+    """
+    Newline-delimited JSON, one record per line, parsed column by column
+    by pyarrow's JSON reader – no Python object per row – with ISO dates
+    as datetimes. Records whose fields mix types (e.g. numbers and text,
+    which Arrow columns can't hold) are read by pandas instead, as
+    ``pd.DataFrame`` would build them from the records; so is everything
+    when pyarrow is missing.
+    """
+    if not source_size(source):
+        return pd.DataFrame()
+    try:
+        import pyarrow as pa
+        import pyarrow.json  # noqa: F401
+    except ImportError:
+        pa = None
+    if pa is not None:
+        with _raw_bytes(source) as data:
+            try:
+                table = pa.json.read_json(pa.BufferReader(pa.py_buffer(data)))
+            except pa.ArrowInvalid:
+                table = None
+        if table is not None:
+            return table.to_pandas()
+    with open_source(source) as buf:
+        return pd.read_json(buf, lines=True, dtype=False, convert_dates=False)
+
+
+class _CountingFile(io.RawIOBase):
+    """Passes reads through to ``raw``, reporting each one's size."""
+    def __init__(self, raw: BinaryIO, on_read: Callable[[int], None]) -> None:
+        self._raw = raw
+        self._on_read = on_read
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self._raw.readinto(b)
+        self._on_read(n or 0)
+        return n
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(pos, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+
+class ParseProgress(NamedTuple):
+    """How far parsing got: bytes read from the uploads and rows parsed."""
+    bytes_read: int
+    total_bytes: int
+    rows: int
+
+    @property
+    def fraction(self) -> float:
+        if not self.total_bytes:
+            return 1.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+
+class ProgressTracker:
+    """
+    Reports ``ParseProgress`` to ``callback`` as wrapped buffers are read
+    and wrapped frame sources are consumed.
+    """
+    def __init__(self, total_bytes: int, callback: Callable[[ParseProgress], None]) -> None:
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.rows = 0
+        self._callback = callback
+
+    def _report(self) -> None:
+        self._callback(ParseProgress(self.bytes_read, self.total_bytes, self.rows))
+
+    def _on_read(self, n: int) -> None:
+        self.bytes_read += n
+        self._report()
+
+    def add(self, n_bytes: int, rows: int) -> None:
+        """Count bytes and rows parsed elsewhere, e.g. a scanned shard."""
+        self.bytes_read += n_bytes
+        self.rows += rows
+        self._report()
+
+    def reads(self, buf: BinaryIO) -> BinaryIO:
+        return _CountingFile(buf, self._on_read)
+
+    def rows_of(self, src: FrameSource) -> FrameSource:
+        if isinstance(src, pd.DataFrame):
+            self.rows += len(src)
+            self._report()
+            return src
+        return self._counted(src)
+
+    def _counted(self, chunks) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            self.rows += len(chunk)
+            self._report()
+            yield chunk
+
+
+# Worksheet selector: a sheet name or a 0-based index (None = first sheet)
+SheetSelector = Union[str, int, None]
+
+
+def _worksheet(wb, sheet: SheetSelector):
+    if sheet is None:
+        return wb.worksheets[0]
+    if sheet in wb.sheetnames:
+        return wb[sheet]
+    if str(sheet).isdigit() and int(sheet) < len(wb.worksheets):
+        return wb.worksheets[int(sheet)]
+    raise ValueError(f"Worksheet {sheet!r} not found")
+
+
+def _xlsx_frame(names: List[str], rows: List[List[Any]], dtype) -> pd.DataFrame:
+    # TextParser is what read_excel uses, so types are inferred the same way
+    return TextParser([names, *rows], header=0, dtype=dtype).read()
+
+
+def iter_xlsx(
+    buf: BinaryIO,
+    *,
+    sheet: SheetSelector = None,
+    chunksize: Optional[int] = None,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, str]] = None,
+    header_only: bool = False,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a worksheet in read-only mode as DataFrame chunks of
+    ``chunksize`` rows (``config.XLSX_CHUNK_ROWS`` by default), keeping
+    only ``usecols``. Cells are converted as ``read_excel`` converts them,
+    and like it, blank rows come out as all-missing rows unless they
+    trail the data. Always yields at least one (possibly empty) chunk.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import ERROR_CODES
+
+    def _cell(value: Any) -> Any:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value in ERROR_CODES:
+            return np.nan
+        return value
+
+    size = chunksize or config.XLSX_CHUNK_ROWS
+    wb = load_workbook(buf, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = _worksheet(wb, sheet).iter_rows(values_only=True)
+        header = [_cell(v) for v in next(rows, ())]
+        while header and header[-1] == "":
+            header.pop()
+        keep = [i for i, name in enumerate(header) if usecols is None or name in usecols]
+        names = [header[i] for i in keep]
+
+        chunk: List[List[Any]] = []
+        emitted = False
+        blank = 0  # blank rows held back until a row with data follows
+        for row in ([] if header_only else rows):
+            if all(v is None or v == "" for v in row):
+                blank += 1
+                continue
+            chunk.extend([[""] * len(keep)] * blank)
+            blank = 0
+            chunk.append([_cell(row[i]) if i < len(row) else "" for i in keep])
+            if len(chunk) >= size:
+                yield _xlsx_frame(names, chunk, dtype)
+                chunk, emitted = [], True
+        if chunk or not emitted:
+            yield _xlsx_frame(names, chunk, dtype)
+    finally:
+        wb.close()
+
+
+# Arrow → pandas conversion of columnar uploads: dates and times as
+# datetime64[ns], like parsed text, and one block per column, so numeric
+# columns without nulls need not be copied into a consolidated block
+_TO_PANDAS = dict(date_as_object=False, coerce_temporal_nanoseconds=True, split_blocks=True)
+
+
+class ColumnSummary(NamedTuple):
+    """What a columnar upload's metadata tells of a column, without reading it."""
+    nulls: Optional[int]  # None when unknown
+    dtype: Any  # as converted to pandas, nulls included
+    # min/max of a date or timestamp column, if known (None, None when all null)
+    bounds: Optional[Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ValueError("Parquet and Arrow uploads need pyarrow installed") from None
+    return pyarrow
+
+
+def _arrow_input(buf: BinaryIO):
+    """
+    A pyarrow input over ``buf`` that does not copy it: spooled uploads
+    are memory-mapped by Arrow, in-memory ones wrapped as they are.
+    """
+    pa = _pyarrow()
+    if isinstance(buf, _MappedFile):
+        return pa.memory_map(buf.path)
+    if isinstance(buf, io.BytesIO):
+        return pa.BufferReader(buf.getvalue())  # the bytes it was made of
+    return pa.PythonFile(buf, mode="r")
+
+
+def _bounds(pa, low: Optional[int], high: Optional[int], type_) -> Tuple[Any, Any]:
+    """Timestamps of the (min, max) of a date or timestamp column, given as stored integers."""
+    storage = pa.int32() if type_.bit_width == 32 else pa.int64()
+    values = pa.array([low, high], storage).view(type_)
+    low, high = values.to_pandas(date_as_object=False, coerce_temporal_nanoseconds=True)
+    return (None if pd.isna(low) else low), (None if pd.isna(high) else high)
+
+
+class ArrowUpload:
+    """
+    A Parquet or Arrow IPC (file or stream format) upload, told apart by
+    its magic bytes and read through pyarrow without copying the upload:
+    Arrow IPC record batches point into it, Parquet pages are decoded
+    straight from it. Only the columns asked for are read.
+    """
+    def __init__(self, buf: BinaryIO) -> None:
+        pa = self._pa = _pyarrow()
+        self._input = _arrow_input(buf)
+        magic = self._input.read(6)
+        self._input.seek(0)
+        self._parquet = None
+        self._reader = None
+        self._table = None
+        if magic[:4] == b"PAR1":
+            self._parquet = pa.parquet.ParquetFile(self._input)
+            schema = self._parquet.schema_arrow
+        else:
+            open_ipc = pa.ipc.open_file if magic == b"ARROW1" else pa.ipc.open_stream
+            self._reader = open_ipc(self._input)
+            schema = self._reader.schema
+        self._set_schema(schema)
+
+    @classmethod
+    def of_table(cls, table) -> "ArrowUpload":
+        """Record batches already in memory, e.g. received over Arrow Flight (see ``flight``)."""
+        upload = cls.__new__(cls)
+        upload._pa = _pyarrow()
+        upload._parquet = upload._reader = None
+        upload._table = table
+        upload._set_schema(table.schema)
+        return upload
+
+    def _set_schema(self, schema) -> None:
+        self.schema = schema
+        # pandas index columns are not data
+        index = (schema.pandas_metadata or {}).get("index_columns", [])
+        self.names = [name for name in schema.names if name not in index]
+
+    @property
+    def table(self):
+        """The whole IPC upload: record batches over the upload's memory."""
+        if self._table is None:
+            self._table = self._reader.read_all()
+        return self._table
+
+    @property
+    def num_rows(self) -> int:
+        if self._parquet is not None:
+            return self._parquet.metadata.num_rows
+        return self.table.num_rows
+
+    def _convert(self, table, dtype: Optional[Dict[str, str]]) -> pd.DataFrame:
+        df = table.to_pandas(**_TO_PANDAS)
+        return df.astype(dtype) if dtype else df
+
+    def frames(
+        self,
+        columns: Optional[List[str]] = None,
+        dtype: Optional[Dict[str, str]] = None,
+        chunksize: Optional[int] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        The ``columns`` (default: all) as row chunks – of ``chunksize``
+        rows, else a chunk per Parquet row group or IPC record batch – in
+        the planned ``dtype``.
+        """
+        pa = self._pa
+        columns = self.names if columns is None else columns
+        if self._parquet is not None:
+            if chunksize:
+                batches = self._parquet.iter_batches(batch_size=chunksize, columns=columns)
+                tables = (pa.Table.from_batches([batch]) for batch in batches)
+            else:
+                tables = (
+                    self._parquet.read_row_group(i, columns=columns)
+                    for i in range(self._parquet.num_row_groups)
+                )
+        else:
+            selected = self.table.select(columns)
+            tables = (
+                pa.Table.from_batches([batch], schema=selected.schema)
+                for batch in selected.to_batches(max_chunksize=chunksize)
+            )
+        emitted = False
+        for table in tables:
+            if table.num_rows:
+                emitted = True
+                yield self._convert(table, dtype)
+        if not emitted:
+            yield self._convert(self.schema.empty_table().select(columns), dtype)
+
+    def summary(
+        self, columns: List[str], dtype: Optional[Dict[str, str]] = None
+    ) -> Dict[str, ColumnSummary]:
+        """
+        Null counts, dtypes and date ranges of ``columns`` from metadata:
+        Parquet row-group statistics (where the writer kept them), else
+        the null counts Arrow keeps per array, and Arrow's min/max over
+        the IPC upload's date and time columns.
+        """
+        pa = self._pa
+        out = {}
+        for name in columns:
+            field = self.schema.field(name)
+            temporal = pa.types.is_timestamp(field.type) or pa.types.is_date(field.type)
+            nulls, bounds = (
+                self._parquet_figures(name, field.type, temporal)
+                if self._parquet is not None
+                else self._ipc_figures(name, field.type, temporal)
+            )
+            # a null turns integers into floats and booleans into objects
+            probe = pa.nulls(1 if nulls else 0, field.type)
+            converted = pa.table({name: probe}).to_pandas(**_TO_PANDAS)
+            if dtype and name in dtype:
+                converted = converted.astype({name: dtype[name]})
+            out[name] = ColumnSummary(nulls, converted[name].dtype, bounds if temporal else None)
+        return out
+
+    def _parquet_figures(self, name: str, type_, temporal: bool):
+        pa = self._pa
+        meta = self._parquet.metadata
+        paths = [meta.schema.column(j).path for j in range(meta.num_columns)]
+        if len(paths) != len(self.schema) or name not in paths:
+            return None, None  # nested columns: no flat statistics
+        j = paths.index(name)
+        nulls, lows, highs = 0, [], []
+        for i in range(meta.num_row_groups):
+            group = meta.row_group(i)
+            stats = group.column(j).statistics
+            if stats is None or not stats.has_null_count:
+                return None, None
+            nulls += stats.null_count
+            if stats.null_count == group.num_rows:
+                continue
+            if not temporal or not stats.has_min_max:
+                temporal = False
+                continue
+            lows.append(stats.min_raw)
+            highs.append(stats.max_raw)
+        if not temporal:
+            return nulls, None
+        if not lows:
+            return nulls, (None, None)
+        return nulls, _bounds(pa, min(lows), max(highs), type_)
+
+    def _ipc_figures(self, name: str, type_, temporal: bool):
+        pa = self._pa
+        values = self.table.column(name)
+        if not temporal:
+            return values.null_count, None
+        extremes = pa.compute.min_max(values)
+        return values.null_count, _bounds(pa, extremes["min"].value, extremes["max"].value, type_)
+
+
+def _cached(filename: str, digest: Optional[str]):
+    """The parse cache, if ``filename`` is worth caching (Excel only)."""
+    if digest is None or not filename.lower().endswith(".xlsx"):
+        return None
+    return frame_cache()
+
+
+def read_header(
+    filename: str,
+    buf: BinaryIO,
+    *,
+    sheet: SheetSelector = None,
+    digest: Optional[str] = None,
+) -> List[str]:
+    """
+    Column names of an uploaded file, leaving ``buf`` where it was.
+    Excel headers are cached under the upload's ``digest``.
+    """
+    cache = _cached(filename, digest)
+    if cache is not None:
+        key = frame_key(digest, "header", sheet)
+        header = cache.get_header(key)
+        if header is not None:
+            return header
+
+    pos = buf.tell()
+    try:
+        if filename.lower().endswith(".xlsx"):
+            header = list(next(iter_xlsx(buf, sheet=sheet, header_only=True)).columns)
+        elif is_arrow(filename):
+            header = ArrowUpload(buf).names
+        else:
+            header = list(pd.read_csv(buf, nrows=0).columns)
+    finally:
+        buf.seek(pos)
+
+    if cache is not None:
+        cache.put_header(key, header)
+    return header
+
+
+def read_upload(
+    filename: str,
+    buf: BinaryIO,
+    *,
+    chunksize: Optional[int] = None,
+    columns: Optional[ColumnPlan] = None,
+    header: Optional[List[str]] = None,
+    sheet: SheetSelector = None,
+    digest: Optional[str] = None,
+) -> FrameSource:
+    """
+    Parse an uploaded file according to its extension.
+
+    With ``chunksize`` CSV files come back as a lazy iterator of row chunks;
+    Excel workbooks are always streamed that way (see ``iter_xlsx``), from
+    the worksheet picked by ``sheet``, and so are Parquet and Arrow IPC
+    files (see ``ArrowUpload``). ``buf`` must stay open until the
+    chunks are consumed. With ``columns`` only the planned columns are
+    parsed, with the planned dtypes; if the header has none of them the
+    file is read as is. Pass ``header`` if it was already read.
+
+    Given the upload's ``digest``, parsed Excel chunks are served from (or
+    written to) the on-disk parse cache, so identical re-uploads skip
+    parsing.
+    """
+    usecols, dtype = None, None
+    if columns is not None:
+        if header is None:
+            header = read_header(filename, buf, sheet=sheet)
+        usecols, dtype = columns.resolve(header)
+        if not usecols:
+            usecols, dtype = None, None
+
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return pd.read_csv(buf, chunksize=chunksize, usecols=usecols, dtype=dtype)
+    elif name.endswith(".xlsx"):
+        cache = _cached(filename, digest)
+        if cache is None:
+            return iter_xlsx(buf, sheet=sheet, chunksize=chunksize, usecols=usecols, dtype=dtype)
+        key = frame_key(digest, sheet, chunksize or config.XLSX_CHUNK_ROWS, usecols, dtype)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        return cache.store(
+            key, iter_xlsx(buf, sheet=sheet, chunksize=chunksize, usecols=usecols, dtype=dtype)
+        )
+    elif is_arrow(name):
+        return ArrowUpload(buf).frames(usecols, dtype, chunksize)
+    raise ValueError(UNSUPPORTED_MSG)
@@ -1,6 +1,11 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import config
+from .executor import shutdown_executor
+from .jobs import job_worker, stop_job_worker
 from .routes import router
 
 app = FastAPI(
@@ -21,6 +26,24 @@ app.add_middleware(
 # Include the API routes
 app.include_router(router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def startup():
+    # resume jobs left unfinished by a previous run
+    job_worker()
+    if config.FLIGHT_PORT:
+        # pyarrow.flight is only needed by the Flight front end
+        from .flight import start_flight_server
+        # validations share the executor slots of the HTTP routes
+        start_flight_server(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_job_worker()
+    if config.FLIGHT_PORT:
+        from .flight import stop_flight_server
+        stop_flight_server()
+    shutdown_executor()
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,193 @@
+"""
+Registry of validation pipelines.
+
+Pipelines register by name with a lazy target: a "module:attribute"
+reference to a ``Pipeline``, a ``Plan`` or a rule spec, imported (or
+compiled) the first time the pipeline is used. A worker only pays for
+the pipelines it actually serves, however many are installed. Besides
+the built-ins, pipelines are discovered from
+
+- the ``data_upload_service.pipelines`` entry point group of installed
+  packages: entry point name → "module:attribute";
+- ``config.PIPELINE_DIR``: one rule spec per ``.json`` file (``.yaml``
+  too if PyYAML is installed), named after the file. Besides the rules
+  a spec may give "columns" (``ColumnPlan`` arguments by DataFrame key)
+  and "cost".
+
+Explicit ``register`` calls take precedence over discovered pipelines.
+They are per process, so with the process executor register from a
+module every worker imports.
+"""
+import functools
+import importlib
+import importlib.util
+import json
+import os
+import threading
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import config
+from .cache import content_key
+from .validators.base import ColumnPlan
+from .validators.engine import Pipeline, Plan, compile_plan
+
+ENTRY_POINT_GROUP = "data_upload_service.pipelines"
+
+_BUILTIN = {
+    "category_forecasting": ".validators.category_forecasting:PIPELINE",
+    "promo_intensity": ".validators.promo_intensity:PIPELINE",
+    "mmm": ".validators.mmm:PIPELINE",
+}
+
+# Loads a pipeline, returning it with a version stamp for cache keys
+# (empty for code covered by ``ruleset_version``)
+Loader = Callable[[], Tuple[Pipeline, str]]
+
+_lock = threading.RLock()
+_registered: Dict[str, Loader] = {}
+_discovered: Dict[str, Loader] = {}
+_loaded: Dict[str, Tuple[Pipeline, str]] = {}
+_scanned = False
+
+
+def pipeline_from_spec(spec: Dict[str, Any]) -> Pipeline:
+    """Compile a rule spec, with its optional "columns" and "cost", into a pipeline."""
+    columns = {key: ColumnPlan(**kwargs) for key, kwargs in spec.get("columns", {}).items()}
+    return Pipeline(compile_plan(spec), columns, float(spec.get("cost", 1.0)))
+
+
+def _as_pipeline(target: Any) -> Pipeline:
+    if isinstance(target, Pipeline):
+        return target
+    if isinstance(target, Plan):
+        return Pipeline(target)
+    if isinstance(target, dict):
+        return pipeline_from_spec(target)
+    raise TypeError(f"Not a pipeline: {target!r}")
+
+
+def _import(ref: str) -> Any:
+    module, _, attr = ref.partition(":")
+    return getattr(importlib.import_module(module, package=__package__), attr)
+
+
+def _load_ref(ref: str, version: str = "") -> Tuple[Pipeline, str]:
+    return _as_pipeline(_import(ref)), version
+
+
+def _load_entry_point(ep: metadata.EntryPoint) -> Tuple[Pipeline, str]:
+    version = f"{ep.dist.name}=={ep.dist.version}" if ep.dist is not None else ep.value
+    return _as_pipeline(ep.load()), version
+
+
+def _load_file(path: str) -> Tuple[Pipeline, str]:
+    with open(path, "rb") as f:
+        blob = f.read()
+    if path.endswith(".json"):
+        spec = json.loads(blob)
+    else:
+        import yaml
+        spec = yaml.safe_load(blob)
+    return pipeline_from_spec(spec), content_key(blob)
+
+
+def _spec_suffixes() -> Tuple[str, ...]:
+    if importlib.util.find_spec("yaml") is None:
+        return (".json",)
+    return (".json", ".yaml", ".yml")
+
+
+def _scan() -> None:
+    """List the discoverable pipelines, without loading any."""
+    # caller holds the lock
+    global _scanned
+    if _scanned:
+        return
+    found: Dict[str, Loader] = {
+        name: functools.partial(_load_ref, ref) for name, ref in _BUILTIN.items()
+    }
+    for ep in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        found[ep.name] = functools.partial(_load_entry_point, ep)
+    if config.PIPELINE_DIR and os.path.isdir(config.PIPELINE_DIR):
+        suffixes = _spec_suffixes()
+        for filename in sorted(os.listdir(config.PIPELINE_DIR)):
+            name, suffix = os.path.splitext(filename)
+            if suffix.lower() in suffixes:
+                path = os.path.join(config.PIPELINE_DIR, filename)
+                found[name] = functools.partial(_load_file, path)
+    _discovered.update(found)
+    _scanned = True
+
+
+def register(name: str, target: Any, *, version: str = "") -> None:
+    """
+    Register (or replace) pipeline ``name``. ``target`` is a
+    "module:attribute" reference, resolved on first use, or a
+    ``Pipeline``, ``Plan`` or rule spec. Give a ``version`` that changes
+    with the rules of code outside this service, so stale cached reports
+    are not served.
+    """
+    with _lock:
+        if isinstance(target, str):
+            _registered[name] = functools.partial(_load_ref, target, version)
+        else:
+            _registered[name] = lambda: (_as_pipeline(target), version)
+        _loaded.pop(name, None)
+
+
+def refresh() -> None:
+    """Forget discovered and loaded pipelines, e.g. after ``PIPELINE_DIR`` changed."""
+    global _scanned
+    with _lock:
+        _discovered.clear()
+        _loaded.clear()
+        _scanned = False
+
+
+def pipeline_names() -> List[str]:
+    """Names of every registered or discoverable pipeline."""
+    with _lock:
+        _scan()
+        return sorted({*_registered, *_discovered})
+
+
+def _get(name: str) -> Tuple[Pipeline, str]:
+    with _lock:
+        if name not in _loaded:
+            _scan()
+            loader = _registered.get(name) or _discovered.get(name)
+            if loader is None:
+                raise ValueError(f"Unknown pipeline: {name}")
+            _loaded[name] = loader()
+        return _loaded[name]
+
+
+def get_pipeline(name: str) -> Pipeline:
+    """The pipeline called ``name``, loaded on first use."""
+    return _get(name)[0]
+
+
+def pipeline_version(name: str) -> str:
+    """Version stamp of a pipeline's rules for cache keys ("" if unknown)."""
+    try:
+        return _get(name)[1]
+    except ValueError:
+        return ""
+
+
+def expected_keys(name: str) -> List[str]:
+    """The DataFrame keys pipeline ``name`` expects (["data"] if unknown)."""
+    try:
+        return get_pipeline(name).keys
+    except ValueError:
+        return ["data"]
+
+
+def request_timeout(name: str) -> float:
+    """``config.TIMEOUT_S`` scaled by the pipeline's cost hint."""
+    try:
+        cost = get_pipeline(name).cost
+    except ValueError:
+        cost = 1.0
+    return config.TIMEOUT_S * cost
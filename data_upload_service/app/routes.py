@@ -1,54 +1,225 @@
-import pandas as pd
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from typing import Dict, List, Optional
+import asyncio
+import contextlib
+import hashlib
+import queue
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
 import json
-import io
 
-from .schemas import ValidationResponse, ValidationRequest, ValidationReportRow
-from .validator_dispatcher import dispatch_validation
+from . import config
+from .cache import content_key, report_cache
+from .executor import event_queue, in_flight, run_blocking, run_coalesced, run_within
+from .jobs import Job, job_store, job_worker
+from .loaders import (
+    UNSUPPORTED_MSG, Upload, file_key, is_supported, release, spool_stream, spool_upload,
+)
+from .pipelines import pipeline_version, request_timeout
+from .schemas import (
+    CacheStatsResponse, JobResponse, RateEstimate, ValidationResponse, ValidationRequest,
+    ValidationReportRow,
+)
+from .validator_dispatcher import (
+    InvalidBody, RecordsRequest, dispatch_frames, dispatch_ndjson, dispatch_streaming,
+    dispatch_uploads, parse_records, ruleset_version, sample_size, uploads_key,
+)
 
 router = APIRouter()
 
-@router.post("/validate", response_model=ValidationResponse)
-async def validate_data(request: ValidationRequest):
+def _to_response(report) -> ValidationResponse:
+    """Convert ValidationReport to response schema"""
+    return ValidationResponse(
+        ok=report.ok,
+        rows=[
+            ValidationReportRow(
+                check=row["check"],
+                status=row["status"],
+                msg=row["msg"],
+                column=row["column"]
+            )
+            for row in report.rows()
+        ],
+        estimates=[
+            RateEstimate(check=row["check"], column=row["column"], **row["interval"])
+            for row in report.rows() if "interval" in row
+        ] or None,
+    )
+
+async def _cached_validation(key: str, timeout: float, fn, *args, **kwargs):
+    """
+    Run a validation on the executor, within ``timeout`` seconds, unless
+    its report is cached. Concurrent requests for the same ``key`` share
+    one run.
+    """
+    cache = report_cache()
+    report = await cache.get_async(key)
+    if report is None:
+        report = await run_coalesced(key, fn, *args, timeout=timeout, **kwargs)
+        await cache.put_async(key, report)
+    return report
+
+async def _receive_uploads(pipeline, files, file_keys, received) -> Dict[str, Upload]:
+    """Spool uploaded files by DataFrame key, appending each to ``received``."""
+    # Parse file_keys if provided
+    keys = {}
+    if file_keys:
+        keys = json.loads(file_keys)
+
+    uploads = {}
+    for i, file in enumerate(files):
+        # Determine the key for this file
+        key = file_key(pipeline, i, len(files), keys)
+
+        if not is_supported(file.filename):
+            raise HTTPException(status_code=400, detail=UNSUPPORTED_MSG)
+
+        # Large uploads are spooled to disk and memory-mapped by the parser
+        upload = await spool_upload(file)
+        received.append(upload)
+        uploads[key] = upload
+    return uploads
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        status=job.status,
+        progress=job.progress,
+        created_at=datetime.fromtimestamp(job.created_at, timezone.utc),
+        updated_at=datetime.fromtimestamp(job.updated_at, timezone.utc),
+        error=job.error,
+        result=_to_response(job.report) if job.report is not None else None,
+    )
+
+def _timeout_error(timeout: float) -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail=f"Validation did not finish within {timeout:g}s"
+    )
+
+# Content types of a /validate body of newline-delimited JSON records
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+
+# /validate reads its body itself, so it is documented here
+_VALIDATE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": ValidationRequest.model_json_schema()},
+            **{
+                content_type: {"schema": {"type": "string", "format": "binary"}}
+                for content_type in NDJSON_TYPES
+            },
+        },
+    }
+}
+
+async def _records_request(http_request: Request) -> RecordsRequest:
+    """
+    The JSON body, parsed and validated by pydantic and turned into
+    DataFrames – on the executor, as that takes seconds for large bodies.
+    """
+    body = await http_request.body()
+    try:
+        return await run_blocking(parse_records, body)
+    except InvalidBody as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors]
+        )
+    except asyncio.TimeoutError:
+        raise _timeout_error(config.TIMEOUT_S)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=20).hexdigest()
+
+@router.post("/validate", response_model=ValidationResponse, openapi_extra=_VALIDATE_BODY)
+async def validate_data(
+    http_request: Request,
+    pipeline: Optional[str] = Query(None, description="NDJSON bodies: the pipeline to use"),
+    dataset: str = Query("data", description="NDJSON bodies: the DataFrame key of the records"),
+    fail_fast: bool = Query(False, description="NDJSON bodies: stop at the first failed check"),
+    mode: Literal["full", "sample"] = Query(
+        "full", description="NDJSON bodies: 'sample' for a quick check (see ValidationRequest)"
+    ),
+):
     """
     Validate data for a specific pipeline.
     
-    Accepts JSON data with pipeline type and data frames.
+    Accepts JSON data with pipeline type and data frames, each a list of
+    records or column-oriented (``{"columns": {name: values}}``) – or a
+    body of newline-delimited JSON records (``Content-Type:
+    application/x-ndjson``) for one data frame, with the pipeline and
+    options as query parameters.
     """
+    content_type = http_request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        if pipeline is None:
+            raise RequestValidationError([
+                {"type": "missing", "loc": ("query", "pipeline"), "msg": "Field required", "input": None}
+            ])
+        return await _validate_ndjson(http_request, pipeline, dataset, fail_fast, mode)
+    request = await _records_request(http_request)
+
+    # Heavier pipelines get proportionally longer
+    timeout = request_timeout(request.pipeline)
     try:
-        # Convert the dictionary data to pandas DataFrames
-        dataframes = {}
-        for key, data_list in request.data.items():
-            if data_list:  # Only process non-empty lists
-                dataframes[key] = pd.DataFrame(data_list)
-        
-        # Dispatch to the appropriate validator
-        report = dispatch_validation(request.pipeline, dataframes)
-        
-        # Convert ValidationReport to response schema
-        response = ValidationResponse(
-            ok=report.ok,
-            rows=[
-                ValidationReportRow(
-                    check=row["check"],
-                    status=row["status"],
-                    msg=row["msg"],
-                    column=row["column"]
-                )
-                for row in report.rows()
-            ]
+        # Identical request bodies share one cached report; hashed on a
+        # thread, which a large body keeps busy for a while
+        body = await asyncio.to_thread(_digest, await http_request.body())
+        key = content_key(
+            "records", ruleset_version(), pipeline_version(request.pipeline), request.pipeline,
+            sample_size(request.mode), body,
+        )
+
+        # Validate the DataFrames on the executor
+        report = await _cached_validation(
+            key, timeout, dispatch_frames, request.pipeline, request.frames,
+            fail_fast=request.fail_fast, mode=request.mode,
         )
-        return response
+        return _to_response(report)
 
+    except asyncio.TimeoutError:
+        raise _timeout_error(timeout)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+async def _validate_ndjson(
+    http_request: Request, pipeline: str, dataset: str, fail_fast: bool, mode: str
+) -> ValidationResponse:
+    """Validate an NDJSON body, spooled to disk as it streams in if large."""
+    received = []
+    key = None
+    timeout = request_timeout(pipeline)
+    try:
+        upload = await spool_stream("body.ndjson", http_request.stream())
+        received.append(upload)
+        uploads = {dataset: upload}
+
+        key = uploads_key(pipeline, uploads, fail_fast=fail_fast, mode=mode)
+        report = await _cached_validation(
+            key, timeout, dispatch_ndjson, pipeline, uploads, fail_fast=fail_fast, mode=mode,
+        )
+        return _to_response(report)
+
+    except asyncio.TimeoutError:
+        raise _timeout_error(timeout)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        _release_when_done(key, received)
+
 @router.post("/validate/file", response_model=ValidationResponse)
 async def validate_file(
     pipeline: str = Form(...),
     files: List[UploadFile] = File(...),
-    file_keys: Optional[str] = Form(None)
+    file_keys: Optional[str] = Form(None),
+    chunksize: Optional[int] = Form(None, gt=0),
+    sheet: Optional[str] = Form(None),
+    fail_fast: bool = Form(False),
+    mode: Literal["full", "sample"] = Form("full")
 ):
     """
     Validate data from CSV file uploads.
@@ -56,63 +227,224 @@ async def validate_file(
     - pipeline: The validation pipeline to use
     - files: CSV files to validate
     - file_keys: Optional JSON string mapping file indices to keys (for MMM)
+    - chunksize: Optional row count; CSV files are then streamed in chunks
+      of this size instead of being loaded whole (Excel files always are)
+    - sheet: Optional worksheet name or 0-based index for Excel files
+    - fail_fast: Stop at the first failed check
+    - mode: 'sample' for a quick check – header checks, then missing,
+      type-coercion and duplicate rates estimated from a random sample of
+      the rows, with 95% confidence intervals
     """
+    # Files received so far, released whatever happens
+    received = []
+    key = None
+    timeout = request_timeout(pipeline)
     try:
-        # Parse file_keys if provided
-        keys = {}
-        if file_keys:
-            keys = json.loads(file_keys)
-        
-        # Process files into DataFrames
-        dataframes = {}
-        
-        for i, file in enumerate(files):
-            # Read file content
-            content = await file.read()
-            
-            # Determine the key for this file
-            if str(i) in keys:
-                key = keys[str(i)]
-            elif len(files) == 1:
-                key = "data"
-            elif i == 0:
-                key = "media" if pipeline == "mmm" else "data"
-            elif i == 1 and pipeline == "mmm":
-                key = "sales"
-            else:
-                key = f"data_{i}"
-                
-            # Convert to DataFrame
-
-
-            # Detect file extension and load accordingly
-            if file.filename.lower().endswith(".csv"):
-                df = pd.read_csv(io.BytesIO(content))
-            elif file.filename.lower().endswith(".xlsx"):
-                df = pd.read_excel(io.BytesIO(content))
-            else:
-                raise HTTPException(status_code=400, detail="Unsupported file type. Please upload .csv or .xlsx")
-
-
-            dataframes[key] = df
-        
-        # Dispatch to the appropriate validator
-        report = dispatch_validation(pipeline, dataframes)
-        
-        # Convert ValidationReport to response schema
-        response = ValidationResponse(
-            ok=report.ok,
-            rows=[
-                ValidationReportRow(
-                    check=row["check"],
-                    status=row["status"],
-                    msg=row["msg"],
-                    column=row["column"]
-                )
-                for row in report.rows()
-            ]
+        # Collect the raw uploads; parsing happens on the executor
+        uploads = await _receive_uploads(pipeline, files, file_keys, received)
+
+        key = uploads_key(
+            pipeline, uploads, chunksize=chunksize, sheet=sheet, fail_fast=fail_fast, mode=mode
         )
-        return response
+        report = await _cached_validation(
+            key, timeout, dispatch_uploads, pipeline, uploads,
+            chunksize=chunksize, sheet=sheet, fail_fast=fail_fast, mode=mode,
+        )
+        return _to_response(report)
 
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise _timeout_error(timeout)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        _release_when_done(key, received)
+
+def _release_all(received: List[Upload]) -> None:
+    for upload in received:
+        release(upload)
+
+def _release_when_done(key: Optional[str], received: List[Upload]) -> None:
+    """Release a request's uploads – once the shared run for ``key``, if any, is over."""
+    task = in_flight(key) if key is not None else None
+    if task is not None:
+        # the shared run may be reading our uploads, even if this
+        # request was cancelled: release them once it is over
+        task.add_done_callback(lambda _: _release_all(received))
+    else:
+        _release_all(received)
+
+async def _validation_events(
+    pipeline: str,
+    uploads: Dict[str, Upload],
+    received: List[Upload],
+    *,
+    chunksize: Optional[int],
+    sheet: Optional[str],
+    stop_on_fail: bool,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Events of a streamed validation, ending with 'done' or 'error'. The
+    ``received`` uploads are released once the validation is over, even
+    if the client goes away first.
+    """
+    task = None
+    timeout = request_timeout(pipeline)
+    try:
+        # with stop_on_fail a rejected upload's report is cut short
+        key = uploads_key(
+            pipeline, uploads, chunksize=chunksize, sheet=sheet, fail_fast=stop_on_fail
+        )
+        cache = report_cache()
+        report = await cache.get_async(key)
+        streamed = 0
+        if report is None:
+            events = event_queue()
+            task = asyncio.ensure_future(run_within(
+                timeout, dispatch_streaming, events, pipeline, uploads,
+                chunksize=chunksize, sheet=sheet, stop_on_fail=stop_on_fail,
+            ))
+            while True:
+                try:
+                    kind, data = await asyncio.to_thread(events.get, True, 0.05)
+                except queue.Empty:
+                    # every event is queued before the task completes
+                    if task.done():
+                        break
+                    continue
+                streamed += kind == "row"
+                yield kind, data
+
+            try:
+                report = task.result()
+            except asyncio.TimeoutError:
+                yield "error", {"detail": _timeout_error(timeout).detail}
+                return
+            except Exception as e:
+                yield "error", {"detail": str(e)}
+                return
+            if report is None:
+                yield "done", {"ok": False, "stopped": True}
+                return
+            await cache.put_async(key, report)
+
+        # rows not streamed live: a failed preflight or a cached report
+        for row in report.rows()[streamed:]:
+            yield "row", row
+            if stop_on_fail and row["status"] == "fail":
+                yield "done", {"ok": False, "stopped": True}
+                return
+        yield "done", {"ok": report.ok, "stopped": False}
+
+    finally:
+        if task is not None and not task.done():
+            # the client went away: the worker reads the uploads until it
+            # finishes on its own
+            def _finished(t: asyncio.Future) -> None:
+                _release_all(received)
+                if not t.cancelled():
+                    t.exception()
+            task.add_done_callback(_finished)
+        else:
+            _release_all(received)
+
+def _ndjson(kind: str, data: Dict[str, Any]) -> str:
+    return json.dumps({"event": kind, **data}, default=str) + "\n"
+
+def _sse(kind: str, data: Dict[str, Any]) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/validate/file/stream")
+async def validate_file_stream(
+    request: Request,
+    pipeline: str = Form(...),
+    files: List[UploadFile] = File(...),
+    file_keys: Optional[str] = Form(None),
+    chunksize: Optional[int] = Form(None, gt=0),
+    sheet: Optional[str] = Form(None),
+    stop_on_fail: bool = Form(False)
+):
+    """
+    Validate file uploads, streaming report rows as checks complete.
+
+    Takes the same form as /validate/file, plus:
+
+    - stop_on_fail: Stop at the first failed check
+
+    Emits 'row' events (a report row), 'progress' events (bytes_read,
+    total_bytes and rows parsed so far) and finally 'done' (ok, stopped)
+    or 'error' (detail). Rows come as their checks complete: the header
+    checks first, before the data is scanned, then the data checks – in
+    that order rather than the report's. Sent as Server-Sent Events if the request accepts
+    text/event-stream, else as NDJSON with the kind in an "event" field.
+    """
+    received = []
+    try:
+        uploads = await _receive_uploads(pipeline, files, file_keys, received)
+    except HTTPException:
+        _release_all(received)
+        raise
+    except Exception as e:
+        _release_all(received)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    encode = _sse if sse else _ndjson
+    events = _validation_events(
+        pipeline, uploads, received, chunksize=chunksize, sheet=sheet, stop_on_fail=stop_on_fail
+    )
+
+    async def _body():
+        async with contextlib.aclosing(events):
+            async for kind, data in events:
+                yield encode(kind, data)
+
+    return StreamingResponse(
+        _body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+    pipeline: str = Form(...),
+    files: List[UploadFile] = File(...),
+    file_keys: Optional[str] = Form(None),
+    chunksize: Optional[int] = Form(None, gt=0),
+    sheet: Optional[str] = Form(None)
+):
+    """
+    Queue a validation of file uploads and return its job right away.
+
+    Takes the same form as /validate/file; poll /jobs/{id} for the result.
+    """
+    received = []
+    try:
+        uploads = await _receive_uploads(pipeline, files, file_keys, received)
+        job = await asyncio.to_thread(
+            job_store().create, pipeline, uploads, chunksize=chunksize, sheet=sheet
+        )
+        job_worker().wake()
+        return _job_response(job)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # uploads moved into the job store are already gone
+        for upload in received:
+            release(upload)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status, progress and (once done) the report of a validation job."""
+    job = await asyncio.to_thread(job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def cache_stats():
+    """Hit/miss counters of the validation report cache."""
+    return CacheStatsResponse(**report_cache().stats())
@@ -1,19 +1,40 @@
-from typing import Dict, List, Optional, Union, Any
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Union, Any
 from pydantic import BaseModel, Field
 
 class ValidationReportRow(BaseModel):
     check: str
     status: str = Field(
         ...,
-        description="Validation status: 'success', 'success_with_warning', or 'fail'",
-        examples=["success", "success_with_warning", "fail"]
+        description=(
+            "Validation status: 'success', 'success_with_warning', 'fail', or "
+            "'skipped' (a prerequisite check failed)"
+        ),
+        examples=["success", "success_with_warning", "fail", "skipped"]
     )
     msg: Optional[str] = ""
     column: Optional[str] = None
 
+class RateEstimate(BaseModel):
+    check: str
+    column: Optional[str] = None
+    estimate: float = Field(..., description="Estimated rate (0-1)")
+    low: float = Field(..., description="Lower bound of its 95% confidence interval")
+    high: float = Field(..., description="Upper bound of its 95% confidence interval")
+
 class ValidationResponse(BaseModel):
     ok: bool
     rows: List[ValidationReportRow]
+    estimates: Optional[List[RateEstimate]] = Field(
+        None,
+        description="mode=sample: the rates the rows report, with their confidence intervals"
+    )
+
+# A dataset in a JSON request: a list of records, or column-oriented,
+# {"columns": {"Date": [...], "Sales": [...]}}, which skips building and
+# validating a dict per row
+Records = List[Dict[str, Any]]
+Columns = Dict[Literal["columns"], Dict[str, List[Any]]]
 
 class ValidationRequest(BaseModel):
     pipeline: str = Field(
@@ -21,17 +42,57 @@ class ValidationRequest(BaseModel):
         description="Validation pipeline to use",
         examples=["category_forecasting", "mmm", "promo_intensity"]
     )
-    data: Dict[str, List[Dict[str, Any]]] = Field(
+    data: Dict[str, Union[Records, Columns]] = Field(
         ...,
-        description="Data to validate as a dictionary of DataFrames",
+        description=(
+            "Data to validate as a dictionary of DataFrames, each a list of "
+            "records or {\"columns\": {name: values}}"
+        ),
         examples=[
             {
                 "data": [
                     {"Market": "US", "Date": "2023-01-01", "Sales": 100}
                 ]
+            },
+            {
+                "data": {
+                    "columns": {"Market": ["US"], "Date": ["2023-01-01"], "Sales": [100]}
+                }
             }
         ]
     )
+    fail_fast: bool = Field(
+        False,
+        description="Stop at the first failed check; the report ends with it"
+    )
+    mode: Literal["full", "sample"] = Field(
+        "full",
+        description=(
+            "'sample': header checks, then missing, type-coercion and duplicate "
+            "rates estimated from a random sample of the rows"
+        )
+    )
 
 class HealthResponse(BaseModel):
-    status: str = "ok"
\ No newline at end of file
+    status: str = "ok"
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    memory_hits: int
+    disk_hits: int
+    entries: int = Field(..., description="Reports held in memory")
+    bytes: int = Field(..., description="Memory used by those reports")
+
+class JobResponse(BaseModel):
+    id: str
+    status: str = Field(
+        ...,
+        description="Job status: 'queued', 'running', 'done' or 'failed'",
+        examples=["queued", "running", "done", "failed"]
+    )
+    progress: float = Field(..., description="Fraction of the uploads parsed so far (0-1)")
+    created_at: datetime
+    updated_at: datetime
+    error: Optional[str] = None
+    result: Optional[ValidationResponse] = None
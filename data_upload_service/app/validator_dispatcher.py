@@ -1,13 +1,42 @@
+import functools
+import hashlib
+import os
 import pandas as pd
-from typing import Dict, List, Union, Any
+from concurrent.futures import as_completed
+from contextlib import ExitStack
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple, Union, Any
 
-from .validators.category_forecasting import validate_category_forecasting
-from .validators.promo_intensity import validate_promo_intensity
-from .validators.mmm import validate_mmm
+from pydantic import ValidationError
+
+from . import config
+from .cache import content_key
+from .executor import column_executor, in_pool_worker, shard_executor
+from .loaders import (
+    ArrowUpload, ParseProgress, ProgressTracker, SheetSelector, SpooledFile, Upload,
+    csv_ranges, is_arrow, open_source, read_csv_range, read_header, read_ndjson, read_upload,
+    sample_csv, source_size,
+)
+from .pipelines import get_pipeline, pipeline_version
+from .schemas import ValidationRequest
+from .validators.base import (
+    ColumnPlan, DateStats, FrameStats, ValidationReport, column_threads, hash_rows, iter_frames,
+    stream_rows,
+)
+from .validators.engine import AccKey, Plan, Sharded, merge_scans
+from .validators.sampling import Sample, estimate, random_rows, reservoir
+
+# Validation modes: every row, or estimates from a random sample of them
+MODES = ("full", "sample")
+
+# Rows of a sharded CSV read up front: its header chunk for the transform
+# and schema checks, and what shards settle e.g. date formats on
+_SHARD_HEAD_ROWS = 10_000
 
 def dispatch_validation(
     pipeline: str,
-    dfs: Dict[str, pd.DataFrame]
+    dfs: Dict[str, pd.DataFrame],
+    *,
+    fail_fast: bool = False,
 ) -> Any:
     """
     Dispatches validation to the appropriate validator based on the pipeline name.
@@ -15,35 +44,537 @@ def dispatch_validation(
     Parameters
     ----------
     pipeline : str
-        One of 'category_forecasting', 'mmm', 'promo_intensity'
+        A registered pipeline (see ``pipelines``), e.g. 'category_forecasting',
+        'mmm' or 'promo_intensity'
     dfs : Dict[str, pd.DataFrame]
-        Dictionary of DataFrames to validate
+        Dictionary of DataFrames to validate, by the keys the pipeline
+        expects
         • category_forecasting → expects 'data' key
         • promo_intensity → expects 'data' key
         • mmm → expects 'media' and 'sales' keys
+    fail_fast : bool
+        Stop at the first failed check; the report ends with it
     
     Returns
     -------
     ValidationReport
         The validation report
     """
-    if pipeline == "category_forecasting":
-        # For category forecasting, we expect a single DataFrame
-        if "data" not in dfs:
-            raise ValueError("Category forecasting expects a DataFrame with key 'data'")
-        return validate_category_forecasting(dfs["data"])
-    
-    elif pipeline == "promo_intensity":
-        # For promo intensity, we expect a single DataFrame
-        if "data" not in dfs:
-            raise ValueError("Promo intensity expects a DataFrame with key 'data'")
-        return validate_promo_intensity(dfs["data"])
-    
-    elif pipeline == "mmm":
-        # For MMM, we expect two DataFrames: media and sales
-        if "media" not in dfs or "sales" not in dfs:
-            raise ValueError("MMM expects DataFrames with keys 'media' and 'sales'")
-        return validate_mmm(dfs["media"], dfs["sales"])
-    
-    else:
-        raise ValueError(f"Unknown pipeline: {pipeline}")
\ No newline at end of file
+    # independent column work fans out over the shared thread pool
+    with column_threads(column_executor()):
+        return get_pipeline(pipeline).plan.run(dfs, fail_fast=fail_fast)
+
+@functools.lru_cache(maxsize=None)
+def ruleset_version() -> str:
+    """
+    Version stamp of the validation rules: a hash of the validator,
+    dispatcher and loader sources, so cached reports never outlive a
+    change to the code that produced them. Pipelines from elsewhere add
+    their own ``pipeline_version``.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    validators = os.path.join(here, "validators")
+    paths = [
+        os.path.join(here, name)
+        for name in ("validator_dispatcher.py", "loaders.py", "pipelines.py")
+    ]
+    paths += sorted(
+        os.path.join(validators, name)
+        for name in os.listdir(validators) if name.endswith(".py")
+    )
+    h = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def uploads_key(
+    pipeline: str,
+    uploads: Dict[str, Upload],
+    *,
+    chunksize: Optional[int] = None,
+    sheet: SheetSelector = None,
+    fail_fast: bool = False,
+    mode: str = "full",
+) -> str:
+    """Report cache key of a ``dispatch_uploads`` call."""
+    files = sorted(
+        (key, upload.filename.lower().rsplit(".", 1)[-1], upload.digest)
+        for key, upload in uploads.items()
+    )
+    return content_key(
+        "uploads", ruleset_version(), pipeline_version(pipeline), pipeline,
+        chunksize, sheet, fail_fast, mode, sample_size(mode), files,
+    )
+
+
+def sample_size(mode: str) -> Optional[int]:
+    """Rows a validation in ``mode`` samples, for report cache keys (None: all)."""
+    return config.SAMPLE_ROWS if mode == "sample" else None
+
+
+def dispatch_preflight(
+    pipeline: str,
+    headers: Dict[str, List[str]],
+    *,
+    fail_fast: bool = False,
+) -> Optional[ValidationReport]:
+    """
+    Runs the header-only checks of a pipeline.
+
+    Returns None when the headers needed are not all there; the full
+    validation then reports the problem.
+    """
+    return get_pipeline(pipeline).plan.preflight(headers, fail_fast=fail_fast)
+
+
+def dispatch_records(
+    pipeline: str,
+    data: Dict[str, Union[List[Dict[str, Any]], Dict[str, Dict[str, List[Any]]]]],
+    *,
+    fail_fast: bool = False,
+    mode: str = "full",
+) -> Any:
+    """
+    Builds DataFrames from JSON records – or, column-oriented, from
+    ``{"columns": {name: values}}`` – and validates them: all rows, or
+    with ``mode="sample"`` a random sample (see ``dispatch_sample``).
+    Runs on the validation executor (see ``executor.run_blocking``).
+    """
+    return dispatch_frames(pipeline, records_frames(data), fail_fast=fail_fast, mode=mode)
+
+
+def records_frames(
+    data: Dict[str, Union[List[Dict[str, Any]], Dict[str, Dict[str, List[Any]]]]],
+) -> Dict[str, pd.DataFrame]:
+    """The DataFrames of JSON records or columns by key, leaving out empty ones."""
+    dfs = {}
+    for key, data_list in data.items():
+        if isinstance(data_list, dict):
+            data_list = data_list["columns"]
+        if data_list:  # Only process non-empty lists
+            dfs[key] = pd.DataFrame(data_list)
+    return dfs
+
+
+class InvalidBody(ValueError):
+    """A request body that does not fit its schema; ``errors`` as pydantic lists them."""
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(errors)
+        self.errors = errors
+
+
+class RecordsRequest(NamedTuple):
+    """A parsed ``/validate`` JSON body, with its datasets as DataFrames."""
+    pipeline: str
+    frames: Dict[str, pd.DataFrame]
+    fail_fast: bool = False
+    mode: str = "full"
+
+
+def parse_records(body: bytes) -> RecordsRequest:
+    """
+    Parses a ``/validate`` JSON body against ``schemas.ValidationRequest``
+    and builds its DataFrames, to validate with ``dispatch_frames``. Runs
+    on the validation executor: for large bodies this takes seconds.
+    Raises ``InvalidBody`` if the body does not fit the schema.
+    """
+    try:
+        request = ValidationRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise InvalidBody(e.errors()) from None
+    return RecordsRequest(
+        request.pipeline, records_frames(request.data), request.fail_fast, request.mode
+    )
+
+
+def dispatch_ndjson(
+    pipeline: str,
+    uploads: Dict[str, Upload],
+    *,
+    fail_fast: bool = False,
+    mode: str = "full",
+) -> Any:
+    """
+    ``dispatch_records`` for request bodies of newline-delimited JSON
+    records, read straight into columns (see ``loaders.read_ndjson``).
+    Runs on the validation executor.
+    """
+    dfs = {}
+    for key, upload in uploads.items():
+        df = read_ndjson(upload.source)
+        if len(df.columns):
+            dfs[key] = df
+    return dispatch_frames(pipeline, dfs, fail_fast=fail_fast, mode=mode)
+
+
+def dispatch_frames(
+    pipeline: str, dfs: Dict[str, pd.DataFrame], *, fail_fast: bool = False, mode: str = "full"
+) -> Any:
+    """Validates DataFrames by key: all rows, or a random sample of them with ``mode="sample"``."""
+    if mode == "sample":
+        samples = {key: random_rows(df, config.SAMPLE_ROWS) for key, df in dfs.items()}
+        headers = {key: list(df.columns) for key, df in dfs.items()}
+        return dispatch_sample(pipeline, headers, samples, fail_fast=fail_fast)
+    return dispatch_validation(pipeline, dfs, fail_fast=fail_fast)
+
+
+def dispatch_sample(
+    pipeline: str,
+    headers: Dict[str, List[str]],
+    samples: Dict[str, Sample],
+    *,
+    fail_fast: bool = False,
+) -> ValidationReport:
+    """
+    The quick check of ``mode="sample"``: the pipeline's header checks on
+    the full ``headers``, then missing, coercion-failure and duplicate
+    rates estimated from ``samples`` with 95% confidence intervals (see
+    ``validators.sampling``).
+    """
+    return estimate(get_pipeline(pipeline).plan, headers, samples, fail_fast=fail_fast)
+
+
+def _sample_upload(
+    upload: Upload,
+    buf: BinaryIO,
+    header: List[str],
+    columns: Optional[ColumnPlan],
+    sheet: SheetSelector,
+) -> Sample:
+    """
+    ``config.SAMPLE_ROWS`` random rows of an upload, in the planned
+    ``columns``: sought out in a CSV file, else streamed past – whole
+    rows, so duplicates are told on every column.
+    """
+    if upload.filename.lower().endswith(".csv"):
+        return sample_csv(upload.source, config.SAMPLE_ROWS, header=header, columns=columns)
+    src = read_upload(upload.filename, buf, header=header, sheet=sheet, digest=upload.digest)
+    sample = reservoir(iter_frames(src), config.SAMPLE_ROWS)
+    frame = sample.frame
+    if columns is not None:
+        usecols, dtype = columns.resolve(list(frame.columns))
+        if usecols:
+            frame = frame[usecols].astype(dtype)
+    return sample._replace(frame=frame, row_hashes=hash_rows(sample.frame))
+
+
+def dispatch_uploads(
+    pipeline: str,
+    uploads: Dict[str, Upload],
+    *,
+    chunksize: Optional[int] = None,
+    sheet: SheetSelector = None,
+    progress: Optional[Callable[[ParseProgress], None]] = None,
+    fail_fast: bool = False,
+    mode: str = "full",
+) -> Any:
+    """
+    Parses uploaded files – only the columns the pipeline needs – and
+    validates them. Runs on the validation executor (see
+    ``executor.run_blocking``).
+
+    The headers are checked first; if a structural check fails, that
+    report is returned without parsing any data.
+
+    Parameters
+    ----------
+    pipeline : str
+        Validation pipeline name
+    uploads : Dict[str, Upload]
+        DataFrame key → received file
+    chunksize : int, optional
+        Stream CSV files in chunks of this many rows
+    sheet : str or int, optional
+        Worksheet name or index to read from Excel files
+    progress : callable, optional
+        Called with the ``ParseProgress`` as the uploads are parsed
+    fail_fast : bool
+        Stop at the first failed check; the report ends with it
+    mode : str
+        "full", or "sample" to only estimate the data-level figures from
+        a random sample of the rows (see ``dispatch_sample``)
+    """
+    found = get_pipeline(pipeline)
+    with ExitStack() as stack:
+        # buffers stay open for the whole validation: chunked readers are lazy
+        bufs = {
+            key: stack.enter_context(open_source(upload.source))
+            for key, upload in uploads.items()
+        }
+        headers = {
+            key: read_header(upload.filename, bufs[key], sheet=sheet, digest=upload.digest)
+            for key, upload in uploads.items()
+        }
+        if mode == "sample":
+            samples = {
+                key: _sample_upload(upload, bufs[key], headers[key], found.reads(key), sheet)
+                for key, upload in uploads.items()
+            }
+            return dispatch_sample(pipeline, headers, samples, fail_fast=fail_fast)
+
+        # a passing preflight is repeated by the validation: don't stream it
+        with stream_rows(None):
+            preflight = dispatch_preflight(pipeline, headers, fail_fast=fail_fast)
+        if preflight is not None and not preflight.ok:
+            return preflight
+
+        tracker = None
+        raw = dict(bufs)  # columnar uploads are mapped by Arrow, not read through these
+        if progress is not None:
+            total = sum(source_size(upload.source) for upload in uploads.values())
+            tracker = ProgressTracker(total, progress)
+            bufs = {key: tracker.reads(buf) for key, buf in bufs.items()}
+
+        dfs = {}
+        for key, upload in uploads.items():
+            if is_arrow(upload.filename):
+                size = source_size(upload.source)
+                dfs[key] = _columnar(pipeline, key, ArrowUpload(raw[key]), chunksize, tracker, size)
+                continue
+            ranges = _shard_ranges(upload)
+            if ranges:
+                dfs[key] = _sharded(
+                    pipeline, key, upload, bufs[key], headers[key], ranges, tracker
+                )
+                continue
+            src = read_upload(
+                upload.filename, bufs[key],
+                chunksize=chunksize, columns=found.reads(key), header=headers[key],
+                sheet=sheet, digest=upload.digest,
+            )
+            dfs[key] = tracker.rows_of(src) if tracker is not None else src
+        return dispatch_validation(pipeline, dfs, fail_fast=fail_fast)
+
+
+def _shard_ranges(upload: Upload) -> List[Tuple[int, int]]:
+    """
+    Byte ranges to scan a CSV upload in, if it is big enough to shard –
+    and this is the server process: a process-pool worker scans it whole
+    rather than start a shard pool of its own.
+    """
+    source = upload.source
+    if (
+        not config.CSV_SHARD_MIN_BYTES
+        or in_pool_worker()
+        or not isinstance(source, SpooledFile)
+        or source.size < config.CSV_SHARD_MIN_BYTES
+        or not upload.filename.lower().endswith(".csv")
+    ):
+        return []
+    ranges = csv_ranges(source, config.CSV_SHARD_BYTES)
+    return ranges if len(ranges) > 1 else []
+
+
+def _sharded(
+    pipeline: str,
+    key: str,
+    upload: Upload,
+    buf: BinaryIO,
+    header: List[str],
+    ranges: List[Tuple[int, int]],
+    tracker: Optional[ProgressTracker],
+) -> Sharded:
+    """
+    A CSV upload validated in shards: each byte range is scanned on the
+    shard pool and the partial accumulators are merged in file order.
+    """
+    columns = get_pipeline(pipeline).reads(key)
+    head = next(iter(read_upload(
+        upload.filename, buf, chunksize=_SHARD_HEAD_ROWS, columns=columns, header=header,
+    )))
+
+    def _scan(keys: List[AccKey], head: pd.DataFrame) -> Dict[AccKey, Any]:
+        pool = shard_executor()
+        futures = {
+            pool.submit(_scan_shard, pipeline, key, upload.source, start, end, header, keys, head): i
+            for i, (start, end) in enumerate(ranges)
+        }
+        parts: List[Any] = [None] * len(ranges)
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                parts[i], rows = future.result()
+                if tracker is not None:
+                    start, end = ranges[i]
+                    tracker.add(end - start, rows)
+        finally:
+            for future in futures:
+                future.cancel()
+        return merge_scans(parts)
+
+    return Sharded(head, _scan)
+
+
+def _scan_shard(
+    pipeline: str,
+    key: str,
+    source: SpooledFile,
+    start: int,
+    end: int,
+    header: List[str],
+    keys: List[AccKey],
+    head: pd.DataFrame,
+) -> Tuple[Dict[AccKey, Any], int]:
+    """Shard pool task: the accumulators of one byte range, and its row count."""
+    found = get_pipeline(pipeline)
+    rows = 0
+
+    def _counted():
+        nonlocal rows
+        for chunk in read_csv_range(
+            source, start, end, header=header, columns=found.reads(key)
+        ):
+            rows += len(chunk)
+            yield chunk
+
+    return found.plan.scan(key, keys, _counted(), head), rows
+
+
+def _columnar(
+    pipeline: str,
+    key: str,
+    arrow: ArrowUpload,
+    chunksize: Optional[int] = None,
+    tracker: Optional[ProgressTracker] = None,
+    size: int = 0,
+) -> Sharded:
+    """
+    A Parquet or Arrow IPC upload of ``size`` bytes, in the planned
+    columns. What its metadata answers – the ``("stats",)`` profile (row
+    count, null counts, dtypes) and the min/max of date columns stored as
+    dates – is filled from it (see ``ArrowUpload.summary``); the row
+    groups are only read if some accumulator is left, and only for those.
+    """
+    found = get_pipeline(pipeline)
+    usecols, dtype = None, None
+    columns = found.reads(key)
+    if columns is not None:
+        usecols, dtype = columns.resolve(arrow.names)
+    if not usecols:
+        usecols, dtype = arrow.names, None
+    head = next(arrow.frames(usecols, dtype, chunksize=_SHARD_HEAD_ROWS))
+
+    def _scan(keys: List[AccKey], head: pd.DataFrame) -> Dict[AccKey, Any]:
+        accs, rest = _from_metadata(found.plan, key, keys, head, arrow, usecols, dtype)
+        if rest:
+            chunks = arrow.frames(usecols, dtype, chunksize=chunksize)
+            accs.update(found.plan.scan(key, rest, chunks, head))
+        if tracker is not None:
+            tracker.add(size, arrow.num_rows)
+        return accs
+
+    return Sharded(head, _scan)
+
+
+def dispatch_tables(
+    pipeline: str,
+    tables: Dict[str, Any],
+    *,
+    fail_fast: bool = False,
+) -> ValidationReport:
+    """
+    Validates Arrow tables, e.g. the record batches streamed to the
+    Flight front end (see ``flight``), without a copy to text: only the
+    planned columns are converted to pandas, batch by batch, and what
+    their null counts and date ranges answer is not scanned at all (see
+    ``_columnar``).
+    """
+    dfs = {key: _columnar(pipeline, key, ArrowUpload.of_table(table)) for key, table in tables.items()}
+    return dispatch_validation(pipeline, dfs, fail_fast=fail_fast)
+
+
+def _from_metadata(
+    plan: Plan,
+    name: str,
+    keys: List[AccKey],
+    head: pd.DataFrame,
+    arrow: ArrowUpload,
+    usecols: List[str],
+    dtype: Optional[Dict[str, str]],
+) -> Tuple[Dict[AccKey, Any], List[AccKey]]:
+    """
+    The accumulators ``keys`` of dataset ``name`` that ``arrow``'s metadata
+    fills, and the keys left to scan for. Accumulators see the columns
+    under their transformed names: the ``head``'s, in file order.
+    """
+    if len(head.columns) != len(usecols):
+        return {}, keys
+    summary = arrow.summary(usecols, dtype)
+    by_name = {column: summary[raw] for column, raw in zip(head.columns, usecols)}
+    # text dates are parsed before the profile is taken: nulls and dtypes change
+    parse = plan.spec["datasets"][name].get("parse_dates", [])
+    dated = all(
+        pd.api.types.is_datetime64_any_dtype(by_name[column].dtype)
+        for column in parse if column in by_name
+    )
+    n_rows = arrow.num_rows
+    accs: Dict[AccKey, Any] = {}
+    rest = []
+    for key in keys:
+        column = by_name.get(key[1]) if key[0] == "dates" else None
+        if key == ("stats",) and dated and all(c.nulls is not None for c in by_name.values()):
+            accs[key] = FrameStats.known(
+                list(by_name),
+                n_rows,
+                [c.nulls for c in by_name.values()],
+                [c.dtype for c in by_name.values()],
+            )
+        elif column is not None and column.bounds is not None and column.nulls is not None:
+            accs[key] = plan.new_accumulator(name, key)
+            accs[key].dates = DateStats.known(n_rows, n_rows - column.nulls, *column.bounds)
+        else:
+            rest.append(key)
+    return accs, rest
+
+
+class StopValidation(Exception):
+    """Raised by a report row sink to end a validation early."""
+
+
+def dispatch_streaming(
+    events: Any,
+    pipeline: str,
+    uploads: Dict[str, Upload],
+    *,
+    chunksize: Optional[int] = None,
+    sheet: SheetSelector = None,
+    stop_on_fail: bool = False,
+) -> Optional[ValidationReport]:
+    """
+    ``dispatch_uploads``, putting ``(kind, data)`` events on the ``events``
+    queue as it goes: ``("row", row)`` for each report row as its check
+    completes – the header checks first, before the data is scanned, so
+    not quite in report order – and ``("progress", ParseProgress fields)`` while the
+    uploads are parsed (at most once per percent read or chunk parsed).
+
+    Parameters
+    ----------
+    events : queue.Queue
+        Event queue; a manager queue when running on a process pool
+    stop_on_fail : bool
+        Stop validating at the first failed check and return None
+    """
+    last = ParseProgress(0, 0, 0)
+
+    def _row(row: Dict[str, Any]) -> None:
+        events.put(("row", row))
+        if stop_on_fail and row["status"] == "fail":
+            raise StopValidation(row["check"])
+
+    def _progress(progress: ParseProgress) -> None:
+        nonlocal last
+        if progress.rows != last.rows or progress.fraction - last.fraction >= 0.01:
+            last = progress
+            events.put(("progress", progress._asdict()))
+
+    try:
+        with stream_rows(_row):
+            # the plan stops at the same row, skipping the work after it
+            return dispatch_uploads(
+                pipeline, uploads, chunksize=chunksize, sheet=sheet,
+                progress=_progress, fail_fast=stop_on_fail,
+            )
+    except StopValidation:
+        return None
@@ -1,6 +1,76 @@
 from __future__ import annotations
+import contextlib
+import contextvars
+import copy
+from concurrent.futures import Executor
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+# A validator input: either a whole DataFrame or an iterable of row chunks
+# (e.g. the reader returned by ``pd.read_csv(..., chunksize=n)``).
+FrameSource = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+# Receives every row added to any report in the current context
+_row_sink: contextvars.ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = (
+    contextvars.ContextVar("report_row_sink", default=None)
+)
+
+
+@contextlib.contextmanager
+def stream_rows(sink: Optional[Callable[[Dict[str, Any]], None]]) -> Iterator[None]:
+    """
+    Pass each row to ``sink`` as reports built inside the block add it
+    (``None`` mutes an enclosing sink). An exception raised by the sink
+    aborts the validation.
+    """
+    token = _row_sink.set(sink)
+    try:
+        yield
+    finally:
+        _row_sink.reset(token)
+
+
+def emit_rows(rows: Iterable[Dict[str, Any]]) -> None:
+    """Pass ``rows`` to the current ``stream_rows`` sink, if any, without adding them to a report."""
+    sink = _row_sink.get()
+    if sink is not None:
+        for row in rows:
+            sink(row)
+
+
+# Thread pool independent per-column work fans out to (see ``parallel_map``)
+_column_pool: contextvars.ContextVar[Optional[Executor]] = (
+    contextvars.ContextVar("column_pool", default=None)
+)
+
+
+@contextlib.contextmanager
+def column_threads(pool: Optional[Executor]) -> Iterator[None]:
+    """
+    Run independent column work inside the block on the thread pool
+    ``pool`` (``None``: inline). Results, and so reports, do not depend
+    on it.
+    """
+    token = _column_pool.set(pool)
+    try:
+        yield
+    finally:
+        _column_pool.reset(token)
+
+
+def parallel_map(fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+    """
+    ``[fn(item) for item in items]``, on the ``column_threads`` pool if
+    there is one and more than one item. The calls must not depend on
+    each other; most of their time should be spent in NumPy/pandas
+    kernels that release the GIL. Pool threads don't see the pool, so
+    nested calls run inline.
+    """
+    pool = _column_pool.get()
+    if pool is None or len(items) < 2:
+        return [fn(item) for item in items]
+    return list(pool.map(fn, items))
 
 class ValidationReport:
     """
@@ -11,16 +81,28 @@ class ValidationReport:
     def __init__(self) -> None:
         self._rows: list[Dict[str, Any]] = []
 
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "ValidationReport":
+        rep = cls()
+        rep._rows = list(rows)
+        return rep
+
     def add(
         self,
         check: str,
         status: str,
         msg: str = "",
         column: Optional[str] = None,
+        interval: Optional[Dict[str, float]] = None,
     ) -> None:
-        self._rows.append(
-            {"check": check, "status": status, "msg": msg, "column": column}
-        )
+        row = {"check": check, "status": status, "msg": msg, "column": column}
+        if interval is not None:
+            # an estimated rate: {"estimate", "low", "high"} (see ``sampling``)
+            row["interval"] = interval
+        self._rows.append(row)
+        sink = _row_sink.get()
+        if sink is not None:
+            sink(row)
 
     # convenient aliases
     def pass_(self, check: str, msg: str = "") -> None:
@@ -32,6 +114,9 @@ class ValidationReport:
     def fail(self, check: str, msg: str = "", column: str | None = None) -> None:
         self.add(check, "fail", msg, column)
 
+    def skip(self, check: str, msg: str = "") -> None:
+        self.add(check, "skipped", msg)
+
 
     # ---- public API -------------------------------------------
     @property
@@ -43,9 +128,9 @@ class ValidationReport:
 
     # pretty print (optional)
     def __str__(self) -> str:
-        icon = {"pass": "✅", "warn": "⚠️", "fail": "❌"}
+        icon = {"success": "✅", "success_with_warning": "⚠️", "fail": "❌", "skipped": "⏭️"}
         lines = [
-            f"{icon[r['status']]} {r['check']}"
+            f"{icon.get(r['status'], '?')} {r['check']}"
             + (f" ({r['column']})" if r.get("column") else "")
             + (f": {r['msg']}" if r["msg"] else "")
             for r in self._rows
@@ -53,6 +138,563 @@ class ValidationReport:
         overall = "✔︎ PASS" if self.ok else "✖︎ FAIL"
         return "\n".join(lines) + f"\n— {overall} —"
 
+class ColumnPlan:
+    """
+    Columns a validator needs from an uploaded file, and the dtypes to
+    parse them with, so loaders can skip everything else.
+
+    Names match after stripping whitespace – and ignoring case when
+    ``ignore_case`` is set. ``patterns`` select further columns whose
+    lower-cased name contains any of the substrings. With ``all_columns``
+    every column is read, the planned ones with their dtypes.
+    """
+    def __init__(
+        self,
+        columns: Iterable[str] = (),
+        *,
+        dtypes: Optional[Dict[str, str]] = None,
+        patterns: Iterable[str] = (),
+        ignore_case: bool = False,
+        all_columns: bool = False,
+    ) -> None:
+        self.ignore_case = ignore_case
+        self.columns = {self._norm(c) for c in columns}
+        self.dtypes = {self._norm(c): t for c, t in (dtypes or {}).items()}
+        self.patterns = tuple(p.lower() for p in patterns)
+        self.all_columns = all_columns
+
+    def widened(self) -> "ColumnPlan":
+        """The same plan, reading every column."""
+        plan = copy.copy(self)
+        plan.all_columns = True
+        return plan
+
+    def _norm(self, name: str) -> str:
+        name = str(name).strip()
+        return name.lower() if self.ignore_case else name
+
+    def wants(self, name: str) -> bool:
+        return (
+            self.all_columns
+            or self._norm(name) in self.columns
+            or any(p in str(name).lower() for p in self.patterns)
+        )
+
+    def resolve(self, header: List[str]) -> tuple[List[str], Dict[str, str]]:
+        """Raw header names to read, and their parse dtypes."""
+        usecols = [c for c in header if self.wants(c)]
+        dtypes = {c: self.dtypes[self._norm(c)] for c in usecols if self._norm(c) in self.dtypes}
+        return usecols, dtypes
+
+
+def iter_frames(src: FrameSource) -> Iterator[pd.DataFrame]:
+    """Yield the chunks of ``src``; a plain DataFrame is a single chunk."""
+    if isinstance(src, pd.DataFrame):
+        yield src
+    else:
+        yield from src
+
+
+def _merge_dtype(a: Optional[np.dtype], b: np.dtype) -> np.dtype:
+    """Dtype pandas would infer for a column whose chunks had dtypes a and b."""
+    if a is None or a == b:
+        return b
+    if isinstance(a, pd.CategoricalDtype) and isinstance(b, pd.CategoricalDtype):
+        # chunks of a categorical column each hold the categories they saw
+        return pd.CategoricalDtype(a.categories.union(b.categories))
+    numeric = pd.api.types.is_numeric_dtype
+    bool_ = pd.api.types.is_bool_dtype
+    if numeric(a) and numeric(b) and not bool_(a) and not bool_(b):
+        return np.result_type(a, b)
+    return np.dtype(object)
+
+
+# HyperLogLog precision of the distinct-count estimates: 2**p registers
+# per column, for a relative error of about 1.04 / sqrt(2**p) (~3%)
+_HLL_P = 10
+_HLL_M = 1 << _HLL_P
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_M)
+
+# Cells profiled per batch; bounds the temporaries of very wide blocks
+_BATCH_CELLS = 1 << 22
+
+# "no value yet" for the datetime min/max accumulators
+_NO_MIN = np.iinfo(np.int64).max
+_NO_MAX = np.iinfo(np.int64).min
+
+
+def _hash_block(block: np.ndarray) -> np.ndarray:
+    """64-bit hashes of a 2-D block of values, one column per frame column."""
+    if block.dtype.kind in "iufb":
+        # 1 and 1.0 count as one value; murmur3's finaliser mixes the bits
+        h = block.astype(np.float64).view(np.uint64)  # a copy: mixed in place
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xFF51AFD7ED558CCD)
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xC4CEB9FE1A85EC53)
+        h ^= h >> np.uint64(33)
+        return h
+    flat = block.ravel(order="F")
+    return pd.util.hash_array(flat, categorize=False).reshape(block.shape, order="F")
+
+
+def _hash_values(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind in "iufb":
+        return _hash_block(values)
+    # factorised first, so repeated labels are hashed once
+    return pd.util.hash_array(values.astype(object, copy=False), categorize=True)
+
+
+def _hash_column(col: pd.Series) -> np.ndarray:
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # hash the categories, then look them up by code
+        codes = col.cat.codes.to_numpy()
+        table = _hash_values(np.append(col.cat.categories.to_numpy(dtype=object), None))
+        return table[codes]  # code -1 (missing) picks the None entry
+    return _hash_values(col.to_numpy())
+
+
+def hash_rows(df: pd.DataFrame, columns: Optional[List[str]] = None) -> np.ndarray:
+    """
+    64-bit hash of each row's values in ``columns`` (default: all), for
+    hash joins across frames: rows with equal values hash alike whatever
+    the column dtypes (1 and 1.0 included, categorical or not).
+    """
+    h = np.zeros(len(df), dtype=np.uint64)
+    for name in (df.columns if columns is None else columns):
+        col_hash = _hash_column(df[name])
+        # order-sensitive combine (boost's hash_combine)
+        h ^= col_hash + np.uint64(0x9E3779B97F4A7C15) + (h << np.uint64(6)) + (h >> np.uint64(2))
+    return h
+
+
+def _hll_ranks(hashes: np.ndarray) -> tuple:
+    """HyperLogLog register index and rank (position of the first 1-bit) of each hash."""
+    buckets = (hashes >> np.uint64(64 - _HLL_P)).view(np.int64)
+    rest = hashes & np.uint64((1 << (64 - _HLL_P)) - 1)
+    _, bits = np.frexp(rest.astype(np.float64))  # bit length; 0 for 0
+    ranks = (64 - _HLL_P + 1) - bits.astype(np.uint8)
+    return buckets, ranks
+
+
+class FrameStats:
+    """
+    Column profile of a frame seen chunk by chunk: the row count and, per
+    column, null counts and dtypes. Costlier figures are opt-in through
+    ``profile``: ``"distinct"`` for a distinct-count estimate, ``"range"``
+    for the min/max of numeric and datetime columns (the accumulator key
+    ``("stats", "distinct", "range")`` asks for both).
+
+    Each chunk is profiled in one vectorised pass per dtype block instead
+    of column by column, so the cost barely depends on how wide the frame
+    is. Feeding a whole DataFrame as one chunk gives the same numbers as
+    inspecting it directly, so checks can share one code path.
+    """
+    def __init__(self, *profile: str) -> None:
+        unknown = set(profile) - {"distinct", "range"}
+        if unknown:
+            raise ValueError(f"Unknown profile figures: {sorted(unknown)}")
+        self.profile = frozenset(profile)
+        self.columns: List[str] = []
+        self.n_rows = 0
+        # per-column accumulators, by column position
+        self._nulls = np.zeros(0, dtype=np.int64)
+        self._dtypes = np.empty(0, dtype=object)
+        self._registers = np.zeros((0, _HLL_M), dtype=np.uint8)
+        self._lo = np.zeros(0)
+        self._hi = np.zeros(0)
+        self._tlo = np.zeros(0, dtype=np.int64)
+        self._thi = np.zeros(0, dtype=np.int64)
+        self._dtype_map: Optional[Dict[str, np.dtype]] = None
+
+    @classmethod
+    def of(cls, df: pd.DataFrame, *profile: str) -> "FrameStats":
+        stats = cls(*profile)
+        stats.update(df)
+        return stats
+
+    @classmethod
+    def known(
+        cls, columns: List[str], n_rows: int, nulls: Sequence[int], dtypes: Sequence[Any]
+    ) -> "FrameStats":
+        """
+        The default profile of a frame whose figures are known without a
+        scan, e.g. from the metadata of a Parquet file.
+        """
+        stats = cls()
+        stats._start(columns, dtypes)
+        stats.n_rows = n_rows
+        stats._nulls += np.asarray(nulls, dtype=np.int64)
+        return stats
+
+    def _start(self, columns: List[str], dtypes: Sequence[Any]) -> None:
+        n = len(columns)
+        self.columns = list(columns)
+        self._nulls = np.zeros(n, dtype=np.int64)
+        self._dtypes = np.empty(n, dtype=object)
+        self._dtypes[:] = list(dtypes)
+        self._registers = np.zeros((n, _HLL_M if "distinct" in self.profile else 0), dtype=np.uint8)
+        self._lo = np.full(n, np.nan)
+        self._hi = np.full(n, np.nan)
+        self._tlo = np.full(n, _NO_MIN, dtype=np.int64)
+        self._thi = np.full(n, _NO_MAX, dtype=np.int64)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self._start(list(chunk.columns), chunk.dtypes.to_numpy())
+        self.n_rows += len(chunk)
+        self._dtype_map = None
+
+        dtypes = chunk.dtypes.to_numpy()
+        changed = np.flatnonzero(dtypes != self._dtypes)
+        for i in changed:
+            self._dtypes[i] = _merge_dtype(self._dtypes[i], dtypes[i])
+
+        if not len(chunk):
+            return
+        if not self.profile:
+            # null counts only: one isna() over the whole chunk
+            self._nulls += chunk.isna().to_numpy().sum(axis=0, dtype=np.int64)
+            return
+
+        # one pass per block of same-typed columns, in batches of columns
+        step = max(1, _BATCH_CELLS // len(chunk))
+        for dtype in pd.unique(dtypes):
+            same = np.flatnonzero(dtypes == dtype)
+            for start in range(0, len(same), step):
+                pos = same[start:start + step]
+                self._profile_block(chunk.iloc[:, pos], dtype, pos)
+
+    def merge(self, other: "FrameStats") -> None:
+        """
+        Fold in the profile of the rows that follow (same columns), e.g.
+        of the next shard of a file profiled in parallel.
+        """
+        if not other.columns:
+            self.n_rows += other.n_rows
+            return
+        if not self.columns:
+            self.__dict__.update(other.__dict__, n_rows=self.n_rows + other.n_rows)
+            return
+        self.n_rows += other.n_rows
+        self._dtype_map = None
+        for i in np.flatnonzero(other._dtypes != self._dtypes):
+            self._dtypes[i] = _merge_dtype(self._dtypes[i], other._dtypes[i])
+        self._nulls += other._nulls
+        np.maximum(self._registers, other._registers, out=self._registers)
+        self._lo = np.fmin(self._lo, other._lo)
+        self._hi = np.fmax(self._hi, other._hi)
+        self._tlo = np.minimum(self._tlo, other._tlo)
+        self._thi = np.maximum(self._thi, other._thi)
+
+    def _profile_block(self, block: pd.DataFrame, dtype, pos: np.ndarray) -> None:
+        missing = block.isna().to_numpy()
+        self._nulls[pos] += missing.sum(axis=0, dtype=np.int64)
+        distinct = "distinct" in self.profile
+        if isinstance(dtype, pd.CategoricalDtype):
+            # distinct counts only, from the codes
+            if not distinct:
+                return
+            hashes = np.stack([_hash_column(col) for _, col in block.items()], axis=1)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            values = np.stack([col.array.as_unit("ns").asi8 for _, col in block.items()], axis=1)
+            if "range" in self.profile:
+                lo = np.where(missing, _NO_MIN, values).min(axis=0)
+                hi = np.where(missing, _NO_MAX, values).max(axis=0)
+                self._tlo[pos] = np.minimum(self._tlo[pos], lo)
+                self._thi[pos] = np.maximum(self._thi[pos], hi)
+            hashes = _hash_block(values) if distinct else None
+        else:
+            values = block.to_numpy()
+            if "range" in self.profile and values.dtype.kind in "iuf":
+                as_float = values.astype(np.float64, copy=False)
+                self._lo[pos] = np.fmin(self._lo[pos], np.fmin.reduce(as_float, axis=0))
+                self._hi[pos] = np.fmax(self._hi[pos], np.fmax.reduce(as_float, axis=0))
+            hashes = _hash_block(values) if distinct else None
+        if hashes is None:
+            return
+
+        buckets, ranks = _hll_ranks(hashes)
+        ranks[missing] = 0
+        cells = pos[np.newaxis, :] * _HLL_M + buckets
+        np.maximum.at(self._registers.reshape(-1), cells.ravel(), ranks.ravel())
+
+    @property
+    def null_counts(self) -> pd.Series:
+        return pd.Series(self._nulls, index=self.columns, dtype="int64")
+
+    @property
+    def dtypes(self) -> Dict[str, np.dtype]:
+        if self._dtype_map is None:
+            self._dtype_map = dict(zip(self.columns, self._dtypes))
+        return self._dtype_map
+
+    @property
+    def distinct(self) -> pd.Series:
+        """Estimated number of distinct non-null values per column."""
+        self._require("distinct")
+        regs = self._registers.astype(np.float64)
+        raw = _HLL_ALPHA * _HLL_M ** 2 / np.power(2.0, -regs).sum(axis=1)
+        zeros = (self._registers == 0).sum(axis=1)
+        with np.errstate(divide="ignore"):
+            linear = _HLL_M * np.log(_HLL_M / np.maximum(zeros, 1))
+        est = np.where((raw <= 2.5 * _HLL_M) & (zeros > 0), linear, raw)
+        est = np.minimum(est, self.n_rows - self._nulls)
+        return pd.Series(np.rint(est).astype(np.int64), index=self.columns)
+
+    @property
+    def minimum(self) -> pd.Series:
+        """Smallest value of each numeric or datetime column (else None)."""
+        self._require("range")
+        return self._extreme(self._lo, self._tlo, _NO_MIN)
+
+    @property
+    def maximum(self) -> pd.Series:
+        """Largest value of each numeric or datetime column (else None)."""
+        self._require("range")
+        return self._extreme(self._hi, self._thi, _NO_MAX)
+
+    def _require(self, figure: str) -> None:
+        if figure not in self.profile:
+            raise ValueError(f"'{figure}' was not profiled; ask for FrameStats('{figure}')")
+
+    def _extreme(self, numbers: np.ndarray, stamps: np.ndarray, none: int) -> pd.Series:
+        out = np.full(len(self.columns), None, dtype=object)
+        for i, dtype in enumerate(self._dtypes):
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                if stamps[i] != none:
+                    out[i] = pd.Timestamp(stamps[i], tz=getattr(dtype, "tz", None))
+            elif not pd.api.types.is_bool_dtype(dtype) and not np.isnan(numbers[i]):
+                out[i] = numbers[i]
+        return pd.Series(out, index=self.columns, dtype=object)
+
+    @property
+    def empty(self) -> bool:
+        return self.n_rows == 0 or not self.columns
+
+
+# Explicit formats tried, in order, on a sample of a text date column;
+# ISO 8601 covers its variants (with time, offset, compact ...). Like
+# pandas, month-first wins when both orders fit.
+DATE_FORMATS = [
+    "ISO8601",
+    "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%y", "%d/%m/%y", "%m-%d-%y", "%d-%m-%y",
+    "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S",
+    "%d-%b-%Y", "%d %b %Y", "%b %d, %Y", "%d-%b-%y", "%b-%y", "%b %Y",
+]
+
+# The same format with day and month swapped
+_SWAPPED = {
+    f: f.replace("%d", "%_").replace("%m", "%d").replace("%_", "%m")
+    for f in DATE_FORMATS if "%d" in f and "%m" in f
+}
+
+# Distinct values a format is inferred from
+_DATE_SAMPLE = 1000
+
+
+def infer_date_format(values: Iterable[Any]) -> Tuple[Optional[str], bool]:
+    """
+    The first of ``DATE_FORMATS`` that parses every value of a sample of
+    distinct (non-missing) strings, and whether the day-first/month-first twin of that
+    format parses them all too (so the order is a guess). ``None`` if the
+    values are not all strings or no single format fits.
+    """
+    sample = pd.Index(pd.unique(np.asarray(values, dtype=object)))[:_DATE_SAMPLE]
+    if not len(sample) or not all(isinstance(v, str) for v in sample):
+        return None, False
+
+    def _fits(fmt: str) -> bool:
+        return not pd.to_datetime(sample, format=fmt, errors="coerce").isna().any()
+
+    for fmt in DATE_FORMATS:
+        if _fits(fmt):
+            return fmt, fmt in _SWAPPED and _fits(_SWAPPED[fmt])
+    return None, False
+
+
+def parse_dates(values: pd.Series, fmt: Optional[str] = None) -> pd.Series:
+    """
+    ``pd.to_datetime(values, format=fmt, errors="coerce")``, parsing each
+    distinct value once and mapping the results back, so the cost follows
+    the column's cardinality rather than its length. Without ``fmt`` the
+    values are parsed as pandas would infer them.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(uniques, format=fmt, errors="coerce")
+    if not isinstance(parsed, pd.DatetimeIndex):
+        # e.g. mixed time zones come back as object
+        return pd.to_datetime(values, format=fmt, errors="coerce")
+    return pd.Series(
+        parsed.take(codes, allow_fill=True, fill_value=pd.NaT),
+        index=values.index, name=values.name,
+    )
+
+
+class DateStats:
+    """
+    Converts a date column chunk by chunk and keeps what the date checks
+    need: conversion errors, the valid count and min/max.
+
+    Text dates are parsed with the format inferred from the first chunk
+    with values (see ``infer_date_format``); ``ambiguous`` tells if the
+    day/month order of that format was a guess.
+    """
+    def __init__(self) -> None:
+        self.n_rows = 0
+        self.n_valid = 0
+        self.min: Optional[pd.Timestamp] = None
+        self.max: Optional[pd.Timestamp] = None
+        self.converted = False
+        self.is_datetime = True
+        self.error: Optional[Exception] = None
+        self.format: Optional[str] = None
+        self.ambiguous = False
+        self._inferred = False
+
+    @classmethod
+    def known(
+        cls,
+        n_rows: int,
+        n_valid: int,
+        low: Optional[pd.Timestamp],
+        high: Optional[pd.Timestamp],
+    ) -> "DateStats":
+        """The stats of a datetime column known without a scan, e.g. from file metadata."""
+        stats = cls()
+        stats.n_rows, stats.n_valid = n_rows, n_valid
+        stats.min, stats.max = low, high
+        return stats
+
+    def infer(self, values: pd.Series) -> None:
+        """
+        Settle the format text dates are parsed with on ``values``, unless
+        it already is (or they are all missing). Done with the first chunk;
+        parallel readers do it with the head of the file, so every shard
+        is parsed alike.
+        """
+        if not self._inferred and values.notna().any():
+            sample = values.dropna().head(_DATE_SAMPLE * 10)
+            self.format, self.ambiguous = infer_date_format(sample)
+            self._inferred = True
+
+    def update(self, values: pd.Series) -> pd.Series:
+        """Track one chunk of the column and return it converted to datetime."""
+        if self.error is not None:
+            return values
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            try:
+                self.infer(values)
+                values = parse_dates(values, self.format)
+            except Exception as e:
+                self.error = e
+                return values
+            self.converted = True
+        self.n_rows += len(values)
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            # e.g. mixed time zones come back as object
+            self.is_datetime = False
+            self.n_valid += int(values.notna().sum())
+            return values
+        valid = values.dropna()
+        self.n_valid += len(valid)
+        if len(valid):
+            lo, hi = valid.min(), valid.max()
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+        return values
+
+    def merge(self, other: "DateStats") -> None:
+        """Fold in the stats of the rows that follow."""
+        if self.error is not None:
+            return
+        self.error = other.error
+        self.n_rows += other.n_rows
+        self.n_valid += other.n_valid
+        for bound, pick in (("min", min), ("max", max)):
+            ours, theirs = getattr(self, bound), getattr(other, bound)
+            if ours is None or theirs is None:
+                setattr(self, bound, theirs if ours is None else ours)
+            else:
+                setattr(self, bound, pick(ours, theirs))
+        self.converted |= other.converted
+        self.is_datetime &= other.is_datetime
+        if not self._inferred:
+            self.format, self.ambiguous = other.format, other.ambiguous
+            self._inferred = other._inferred
+
+    @property
+    def all_missing(self) -> bool:
+        return self.n_valid == 0
+
+
+def _contains(sorted_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Which of ``hashes`` are in the sorted array ``sorted_hashes``."""
+    found = np.zeros(len(hashes), dtype=bool)
+    if not len(sorted_hashes):
+        return found
+    # binary searches in ascending order hit the cache (a radix argsort)
+    order = np.argsort(hashes, kind="stable")
+    needles = hashes[order]
+    idx = np.searchsorted(sorted_hashes, needles).clip(max=len(sorted_hashes) - 1)
+    found[order] = sorted_hashes[idx] == needles
+    return found
+
+
+class KeyStats:
+    """
+    Distinct combinations of the key ``columns`` of a frame, by 64-bit
+    row hash: a sorted array of the hashes plus the first row of each key,
+    in file order, for quoting orphans. Memory grows with the number of
+    distinct keys, not rows.
+    """
+    def __init__(self, columns: Sequence[str]) -> None:
+        self.columns = list(columns)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self._rows: List[pd.DataFrame] = []
+        self._row_hashes: List[np.ndarray] = []
+
+    def update(self, chunk: pd.DataFrame, hashes: Optional[np.ndarray] = None) -> None:
+        """Track a chunk; pass ``hashes`` if its ``hash_rows`` are at hand."""
+        if not all(col in chunk.columns for col in self.columns):
+            return
+        h = hash_rows(chunk, self.columns) if hashes is None else hashes
+        # first row of each key in the chunk, then the keys not seen before
+        at = np.flatnonzero(~pd.Series(h).duplicated().to_numpy())
+        self._add(h[at], chunk[self.columns].iloc[at])
+
+    def merge(self, other: "KeyStats") -> None:
+        """Fold in the keys of the rows that follow."""
+        self._add(*other.rows())
+
+    def _add(self, hashes: np.ndarray, rows: pd.DataFrame) -> None:
+        # distinct ``hashes`` with their rows; keeps those not seen before
+        new = ~_contains(self.hashes, hashes)
+        if not new.any():
+            return
+        self._rows.append(rows[new])
+        self._row_hashes.append(hashes[new])
+        added = np.sort(hashes[new])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, added), added)
+
+    def rows(self) -> Tuple[np.ndarray, pd.DataFrame]:
+        """The hash and first row of every key, in the order first seen."""
+        if not self._rows:
+            return np.empty(0, dtype=np.uint64), pd.DataFrame(columns=self.columns)
+        return np.concatenate(self._row_hashes), pd.concat(self._rows, ignore_index=True)
+
+    def lookup(self, hashes: np.ndarray) -> pd.DataFrame:
+        """The rows of the keys with the given (seen) ``hashes``."""
+        seen, rows = self.rows()
+        return rows.iloc[pd.Index(seen).get_indexer(hashes)]
+
+    def orphans(self, other: "KeyStats") -> pd.DataFrame:
+        """The keys missing from ``other`` (a hash anti-join)."""
+        hashes, rows = self.rows()
+        return rows[~_contains(other.hashes, hashes)]
+
+
 # Helper functions for validators
 def clean_columns(df: pd.DataFrame, rep: ValidationReport) -> None:
     ren = {c: c.strip() for c in df.columns if c != c.strip()}
@@ -60,24 +702,33 @@ def clean_columns(df: pd.DataFrame, rep: ValidationReport) -> None:
         df.rename(columns=ren, inplace=True)
         rep.pass_("cleanup", f"renamed columns {list(ren.keys())}")
 
+def check_date_format(dates: DateStats, rep: ValidationReport, column: str) -> None:
+    if dates.ambiguous:
+        rep.warn(
+            "date_format",
+            f"'{column}' fits both day-first and month-first; parsed as {dates.format}",
+        )
+
 def check_missing(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, FrameStats],
     rep: ValidationReport,
     critical: Optional[List[str]] = None,
 ) -> None:
+    stats = df if isinstance(df, FrameStats) else FrameStats.of(df)
     crit = set(critical or [])
-    for col in df.columns:
-        n = df[col].isna().sum()
-        pct = (n / len(df)) * 100 if len(df) > 0 else 0
-        if n:
-            lvl = rep.fail if col in crit else rep.warn
-            lvl("missing", f"{n} missing ({pct:.2f}%)", col)
+    nulls = stats.null_counts
+    nulls = nulls[nulls.to_numpy() > 0]
+    pcts = (nulls / stats.n_rows) * 100 if stats.n_rows > 0 else nulls * 0
+    for col, n, pct in zip(nulls.index, nulls.tolist(), pcts.tolist()):
+        lvl = rep.fail if col in crit else rep.warn
+        lvl("missing", f"{n} missing ({pct:.2f}%)", col)
 
 def check_dtypes(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, FrameStats],
     rep: ValidationReport,
     expected: Dict[str, str],
 ) -> None:
+    dtypes = df.dtypes if isinstance(df, FrameStats) else df.dtypes.to_dict()
     for col, exp in expected.items():
-        if col in df.columns and str(df[col].dtype) != exp:
-            rep.warn("dtype" ,f"found {df[col].dtype}, expected {exp}", col)
\ No newline at end of file
+        if col in dtypes and str(dtypes[col]) != exp:
+            rep.warn("dtype" ,f"found {dtypes[col]}, expected {exp}", col)
\ No newline at end of file
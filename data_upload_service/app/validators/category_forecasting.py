@@ -1,89 +1,358 @@
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from .base import ValidationReport, clean_columns, check_missing
+from .base import (
+    ValidationReport, ColumnPlan, FrameSource, KeyStats, check_date_format, hash_rows,
+)
+from .engine import (
+    DATA, SCHEMA, TRANSFORM, DatasetView, Pipeline, Plan, accumulator, compile_plan, rule,
+)
 
 _CF_ANY = [
     "Market", "Channel", "Region", "Category", "SubCategory",
     "Brand", "PPG", "Variant", "PackType", "PackSize",
 ]
 
+# Case variations mapped to the standard column names
+_STANDARD_NAMES = {
+    "market": "Market", "channel": "Channel", "region": "Region", 
+    "category": "Category", "subcategory": "SubCategory", "sub-category": "SubCategory",
+    "brand": "Brand", "ppg": "PPG", "variant": "Variant", 
+    "packtype": "PackType", "pack type": "PackType", "pack-type": "PackType",
+    "packsize": "PackSize", "pack size": "PackSize", "pack-size": "PackSize",
+    "fiscal year": "Fiscal Year", "fiscalyear": "Fiscal Year", "fiscal-year": "Fiscal Year",
+    "date": "Date"
+}
+
+# Columns the checks look at; dimensions are loaded as categoricals (the
+# missing check has every other column read too, see ``Pipeline.reads``)
+CF_COLUMNS = ColumnPlan(
+    _STANDARD_NAMES,
+    dtypes={alias: "category" for alias, std in _STANDARD_NAMES.items() if std in _CF_ANY},
+    ignore_case=True,
+)
+
+# Series quoted as the worst offenders of the per-series date checks
+_WORST_SERIES = 5
+
+# Steps read as calendar frequencies: (fewest days, most days, months, label)
+_CALENDAR_STEPS = [
+    (28, 31, 1, "monthly"),
+    (89, 92, 3, "quarterly"),
+    (365, 366, 12, "yearly"),
+]
+
+# Distinct (series, date) pairs buffered before they are re-aggregated
+_COMPACT_PAIRS = 1 << 20
+
+_DAY = np.int64(24 * 3600 * 10 ** 9)
+
+
+@accumulator("series_dates")
+class _SeriesDates:
+    """
+    Row counts per (series, date) of one dataset, where a series is a
+    combination of the ``keys`` columns present – all rows form a single
+    series if there are none. Pairs are kept as 64-bit series hash and
+    date, aggregated per chunk and re-aggregated as they add up, so
+    memory follows the number of distinct pairs, not rows. Missing dates
+    are left out.
+    """
+    def __init__(self, keys: Sequence[str], date_col: str) -> None:
+        self.keys = list(keys)
+        self.date_col = date_col
+        self.series: Optional[KeyStats] = None
+        self.usable = True
+        self._parts: List[pd.Series] = []
+        self._pending = 0
+        self._compacted = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.series is None:
+            self.series = KeyStats([c for c in self.keys if c in chunk.columns])
+        dates = chunk.get(self.date_col)
+        if dates is None or not pd.api.types.is_datetime64_any_dtype(dates):
+            self.usable = False
+        if not self.usable:
+            return
+
+        hashes = hash_rows(chunk, self.series.columns)
+        self.series.update(chunk, hashes)
+        valid = dates.notna().to_numpy()
+        pairs = pd.DataFrame({
+            "series": hashes[valid],
+            "date": dates.to_numpy(dtype="datetime64[ns]")[valid].view(np.int64),
+        })
+        counts = pairs.groupby(["series", "date"], sort=False).size()
+        self._parts.append(counts)
+        self._pending += len(counts)
+        if self._pending > 2 * self._compacted + _COMPACT_PAIRS:
+            self._compact()
+
+    def merge(self, other: "_SeriesDates") -> None:
+        """Fold in the counts of the rows that follow."""
+        if other.series is None:
+            return
+        if self.series is None:
+            self.series = KeyStats(other.series.columns)
+        self.series.merge(other.series)
+        self.usable &= other.usable
+        self._parts += other._parts
+        self._pending += other._pending
+        if self._pending > 2 * self._compacted + _COMPACT_PAIRS:
+            self._compact()
+
+    def _compact(self) -> None:
+        if len(self._parts) > 1:
+            self._parts = [pd.concat(self._parts).groupby(level=[0, 1], sort=False).sum()]
+        self._pending = self._compacted = len(self._parts[0]) if self._parts else 0
+
+    def counts(self) -> pd.Series:
+        """Rows per distinct (series hash, date ns)."""
+        self._compact()
+        if not self._parts:
+            index = pd.MultiIndex.from_arrays(
+                [np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)]
+            )
+            return pd.Series(np.empty(0, dtype=np.int64), index=index.set_names(["series", "date"]))
+        counts = self._parts[0]
+        counts.index = counts.index.set_names(["series", "date"])
+        return counts
+
+    @property
+    def keyed(self) -> bool:
+        """Whether any series columns are present."""
+        return self.series is not None and bool(self.series.columns)
+
+    def __len__(self) -> int:
+        return 0 if self.series is None else len(self.series.hashes)
+
+    def describe(self, hashes: np.ndarray) -> List[str]:
+        """Readable names of the series with the given hashes."""
+        if not self.keyed:
+            return ["all rows"] * len(hashes)
+        rows = self.series.lookup(hashes)
+        return [
+            ", ".join(f"{col}={val}" for col, val in zip(rows.columns, values))
+            for values in rows.itertuples(index=False, name=None)
+        ]
+
+
+def _period_gaps(counts: pd.Series) -> Tuple[str, pd.Series]:
+    """
+    The series' frequency and the missing periods per series between its
+    first and last date. A series' frequency is its most common step
+    between consecutive dates; steps the length of a calendar month,
+    quarter or year are counted in calendar months, so month- and
+    quarter-ends are one period apart whatever their length.
+    """
+    pairs = counts.index.to_frame(index=False).sort_values(["series", "date"])
+    series, dates = pairs["series"].to_numpy(), pairs["date"].to_numpy()
+    same = series[1:] == series[:-1]
+    steps = pd.DataFrame({"series": series[1:][same], "step": (dates[1:] - dates[:-1])[same]})
+    if not len(steps):
+        return "", pd.Series(dtype=np.int64)
+    # each series' most common step, the shortest of a tie
+    modes = steps.value_counts().reset_index(name="n")
+    modes = modes.sort_values(["n", "step"], ascending=[False, True]).drop_duplicates("series")
+    step = modes.set_index("series")["step"]
+    days = step.to_numpy() / _DAY
+    months = np.zeros(len(step), dtype=np.int64)
+    labels = np.array([{1: "daily", 7: "weekly"}.get(d, f"{d:g}-day") for d in days], dtype=object)
+    for lo, hi, n, label in _CALENDAR_STEPS:
+        calendar = (lo <= days) & (days <= hi)
+        months[calendar], labels[calendar] = n, label
+
+    # periods since the series' first date, in calendar months or steps
+    pairs = pairs[pairs["series"].isin(step.index)]  # a single date misses none
+    by_series = pairs["series"]
+    dates = pairs["date"].to_numpy()
+    month = by_series.map(pd.Series(months, index=step.index)).to_numpy()
+    calendar = month > 0
+    month_ticks = dates.astype("datetime64[ns]").astype("datetime64[M]").view(np.int64)
+    ticks = np.where(calendar, month_ticks, dates)
+    unit = np.where(calendar, month, by_series.map(step).to_numpy())
+    ticks = pd.Series(ticks, index=by_series.index)
+    periods = pd.DataFrame({
+        "series": by_series.to_numpy(),
+        "period": ((ticks - ticks.groupby(by_series).transform("min")) // unit).to_numpy(),
+    }).drop_duplicates()
+    span = periods.groupby("series")["period"].agg(["max", "size"])
+    # most series first, e.g. "monthly/weekly"
+    shared = pd.Series(labels).value_counts()
+    label = "/".join(sorted(shared.index, key=lambda name: (-shared[name], name)))
+    return label, (span["max"] + 1 - span["size"]).clip(lower=0)
+
+
+def _worst(stats: _SeriesDates, per_series: pd.Series) -> str:
+    top = per_series.nlargest(_WORST_SERIES)
+    names = stats.describe(top.index.to_numpy())
+    return "; ".join(f"{name} ({n})" for name, n in zip(names, top.tolist()))
+
+
+def category_forecasting_spec(
+    *,
+    date_col: str = "Date",
+    fiscal_start_month: int = 4,
+) -> Dict[str, Any]:
+    """Rule spec of the Category Forecasting checks (see ``engine``)."""
+    return {
+        "label": "Category forecasting",
+        "datasets": {"data": {"parse_dates": [date_col]}},
+        "rules": [
+            # 1. Clean column names
+            {"rule": "standardize_columns", "dataset": "data"},
+            # 2. Date column validation and conversion
+            {"rule": "date_column", "dataset": "data", "column": date_col},
+            # 2b. Missing periods within each series
+            {"rule": "date_gaps", "dataset": "data", "column": date_col},
+            # 3. Check for required columns (case-insensitive)
+            {"rule": "dimension_check", "dataset": "data"},
+            # 4. Check for Fiscal Year column
+            {"rule": "fiscal_year", "dataset": "data",
+             "date_col": date_col, "start_month": fiscal_start_month},
+            # 5. Missing values summary
+            {"rule": "missing", "dataset": "data"},
+            # 6. Check if dataframe is empty
+            {"rule": "record_count", "dataset": "data",
+             "empty_msg": "Data is empty after validations"},
+        ],
+    }
+
 def validate_category_forecasting(
-    df: pd.DataFrame,
+    df: FrameSource,
     *,
     date_col: str = "Date",
     fiscal_start_month: int = 4,
 ) -> ValidationReport:
-    rep = ValidationReport()
-    
-    # 1. Clean column names (remove leading/trailing spaces and standardize case)
-    # First strip whitespace
-    renamed_cols = {c: c.strip() for c in df.columns if c != c.strip()}
-    if renamed_cols:
-        df.rename(columns=renamed_cols, inplace=True)
-        rep.pass_("cleanup","pass", f"renamed columns {list(renamed_cols.keys())}")
-     
-    # Then standardize case variations
-    standard_names = {
-        "market": "Market", "channel": "Channel", "region": "Region", 
-        "category": "Category", "subcategory": "SubCategory", "sub-category": "SubCategory",
-        "brand": "Brand", "ppg": "PPG", "variant": "Variant", 
-        "packtype": "PackType", "pack type": "PackType", "pack-type": "PackType",
-        "packsize": "PackSize", "pack size": "PackSize", "pack-size": "PackSize",
-        "fiscal year": "Fiscal Year", "fiscalyear": "Fiscal Year", "fiscal-year": "Fiscal Year",
-        "date": "Date"
-    }
-    
-    case_standardized = {}
-    for col in df.columns:
-        col_lower = col.lower()
-        if col_lower in standard_names and col != standard_names[col_lower]:
-            case_standardized[col] = standard_names[col_lower]
-    
-    if case_standardized:
-        df.rename(columns=case_standardized, inplace=True)
-        rep.pass_("case_standardization", f"standardized column names: {list(case_standardized.keys())}")
-    
-    # 2. Date column validation and conversion
-    if date_col not in df.columns:
-        rep.fail("date_column", f"'{date_col}' not found")
+    """
+    Validates data for Category Forecasting.
+
+    ``df`` may also be an iterable of row chunks; the checks keep running
+    totals so the report is the same as for the whole frame.
+    """
+    return _plan(date_col, fiscal_start_month).run({"data": df})
+
+
+def preflight_category_forecasting(
+    header: List[str],
+    *,
+    date_col: str = "Date",
+) -> ValidationReport:
+    """
+    Header-only checks, run before the data is parsed. A failing report
+    means the full validation would fail too.
+    """
+    return _plan(date_col, 4).preflight({"data": header})
+
+
+def _plan(date_col: str, fiscal_start_month: int) -> Plan:
+    if (date_col, fiscal_start_month) == ("Date", 4):
+        return CF_PLAN
+    return compile_plan(category_forecasting_spec(
+        date_col=date_col, fiscal_start_month=fiscal_start_month,
+    ))
+
+
+def _date_header(rep: ValidationReport, columns: List[str], *, column: str) -> None:
+    if column not in columns:
+        rep.fail("date_column", f"'{column}' not found")
+
+
+def _series_dates(params: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    return [("dates", params["column"]), ("series_dates", tuple(_CF_ANY), params["column"])]
+
+
+@rule("date_column", DATA, needs=_series_dates, header=_date_header)
+def _date_column(rep: ValidationReport, data: DatasetView, *, column: str) -> None:
+    if column not in data.columns:
+        rep.fail("date_column", f"'{column}' not found")
+        return
+
+    dates = data.dates(column)
+    if dates.error is not None:
+        rep.fail("date_column", f"error converting: {str(dates.error)}")
+    elif dates.converted and dates.all_missing:
+        rep.fail("date_column", "all values NaT after conversion")
     else:
-        if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            try:
-                df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-                if df[date_col].isna().all():
-                    rep.fail("date_column", "all values NaT after conversion")
-                else:
-                    rep.pass_("date_column", "valid datetime")
-            except Exception as e:
-                rep.fail("date_column", f"error converting: {str(e)}")
-        else:
-            rep.pass_("date_column","valid datetime")
-        
-        # Check for duplicate dates
-        if date_col in df.columns and pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            dup = df[date_col].duplicated().sum()
+        rep.pass_("date_column", "valid datetime")
+        check_date_format(dates, rep, column)
+
+    # Check for duplicate dates within each series
+    if dates.error is None and dates.is_datetime:
+        series = data.acc("series_dates", tuple(_CF_ANY), column)
+        counts = series.counts()
+        extra = (counts - 1).groupby(level="series").sum()
+        extra = extra[extra > 0]
+        dup = int(extra.sum())
+        if not series.keyed:
             if dup:
                 rep.fail("duplicate_dates", f"{dup} duplicates")
             else:
                 rep.pass_("duplicate_dates")
-            
-            # Add date range information
-            if not df[date_col].isna().all():
-                min_date = df[date_col].min().date()
-                max_date = df[date_col].max().date()
-                rep.pass_("date_range", f"from {min_date} to {max_date}")
-    
-    # 3. Check for required columns (case-insensitive)
+        elif dup:
+            rep.fail(
+                "duplicate_dates",
+                f"{dup} duplicate dates in {len(extra)} of {len(series)} series; "
+                f"worst: {_worst(series, extra)}",
+            )
+        else:
+            rep.pass_("duplicate_dates")
+
+        # Add date range information
+        if not dates.all_missing:
+            rep.pass_("date_range", f"from {dates.min.date()} to {dates.max.date()}")
+
+
+@rule("date_gaps", DATA, needs=_series_dates)
+def _date_gaps(rep: ValidationReport, data: DatasetView, *, column: str) -> None:
+    if column not in data.columns:
+        return
+    dates = data.dates(column)
+    if dates.error is not None or not dates.is_datetime or dates.all_missing:
+        return
+
+    series = data.acc("series_dates", tuple(_CF_ANY), column)
+    freq, gaps = _period_gaps(series.counts())
+    gaps = gaps[gaps > 0]
+    if not len(gaps):
+        rep.pass_("date_gaps", f"no missing {freq} periods" if freq else "")
+    elif not series.keyed:
+        rep.warn("date_gaps", f"{int(gaps.sum())} missing {freq} periods")
+    else:
+        rep.warn(
+            "date_gaps",
+            f"{int(gaps.sum())} missing {freq} periods in {len(gaps)} of {len(series)} series; "
+            f"worst: {_worst(series, gaps)}",
+        )
+
+
+@rule("fiscal_year", DATA, needs=lambda params: [("dates", params["date_col"])])
+def _fiscal_year(
+    rep: ValidationReport, data: DatasetView, *, date_col: str, start_month: int
+) -> None:
+    if "Fiscal Year" in data.columns:
+        rep.pass_("fiscal_year")
+        return
+    # Create Fiscal Year column based on date column if date column is valid
+    dates = data.dates(date_col)
+    has_dates = date_col in data.columns
+    if has_dates and dates.error is None and dates.is_datetime and not dates.all_missing:
+        rep.warn("fiscal_year", f"will compute at runtime (start={start_month})")
+
+
+@rule("dimension_check", SCHEMA)
+def _check_dimensions(rep: ValidationReport, columns: List[str]) -> None:
     found = []
     for required in _CF_ANY:
         # Check for exact match first
-        if required in df.columns:
+        if required in columns:
             found.append(required)
         # If not found, try case-insensitive match
-        elif required.lower() in [col.lower() for col in df.columns]:
+        elif required.lower() in [col.lower() for col in columns]:
             # Find the actual column name that matched
-            for col in df.columns:
+            for col in columns:
                 if col.lower() == required.lower():
                     found.append(col)
                     break
@@ -92,22 +361,31 @@ def validate_category_forecasting(
         rep.pass_("dimension_check", f"found {', '.join(found)}")
     else:
         rep.fail("dimension_check", f"need at least one of {', '.join(_CF_ANY)}")
+
+
+@rule("standardize_columns", TRANSFORM)
+def _standardize_columns(rep: ValidationReport, df: pd.DataFrame) -> None:
+    # 1. Clean column names (remove leading/trailing spaces and standardize case)
+    # First strip whitespace
+    renamed_cols = {c: c.strip() for c in df.columns if c != c.strip()}
+    if renamed_cols:
+        df.rename(columns=renamed_cols, inplace=True)
+        rep.pass_("cleanup", f"renamed columns {list(renamed_cols.keys())}")
+     
+    # Then standardize case variations
+    case_standardized = {}
+    for col in df.columns:
+        col_lower = col.lower()
+        if col_lower in _STANDARD_NAMES and col != _STANDARD_NAMES[col_lower]:
+            case_standardized[col] = _STANDARD_NAMES[col_lower]
     
-    # 4. Check for Fiscal Year column
-    if "Fiscal Year" in df.columns:
-        rep.pass_("fiscal_year")
-    else:
-        # Create Fiscal Year column based on date column if date column is valid
-        if date_col in df.columns and not df[date_col].isna().all() and pd.api.types.is_datetime64_any_dtype(df[date_col]):
-            rep.warn("fiscal_year", "success_with_warning",f"will compute at runtime (start={fiscal_start_month})")
-    
-    # 5. Missing values summary
-    check_missing(df, rep)
-    
-    # 6. Check if dataframe is empty
-    if df.empty:
-        rep.fail("data_empty", "Data is empty after validations")
-    else:
-        rep.pass_("records_count", f"{len(df)} records")
-    
-    return rep
\ No newline at end of file
+    if case_standardized:
+        df.rename(columns=case_standardized, inplace=True)
+        rep.pass_("case_standardization", f"standardized column names: {list(case_standardized.keys())}")
+
+
+# Compiled once the module's rules are registered
+CF_PLAN = compile_plan(category_forecasting_spec())
+
+# Registered with the service (see ``app.pipelines``)
+PIPELINE = Pipeline(CF_PLAN, {"data": CF_COLUMNS})
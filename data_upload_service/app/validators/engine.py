@@ -0,0 +1,597 @@
+"""
+Declarative validation rules.
+
+A pipeline is described by a spec – plain data, so it can equally come from
+YAML or JSON::
+
+    {
+        "label": "Promo intensity",
+        "datasets": {"data": {"parse_dates": []}},
+        "rules": [
+            {"rule": "clean_columns", "dataset": "data"},
+            {"rule": "missing", "dataset": "data", "critical": ["Brand"]},
+            ...
+        ],
+    }
+
+``compile_plan`` turns a spec into a ``Plan``. Each rule belongs to a phase:
+
+- *transform* rules rewrite the header (first chunk) of a dataset;
+- *schema* rules only look at the column names;
+- *data* rules look at accumulators filled while scanning the rows.
+
+The plan runs the phases in that order: schema checks are settled before
+any row is read, and the data rules' accumulators are deduplicated so each
+dataset is scanned exactly once, however many rules use it. Report rows
+still come out in spec order, so a plan reproduces the hand-written
+sequence of checks it replaces; to a ``stream_rows`` sink they go as each
+rule completes, so the header checks arrive before the scan.
+
+A rule may name prerequisites by id (``"requires": ["required_media"]``;
+the id defaults to the rule's ``check`` param, else its name). If one of
+them failed – or was itself skipped – the rule is not run and reports a
+single "skipped" row instead. Accumulators only skipped rules need are
+not fed, and a dataset no runnable rule reads is not scanned at all.
+With ``fail_fast`` a plan stops at its first failed row.
+
+Accumulators fold in chunks with ``update(chunk)``; to scan a dataset in
+parallel they also ``merge(other)`` the accumulator of the rows that
+follow, and may ``prime(head)`` settings that must not differ between
+shards (such as a date format) on the first rows of the dataset. A
+``Sharded`` dataset is scanned that way by its own ``scan`` function.
+"""
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from .base import (
+    ColumnPlan, DateStats, FrameSource, FrameStats, KeyStats, ValidationReport,
+    check_dtypes, check_missing, clean_columns, emit_rows, iter_frames, parallel_map,
+    stream_rows,
+)
+
+TRANSFORM, SCHEMA, DATA = "transform", "schema", "data"
+PHASES = (TRANSFORM, SCHEMA, DATA)
+
+# Accumulator key: its name plus arguments, e.g. ("dates", "Date")
+AccKey = Tuple[Any, ...]
+
+
+class Rule(NamedTuple):
+    """A registered rule implementation."""
+    phase: str
+    fn: Callable[..., None]
+    # accumulator keys the rule reads, per dataset, given its params
+    needs: Callable[[Dict[str, Any]], List[AccKey]]
+    # header-only variant run by ``Plan.preflight`` (data rules)
+    header: Optional[Callable[..., None]] = None
+    # looks at every column of its datasets, not just the planned ones
+    every_column: bool = False
+
+
+RULES: Dict[str, Rule] = {}
+ACCUMULATORS: Dict[str, Callable[..., Any]] = {}
+
+
+def rule(
+    name: str,
+    phase: str,
+    *,
+    needs: Callable[[Dict[str, Any]], List[AccKey]] = lambda params: [],
+    header: Optional[Callable[..., None]] = None,
+    every_column: bool = False,
+) -> Callable:
+    """
+    Register a rule implementation under ``name``.
+
+    Transform rules are called as ``fn(rep, df, **params)`` with the first
+    chunk, schema rules as ``fn(rep, columns, **params)`` and data rules as
+    ``fn(rep, data, **params)`` with a ``DatasetView`` – or a list of them
+    for steps spanning several ``datasets``. A data rule reporting on
+    every column, not only those a pipeline plans to read, says so with
+    ``every_column`` (see ``Pipeline.reads``).
+    """
+    def _register(fn: Callable[..., None]) -> Callable[..., None]:
+        RULES[name] = Rule(phase, fn, needs, header, every_column)
+        return fn
+    return _register
+
+
+def accumulator(name: str) -> Callable:
+    """
+    Register a chunk accumulator: ``factory(*args)`` with ``update(chunk)``
+    and ``merge(other)``, optionally ``prime(head)``.
+    """
+    def _register(factory: Callable[..., Any]) -> Callable[..., Any]:
+        ACCUMULATORS[name] = factory
+        return factory
+    return _register
+
+
+class _DateColumn:
+    """``DateStats`` of one column; parsed columns are replaced in the chunk."""
+    def __init__(self, column: str, parse: bool = False) -> None:
+        self.column = column
+        self.parse = parse
+        self.dates = DateStats()
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        values = self.convert(chunk)
+        if self.parse and values is not None:
+            chunk[self.column] = values
+
+    def convert(self, chunk: pd.DataFrame) -> Optional[pd.Series]:
+        """Track the chunk's column, returning it as dates; the chunk is left alone."""
+        if self.column in chunk.columns:
+            return self.dates.update(chunk[self.column])
+        return None
+
+    def prime(self, head: pd.DataFrame) -> None:
+        if self.column in head.columns and not pd.api.types.is_datetime64_any_dtype(head[self.column]):
+            self.dates.infer(head[self.column])
+
+    def merge(self, other: "_DateColumn") -> None:
+        self.dates.merge(other.dates)
+
+
+# ("stats",) counts nulls and dtypes; rules needing more name the figures,
+# e.g. ("stats", "distinct") – read with ``view.acc("stats", "distinct")``
+accumulator("stats")(FrameStats)
+accumulator("dates")(_DateColumn)
+accumulator("keys")(KeyStats)
+
+
+class DatasetView:
+    """What data rules see of a scanned dataset."""
+    def __init__(self, name: str, columns: List[str], accs: Dict[AccKey, Any]) -> None:
+        self.name = name
+        self.columns = columns
+        self._accs = accs
+
+    def acc(self, *key: Any) -> Any:
+        return self._accs[key]
+
+    @property
+    def stats(self) -> FrameStats:
+        return self._accs[("stats",)]
+
+    def dates(self, column: str) -> DateStats:
+        return self._accs[("dates", column)].dates
+
+
+class Sharded(NamedTuple):
+    """
+    A dataset a plan does not scan itself, e.g. because its shards are
+    scanned on a process pool. ``head`` – the first rows – goes through
+    the transform and schema phases like a first chunk; then
+    ``scan(keys, head)`` returns the dataset's accumulators by key, fed
+    with every row (see ``Plan.scan`` and ``merge_scans``).
+    """
+    head: pd.DataFrame
+    scan: Callable[[List[AccKey], pd.DataFrame], Dict[AccKey, Any]]
+
+
+def merge_scans(parts: List[Dict[AccKey, Any]]) -> Dict[AccKey, Any]:
+    """The accumulators of consecutive shards' scans, merged in order."""
+    merged = parts[0]
+    for part in parts[1:]:
+        for key, acc in merged.items():
+            acc.merge(part[key])
+    return merged
+
+
+class Step(NamedTuple):
+    """One compiled rule of a plan, at its position in the spec."""
+    index: int
+    name: str
+    rule: Rule
+    datasets: Tuple[str, ...]
+    spans: bool  # declared with "datasets" rather than "dataset"
+    params: Dict[str, Any]
+    id: str = ""
+    requires: Tuple[int, ...] = ()  # indexes of prerequisite steps
+
+
+class _FailFast(Exception):
+    """A step failed and the plan runs with ``fail_fast``."""
+
+
+class _Rows:
+    """
+    Streams each step's rows as the step completes – the transform and
+    schema steps' before any row is scanned – and adds them to the report
+    in spec order; tracks the steps that failed (or were skipped) for
+    their dependents.
+    """
+    def __init__(self, steps: List[Step], fail_fast: bool = False) -> None:
+        self.report = ValidationReport()
+        self.failed: Set[int] = set()
+        self._steps = steps
+        self._fail_fast = fail_fast
+        self._done: Dict[int, ValidationReport] = {}
+        self._next = 0
+
+    def skip_if_blocked(self, step: Step) -> bool:
+        """Skip ``step`` if a prerequisite failed; tell whether it did."""
+        blocked = [self._steps[i].id for i in step.requires if i in self.failed]
+        if blocked:
+            self.skip(step, f"{', '.join(blocked)} failed")
+        return bool(blocked)
+
+    def run(self, step: Step, fn: Callable[..., None], *args: Any) -> None:
+        if self.skip_if_blocked(step):
+            return
+        buf = ValidationReport()
+        with stream_rows(None):
+            fn(buf, *args, **step.params)
+        self._finish(step, buf)
+
+    def skip(self, step: Step, reason: Optional[str] = None) -> None:
+        """Skip ``step``: silently, or reporting why its dependents won't run."""
+        buf = ValidationReport()
+        if reason is not None:
+            with stream_rows(None):
+                buf.skip(step.id, reason)
+        self._finish(step, buf)
+
+    def _finish(self, step: Step, buf: ValidationReport) -> None:
+        if any(row["status"] in ("fail", "skipped") for row in buf.rows()):
+            self.failed.add(step.index)
+        self._done[step.index] = buf
+        self._flush()
+        emit_rows(buf.rows())
+        if self._fail_fast and not buf.ok:
+            raise _FailFast()
+
+    def _flush(self) -> None:
+        # rows are streamed once, as their step completes
+        with stream_rows(None):
+            while self._next in self._done:
+                for row in self._done.pop(self._next).rows():
+                    self.report.add(row["check"], row["status"], row["msg"], row["column"])
+                self._next += 1
+
+    def close(self) -> ValidationReport:
+        """After a fail-fast stop: the rows done so far, up to the first failure."""
+        if not self.report.ok:
+            return self.report
+        with stream_rows(None):
+            for index in sorted(self._done):
+                for row in self._done.pop(index).rows():
+                    self.report.add(row["check"], row["status"], row["msg"], row["column"])
+                    if row["status"] == "fail":
+                        return self.report
+        return self.report
+
+
+class Plan:
+    """A compiled spec: see the module docstring."""
+    def __init__(self, spec: Dict[str, Any], steps: List[Step]) -> None:
+        self.spec = spec
+        self.label: str = spec.get("label", "Pipeline")
+        self.datasets: List[str] = list(spec["datasets"])
+        self.steps = steps
+        self.accumulators = self._needs(steps)
+
+    def _needs(self, steps: List[Step]) -> Dict[str, List[AccKey]]:
+        """
+        The accumulators ``steps`` read, by dataset: one scan per dataset
+        feeds each once. Parsed dates are tracked even if no rule reads
+        them, as the parse changes what the other accumulators see;
+        datasets no data step reads need nothing.
+        """
+        needs: Dict[str, List[AccKey]] = {name: [] for name in self.datasets}
+        for step in steps:
+            if step.rule.phase != DATA:
+                continue
+            for name in step.datasets:
+                if not needs[name]:
+                    parse = self.spec["datasets"][name].get("parse_dates", [])
+                    needs[name] = [("dates", col) for col in parse]
+                for key in step.rule.needs(step.params):
+                    if key not in needs[name]:
+                        needs[name].append(key)
+        return needs
+
+    def reads_every_column(self, name: str) -> bool:
+        """Whether a data step of dataset ``name`` looks at all of its columns."""
+        return any(
+            step.rule.every_column and name in step.datasets for step in self._phase(DATA)
+        )
+
+    def _runnable(self, failed: Set[int]) -> List[Step]:
+        """Data steps not doomed by the ``failed`` steps, directly or not."""
+        doomed = set(failed)
+        runnable = []
+        for step in self._phase(DATA):
+            if any(i in doomed for i in step.requires):
+                doomed.add(step.index)
+            else:
+                runnable.append(step)
+        return runnable
+
+    def _phase(self, phase: str) -> Iterator[Step]:
+        return (step for step in self.steps if step.rule.phase == phase)
+
+    def check_inputs(self, dfs: Dict[str, Any]) -> None:
+        """Raise ``ValueError`` unless ``dfs`` has every dataset."""
+        if all(name in dfs for name in self.datasets):
+            return
+        if len(self.datasets) == 1:
+            raise ValueError(f"{self.label} expects a DataFrame with key '{self.datasets[0]}'")
+        keys = " and ".join(f"'{name}'" for name in self.datasets)
+        raise ValueError(f"{self.label} expects DataFrames with keys {keys}")
+
+    def _new_accumulators(
+        self, name: str, keys: List[AccKey]
+    ) -> Tuple[List[Any], Dict[AccKey, Any]]:
+        """
+        The dataset's accumulators, in feeding order: columns listed in
+        ``parse_dates`` are converted first, so the profile and every
+        later accumulator see dates; the rest see the values as parsed.
+        """
+        parse = set(self.spec["datasets"][name].get("parse_dates", []))
+        accs: Dict[AccKey, Any] = {}
+        for key in keys:
+            if key[0] == "dates":
+                accs[key] = _DateColumn(key[1], parse=key[1] in parse)
+            else:
+                accs[key] = ACCUMULATORS[key[0]](*key[1:])
+
+        def _order(key: AccKey) -> int:
+            if key[0] == "dates" and accs[key].parse:
+                return 0
+            return 1 if key[0] == "stats" else 2
+        return [accs[key] for key in sorted(accs, key=_order)], accs
+
+    def new_accumulator(self, name: str, key: AccKey) -> Any:
+        """A fresh accumulator ``key`` of dataset ``name``, e.g. to fill from file metadata."""
+        return self._new_accumulators(name, [key])[1][key]
+
+    def scan(
+        self,
+        name: str,
+        keys: List[AccKey],
+        chunks: Iterator[pd.DataFrame],
+        head: Optional[pd.DataFrame] = None,
+    ) -> Dict[AccKey, Any]:
+        """
+        Feed the accumulators ``keys`` of dataset ``name`` with ``chunks``.
+        Given the (transformed) ``head`` of the dataset, the chunks take
+        its column names and the accumulators are primed with it first –
+        pass it when scanning a shard.
+        """
+        ordered, accs = self._new_accumulators(name, keys)
+        if not ordered:
+            return accs
+        if head is not None:
+            for acc in ordered:
+                if hasattr(acc, "prime"):
+                    acc.prime(head)
+        # date columns are parsed side by side, then written back to the
+        # chunk for the other accumulators, which only read it
+        parsers = [acc for acc in ordered if isinstance(acc, _DateColumn) and acc.parse]
+        readers = ordered[len(parsers):]
+        for chunk in chunks:
+            if head is not None and chunk is not head:
+                chunk.columns = head.columns
+            for acc, values in zip(parsers, parallel_map(lambda acc: acc.convert(chunk), parsers)):
+                if values is not None:
+                    chunk[acc.column] = values
+            parallel_map(lambda acc: acc.update(chunk), readers)
+        return accs
+
+    def run(self, frames: Dict[str, FrameSource], *, fail_fast: bool = False) -> ValidationReport:
+        """
+        Validate ``frames`` (DataFrames, iterables of row chunks or
+        ``Sharded`` datasets) by dataset; with ``fail_fast``, stop at the
+        first failed row.
+        """
+        self.check_inputs(frames)
+        rows = _Rows(self.steps, fail_fast)
+        try:
+            self._run(frames, rows)
+        except _FailFast:
+            return rows.close()
+        return rows.report
+
+    def _run(self, frames: Dict[str, FrameSource], rows: "_Rows") -> None:
+
+        # 1. headers: transform the first chunk of each dataset
+        chunks = {name: _chunks(frames[name]) for name in self.datasets}
+        firsts = {name: next(chunks[name], None) for name in self.datasets}
+        for step in self._phase(TRANSFORM):
+            first = firsts[step.datasets[0]]
+            if first is None:
+                rows.skip(step)
+            else:
+                rows.run(step, step.rule.fn, first)
+        columns = {
+            name: list(first.columns) if first is not None else []
+            for name, first in firsts.items()
+        }
+
+        # 2. schema checks, before any row is read
+        for step in self._phase(SCHEMA):
+            rows.run(step, step.rule.fn, columns[step.datasets[0]])
+
+        # 3. a single scan of each dataset, feeding what the data steps
+        # left to run read
+        needs = self._needs(self._runnable(rows.failed))
+        views = {}
+        for name in self.datasets:
+            first = firsts[name]
+            if isinstance(frames[name], Sharded):
+                accs = frames[name].scan(needs[name], first) if needs[name] else {}
+            elif first is not None:
+                accs = self.scan(name, needs[name], _chain(first, chunks[name]), first)
+            else:
+                accs = self.scan(name, needs[name], iter(()))
+            views[name] = DatasetView(name, columns[name], accs)
+
+        # 4. data checks
+        for step in self._phase(DATA):
+            data = [views[name] for name in step.datasets]
+            rows.run(step, step.rule.fn, data if step.spans else data[0])
+
+    def preflight(
+        self, headers: Dict[str, List[str]], *, fail_fast: bool = False
+    ) -> Optional[ValidationReport]:
+        """
+        Header-only checks: the transform and schema rules, plus the
+        header variants of data rules. Data rules without one are left
+        out, unless a failed prerequisite already says they are skipped.
+        Returns None if a header is missing.
+        """
+        if not all(name in headers for name in self.datasets):
+            return None
+        rows = _Rows(self.steps, fail_fast)
+        try:
+            self._preflight(headers, rows)
+        except _FailFast:
+            return rows.close()
+        return rows.report
+
+    def _preflight(self, headers: Dict[str, List[str]], rows: "_Rows") -> None:
+        frames = {name: pd.DataFrame(columns=headers[name]) for name in self.datasets}
+        for step in self._phase(TRANSFORM):
+            rows.run(step, step.rule.fn, frames[step.datasets[0]])
+        for step in self._phase(SCHEMA):
+            rows.run(step, step.rule.fn, list(frames[step.datasets[0]].columns))
+        for step in self._phase(DATA):
+            if rows.skip_if_blocked(step):
+                continue
+            if step.rule.header is not None and not step.spans:
+                rows.run(step, step.rule.header, list(frames[step.datasets[0]].columns))
+            else:
+                rows.skip(step)
+
+
+class Pipeline(NamedTuple):
+    """
+    A validation pipeline: its plan plus what the service needs to feed
+    it – the columns to read from uploads, by DataFrame key, and a cost
+    hint, the validation cost per row relative to the built-in pipelines.
+    """
+    plan: Plan
+    columns: Dict[str, ColumnPlan] = {}
+    cost: float = 1.0
+
+    @property
+    def keys(self) -> List[str]:
+        """The DataFrame keys the pipeline expects, e.g. media and sales."""
+        return self.plan.datasets
+
+    def reads(self, key: str) -> Optional[ColumnPlan]:
+        """
+        The columns to read from uploads of DataFrame ``key``: the planned
+        ones – or every column, with the planned dtypes, if a rule looks
+        at them all (e.g. ``missing``), so an upload is reported on like
+        the same rows posted as JSON.
+        """
+        columns = self.columns.get(key)
+        if columns is not None and self.plan.reads_every_column(key):
+            return columns.widened()
+        return columns
+
+
+def _chunks(src: Any) -> Iterator[pd.DataFrame]:
+    # a sharded dataset only shows its head here
+    return iter([src.head]) if isinstance(src, Sharded) else iter_frames(src)
+
+
+def _chain(first: pd.DataFrame, rest: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    yield first
+    yield from rest
+
+
+def compile_plan(spec: Dict[str, Any]) -> Plan:
+    """
+    Check a spec against the registered rules and compile it. Every
+    prerequisite must name a single rule that runs before its dependent,
+    so the dependencies form a DAG in execution order.
+    """
+    datasets = spec.get("datasets") or {}
+    steps = []
+    ids: Dict[str, List[int]] = {}
+    for index, entry in enumerate(spec.get("rules", [])):
+        params = dict(entry)
+        name = params.pop("rule")
+        if name not in RULES:
+            raise ValueError(f"Unknown rule: {name}")
+        spans = "datasets" in params
+        targets = tuple(params.pop("datasets")) if spans else (params.pop("dataset"),)
+        unknown = [t for t in targets if t not in datasets]
+        if unknown:
+            raise ValueError(f"Rule {name} refers to unknown datasets {unknown}")
+        rule_ = RULES[name]
+        if rule_.phase != DATA and spans:
+            raise ValueError(f"{rule_.phase.capitalize()} rule {name} takes a single dataset")
+        step_id = params.pop("id", None) or params.get("check", name)
+        requires = params.pop("requires", [])
+        ids.setdefault(step_id, []).append(index)
+        steps.append(Step(index, name, rule_, targets, spans, params, step_id, tuple(requires)))
+
+    def _order(step: Step) -> Tuple[int, int]:
+        return PHASES.index(step.rule.phase), step.index
+
+    for i, step in enumerate(steps):
+        prerequisites = []
+        for req in step.requires:
+            found = ids.get(req, [])
+            if len(found) != 1:
+                problem = "unknown" if not found else "ambiguous"
+                raise ValueError(f"Rule {step.id} requires {problem} rule id {req!r}")
+            if _order(steps[found[0]]) >= _order(step):
+                raise ValueError(f"Rule {step.id} requires {req}, which runs after it")
+            prerequisites.append(found[0])
+        steps[i] = step._replace(requires=tuple(prerequisites))
+    return Plan(spec, steps)
+
+
+# ---- rules shared by the pipelines ----------------------------------------
+
+@rule("clean_columns", TRANSFORM)
+def _clean_columns(rep: ValidationReport, df: pd.DataFrame) -> None:
+    clean_columns(df, rep)
+
+
+@rule("section", SCHEMA)
+def _section(rep: ValidationReport, columns: List[str], *, label: str) -> None:
+    rep.pass_("section", label)  # marker for section in report
+
+
+@rule("required_columns", SCHEMA)
+def _required_columns(
+    rep: ValidationReport, columns: List[str], *, required: List[str], check: str
+) -> None:
+    missing_columns = [c for c in required if c not in columns]
+    if not missing_columns:
+        rep.pass_(check, "all required columns present")
+    else:
+        rep.fail(check, f"missing columns: {missing_columns}")
+
+
+@rule("missing", DATA, needs=lambda params: [("stats",)], every_column=True)
+def _missing(rep: ValidationReport, data: DatasetView, *, critical: Optional[List[str]] = None) -> None:
+    check_missing(data.stats, rep, critical=critical)
+
+
+@rule("dtypes", DATA, needs=lambda params: [("stats",)])
+def _dtypes(rep: ValidationReport, data: DatasetView, *, expected: Dict[str, str]) -> None:
+    check_dtypes(data.stats, rep, expected)
+
+
+@rule("record_count", DATA, needs=lambda params: [("stats",)])
+def _record_count(
+    rep: ValidationReport,
+    data: DatasetView,
+    *,
+    empty_msg: str = "Dataset is empty",
+    empty_check: str = "data_empty",
+    count_check: str = "records_count",
+) -> None:
+    if data.stats.empty:
+        rep.fail(empty_check, empty_msg)
+    else:
+        rep.pass_(count_check, f"{data.stats.n_rows} records")
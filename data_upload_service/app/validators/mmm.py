@@ -1,7 +1,8 @@
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-from .base import ValidationReport, clean_columns, check_missing, check_dtypes
+from .base import ValidationReport, ColumnPlan, FrameSource
+from .engine import DATA, DatasetView, Pipeline, Plan, accumulator, compile_plan, rule
 
 # Configuration constants for MMM validation
 _MMM_MEDIA = {
@@ -22,9 +23,108 @@ _MMM_SALES = {
                "Price": "float64", "Year": "object"},
 }
 
+# Hierarchy columns shared by both datasets; loaded as categoricals (a few
+# distinct labels repeated over every row)
+_MMM_DIMENSIONS = ["Market", "Channel", "Region", "Category", "SubCategory", "Brand",
+                   "Variant", "PackType", "PPG", "PackSize"]
+
+def _column_plan(rules: Dict[str, Any]) -> ColumnPlan:
+    """Columns read from an uploaded file for the given rules."""
+    dims = _MMM_DIMENSIONS + ["Media Category", "Media Subcategory"]
+    return ColumnPlan(
+        [*rules["required"], *rules["non_null"], *rules["dtypes"]],
+        dtypes={c: "category" for c in dims if c not in rules["dtypes"]},
+    )
+
+MMM_COLUMNS = {"media": _column_plan(_MMM_MEDIA), "sales": _column_plan(_MMM_SALES)}
+
+# Hierarchy and period columns both datasets are joined on
+_MMM_KEYS = ["Market", "Region", "Category", "SubCategory", "Brand", "Year", "Month", "Week"]
+
+# Orphan keys quoted per side by key_alignment
+_KEY_SAMPLES = 5
+
+@accumulator("periods")
+class _PeriodStats:
+    """Year/Month values of one dataset, accumulated chunk by chunk."""
+    def __init__(self) -> None:
+        self.years: List[Any] = []
+        self.months: set = set()
+        self.pairs: set = set()
+        self.coverage_error: Optional[Exception] = None
+        self.alignment_error: Optional[Exception] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        for col in ("Year", "Month"):
+            if col not in chunk.columns:
+                self.alignment_error = self.alignment_error or KeyError(col)
+                return
+        pairs = chunk[["Year", "Month"]].drop_duplicates()
+        self.pairs.update(pairs.itertuples(index=False, name=None))
+        self.years.extend(chunk["Year"].unique())
+        if self.coverage_error is None:
+            try:
+                self.months.update(chunk["Month"].astype(int).unique())
+            except Exception as e:
+                self.coverage_error = e
+
+    def merge(self, other: "_PeriodStats") -> None:
+        """Fold in the periods of the rows that follow."""
+        if self.alignment_error is None:
+            self.alignment_error = other.alignment_error
+            self.pairs |= other.pairs
+            self.years += other.years
+        if self.coverage_error is None:
+            self.coverage_error = other.coverage_error
+            self.months |= other.months
+
+    def years_as_str(self, dtype) -> List[str]:
+        # cast with the dtype of the whole column so e.g. 2023 and 2023.0
+        # render the same way as they would in a single-frame read
+        return pd.Series(self.years, dtype=object).astype(dtype).astype(str).unique()
+
+
+def mmm_spec(
+    *,
+    media_rules: Dict[str, Any] = _MMM_MEDIA,
+    sales_rules: Dict[str, Any] = _MMM_SALES,
+) -> Dict[str, Any]:
+    """Rule spec of the MMM checks (see ``engine``)."""
+    rules: List[Dict[str, Any]] = []
+    for tag, tag_rules in (("media", media_rules), ("sales", sales_rules)):
+        rules += [
+            {"rule": "section", "dataset": tag, "label": tag},
+            # Clean column names (remove whitespace)
+            {"rule": "clean_columns", "dataset": tag},
+            # Check for missing values in critical columns
+            {"rule": "missing", "dataset": tag, "critical": list(tag_rules["non_null"])},
+            # Validate data types
+            {"rule": "dtypes", "dataset": tag, "expected": dict(tag_rules["dtypes"])},
+            # Check for required columns
+            {"rule": "required_columns", "dataset": tag,
+             "required": list(tag_rules["required"]), "check": f"required_{tag}"},
+            # Check if DataFrame is empty
+            {"rule": "record_count", "dataset": tag, "id": f"records_{tag}",
+             "empty_check": f"data_empty_{tag}", "count_check": f"records_count_{tag}"},
+            # Check for time period coverage, once Year and Month are known
+            # to be there
+            {"rule": "time_coverage", "dataset": tag, "check": f"time_coverage_{tag}",
+             "requires": [f"required_{tag}"]},
+        ]
+    # Check for consistency between datasets, if both have periods
+    both = ["required_media", "required_sales", "records_media", "records_sales"]
+    rules.append({"rule": "time_alignment", "datasets": ["media", "sales"], "requires": both})
+    # Check the datasets cover the same hierarchy keys
+    rules.append({
+        "rule": "key_alignment", "datasets": ["media", "sales"], "columns": _MMM_KEYS,
+        "requires": both,
+    })
+    return {"label": "MMM", "datasets": {"media": {}, "sales": {}}, "rules": rules}
+
+
 def validate_mmm(
-    media_df: pd.DataFrame,
-    sales_df: pd.DataFrame,
+    media_df: FrameSource,
+    sales_df: FrameSource,
     *,
     media_rules: Dict[str, Any] = _MMM_MEDIA,
     sales_rules: Dict[str, Any] = _MMM_SALES,
@@ -34,10 +134,10 @@ def validate_mmm(
     
     Parameters
     ----------
-    media_df : pd.DataFrame
-        DataFrame containing media spend data
-    sales_df : pd.DataFrame
-        DataFrame containing sales data
+    media_df : pd.DataFrame or iterable of pd.DataFrame
+        DataFrame containing media spend data, or its row chunks
+    sales_df : pd.DataFrame or iterable of pd.DataFrame
+        DataFrame containing sales data, or its row chunks
     media_rules : Dict[str, Any], optional
         Validation rules for media data
     sales_rules : Dict[str, Any], optional
@@ -48,70 +148,98 @@ def validate_mmm(
     ValidationReport
         Validation results with checks for both datasets
     """
-    rep = ValidationReport()
+    plan = _plan(media_rules, sales_rules)
+    return plan.run({"media": media_df, "sales": sales_df})
 
-    def _validate_dataset(df: pd.DataFrame, tag: str, rules: Dict[str, Any]) -> None:
-        """Helper function to validate a single dataset with specified rules"""
-        rep.pass_("section", tag)  # marker for section in report
-        
-        # Clean column names (remove whitespace)
-        clean_columns(df, rep)
-        
-        # Check for missing values in critical columns
-        check_missing(df, rep, critical=rules["non_null"])
-        
-        # Validate data types
-        check_dtypes(df, rep, rules["dtypes"])
-        
-        # Check for required columns
-        missing_columns = [c for c in rules["required"] if c not in df.columns]
-        if not missing_columns:
-            rep.pass_(f"required_{tag}", "all required columns present")
-        else:
-            rep.fail(f"required_{tag}", f"missing columns: {missing_columns}")
+
+def preflight_mmm(
+    media_header: List[str],
+    sales_header: List[str],
+    *,
+    media_rules: Dict[str, Any] = _MMM_MEDIA,
+    sales_rules: Dict[str, Any] = _MMM_SALES,
+) -> ValidationReport:
+    """
+    Header-only checks, run before the data is parsed. A failing report
+    means the full validation would fail too.
+    """
+    plan = _plan(media_rules, sales_rules)
+    return plan.preflight({"media": media_header, "sales": sales_header})
+
+
+def _plan(media_rules: Dict[str, Any], sales_rules: Dict[str, Any]) -> Plan:
+    if media_rules is _MMM_MEDIA and sales_rules is _MMM_SALES:
+        return MMM_PLAN
+    return compile_plan(mmm_spec(media_rules=media_rules, sales_rules=sales_rules))
+
+
+@rule("time_coverage", DATA, needs=lambda params: [("stats",), ("periods",)])
+def _check_time_coverage(rep: ValidationReport, data: DatasetView, *, check: str) -> None:
+    stats, periods = data.stats, data.acc("periods")
+    if all(col in stats.columns for col in ["Year", "Month"]):
+        try:
+            if periods.coverage_error is not None:
+                raise periods.coverage_error
+            years = periods.years_as_str(stats.dtypes["Year"])
+            months = periods.months
+            rep.pass_(check, f"Years: {sorted(years)}, Months: {sorted(months)}")
+        except Exception as e:
+            rep.warn(check, f"Error analyzing time coverage: {str(e)}")
+
+
+@rule("time_alignment", DATA, needs=lambda params: [("stats",), ("periods",)])
+def _check_time_alignment(rep: ValidationReport, data: List[DatasetView]) -> None:
+    media, sales = data
+    # Check if time periods match
+    try:
+        for view in (media, sales):
+            if view.acc("periods").alignment_error is not None:
+                raise view.acc("periods").alignment_error
+        media_periods = media.acc("periods").pairs
+        sales_periods = sales.acc("periods").pairs
         
-        # Check if DataFrame is empty
-        if df.empty:
-            rep.fail(f"data_empty_{tag}", "Dataset is empty")
+        if media_periods == sales_periods:
+            rep.pass_("time_alignment", "Time periods match between datasets")
         else:
-            rep.pass_(f"records_count_{tag}", f"{len(df)} records")
+            media_only = media_periods - sales_periods
+            sales_only = sales_periods - media_periods
             
-        # Check for time period coverage
-        if all(col in df.columns for col in ["Year", "Month"]):
-            try:
-                years = df["Year"].astype(str).unique()
-                months = df["Month"].astype(int).unique()
-                rep.pass_(f"time_coverage_{tag}", f"Years: {sorted(years)}, Months: {sorted(months)}")
-            except Exception as e:
-                rep.warn(f"time_coverage_{tag}", f"Error analyzing time coverage: {str(e)}")
-
-    # Validate media dataset
-    _validate_dataset(media_df, "media", media_rules)
-    
-    # Validate sales dataset
-    _validate_dataset(sales_df, "sales", sales_rules)
-    
-    # Check for consistency between datasets
-    if not media_df.empty and not sales_df.empty:
-        # Check if time periods match
-        try:
-            media_periods = set(zip(media_df["Year"], media_df["Month"]))
-            sales_periods = set(zip(sales_df["Year"], sales_df["Month"]))
+            msg = []
+            if media_only:
+                msg.append(f"Periods in media but not in sales: {sorted(media_only)[:5]}...")
+            if sales_only:
+                msg.append(f"Periods in sales but not in media: {sorted(sales_only)[:5]}...")
             
-            if media_periods == sales_periods:
-                rep.pass_("time_alignment", "Time periods match between datasets")
-            else:
-                media_only = media_periods - sales_periods
-                sales_only = sales_periods - media_periods
-                
-                msg = []
-                if media_only:
-                    msg.append(f"Periods in media but not in sales: {sorted(media_only)[:5]}...")
-                if sales_only:
-                    msg.append(f"Periods in sales but not in media: {sorted(sales_only)[:5]}...")
-                
-                rep.warn("time_alignment", "; ".join(msg))
-        except Exception as e:
-            rep.warn("time_alignment", f"Error checking time alignment: {str(e)}")
-    
-    return rep
\ No newline at end of file
+            rep.warn("time_alignment", "; ".join(msg))
+    except Exception as e:
+        rep.warn("time_alignment", f"Error checking time alignment: {str(e)}")
+
+
+@rule("key_alignment", DATA, needs=lambda params: [("keys", tuple(params["columns"]))])
+def _check_key_alignment(rep: ValidationReport, data: List[DatasetView], *, columns: List[str]) -> None:
+    media, sales = data
+    missing = [c for c in columns if c not in media.columns or c not in sales.columns]
+    if missing:
+        rep.warn("key_alignment", f"key columns missing: {missing}")
+        return
+
+    media_keys = media.acc("keys", tuple(columns))
+    sales_keys = sales.acc("keys", tuple(columns))
+    msg = []
+    for side, other, keys, other_keys in (("media", "sales", media_keys, sales_keys),
+                                          ("sales", "media", sales_keys, media_keys)):
+        orphans = keys.orphans(other_keys)
+        if len(orphans):
+            samples = list(orphans.head(_KEY_SAMPLES).itertuples(index=False, name=None))
+            msg.append(f"{len(orphans)} keys in {side} but not in {other}, e.g. {samples}")
+    if msg:
+        rep.warn("key_alignment", "; ".join(msg))
+    else:
+        rep.pass_("key_alignment", f"All {len(media_keys.hashes)} keys match between datasets")
+
+
+# Compiled once the module's rules are registered
+MMM_PLAN = compile_plan(mmm_spec())
+
+# Registered with the service (see ``app.pipelines``)
+PIPELINE = Pipeline(MMM_PLAN, MMM_COLUMNS)
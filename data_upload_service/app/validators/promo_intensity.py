@@ -1,14 +1,53 @@
 import pandas as pd
-from typing import List
+from typing import Any, Dict, List
 
-from .base import ValidationReport, clean_columns, check_missing
+from .base import ValidationReport, ColumnPlan, FrameSource, check_date_format
+from .engine import DATA, SCHEMA, DatasetView, Pipeline, Plan, compile_plan, rule
 
 # Configuration constants for Promo Intensity validation
 _PI_REQUIRED = ["Channel", "Brand", "PPG", "SalesValue", "Volume"]
 _PI_AGG = ["Variant", "PackType", "PackSize"]
 
+# Columns the checks below look at, including any promotion/discount
+# indicator (the missing check has the others read too, see ``Pipeline.reads``)
+PI_COLUMNS = ColumnPlan(
+    [*_PI_REQUIRED, *_PI_AGG, "Price", "BasePrice", "Date", "Year", "Week"],
+    dtypes={c: "category" for c in ["Channel", "Brand", "PPG", *_PI_AGG]},
+    patterns=["promo", "discount"],
+)
+
+def promo_intensity_spec(
+    *,
+    required: List[str] = _PI_REQUIRED,
+    aggregators: List[str] = _PI_AGG,
+) -> Dict[str, Any]:
+    """Rule spec of the Promotional Intensity checks (see ``engine``)."""
+    return {
+        "label": "Promo intensity",
+        "datasets": {"data": {}},
+        "rules": [
+            # Clean column names (remove whitespace)
+            {"rule": "clean_columns", "dataset": "data"},
+            # Check for missing values in critical columns
+            {"rule": "missing", "dataset": "data", "critical": list(required)},
+            {"rule": "required_columns", "dataset": "data",
+             "required": list(required), "check": "required_cols"},
+            {"rule": "granularity", "dataset": "data"},
+            {"rule": "aggregators", "dataset": "data", "aggregators": list(aggregators)},
+            # Check price columns
+            {"rule": "numeric_columns", "dataset": "data", "columns": ["Price", "BasePrice"]},
+            # Check for promotion flag or discount
+            {"rule": "promotion_indicator", "dataset": "data"},
+            # Check if dataframe is empty
+            {"rule": "record_count", "dataset": "data"},
+            # Check for date ranges if available
+            {"rule": "date_range", "dataset": "data", "column": "Date"},
+        ],
+    }
+
+
 def validate_promo_intensity(
-    df: pd.DataFrame,
+    df: FrameSource,
     *,
     required: List[str] = _PI_REQUIRED,
     aggregators: List[str] = _PI_AGG,
@@ -18,8 +57,8 @@ def validate_promo_intensity(
     
     Parameters
     ----------
-    df : pd.DataFrame
-        DataFrame containing promotional data
+    df : pd.DataFrame or iterable of pd.DataFrame
+        DataFrame containing promotional data, or its row chunks
     required : List[str], optional
         List of required columns
     aggregators : List[str], optional
@@ -30,76 +69,96 @@ def validate_promo_intensity(
     ValidationReport
         Validation results
     """
-    rep = ValidationReport()
-    
-    # Clean column names (remove whitespace)
-    clean_columns(df, rep)
-    
-    # Check for missing values in critical columns
-    check_missing(df, rep, critical=required)
+    return _plan(required, aggregators).run({"data": df})
+
+
+def preflight_promo_intensity(
+    header: List[str],
+    *,
+    required: List[str] = _PI_REQUIRED,
+    aggregators: List[str] = _PI_AGG,
+) -> ValidationReport:
+    """
+    Header-only checks, run before the data is parsed. A failing report
+    means the full validation would fail too.
+    """
+    return _plan(required, aggregators).preflight({"data": header})
 
-    # Check for required columns
-    missing_columns = [c for c in required if c not in df.columns]
-    if not missing_columns:
-        rep.pass_("required_cols", "all required columns present")
-    else:
-        rep.fail("required_cols", f"missing columns: {missing_columns}")
 
+def _plan(required: List[str], aggregators: List[str]) -> Plan:
+    if list(required) == _PI_REQUIRED and list(aggregators) == _PI_AGG:
+        return PI_PLAN
+    return compile_plan(promo_intensity_spec(required=required, aggregators=aggregators))
+
+
+@rule("granularity", SCHEMA)
+def _check_granularity(rep: ValidationReport, columns: List[str]) -> None:
     # Check time granularity
-    has_date = "Date" in df.columns
-    has_week = "Year" in df.columns and "Week" in df.columns
+    has_date = "Date" in columns
+    has_week = "Year" in columns and "Week" in columns
     
     if has_date or has_week:
         rep.pass_("granularity", "daily" if has_date else "weekly")
     else:
         rep.fail("granularity", "need 'Date' or both 'Year' & 'Week'")
 
+
+@rule("aggregators", SCHEMA)
+def _check_aggregators(rep: ValidationReport, columns: List[str], *, aggregators: List[str]) -> None:
     # Check for aggregator columns
-    found_aggregators = [c for c in aggregators if c in df.columns]
+    found_aggregators = [c for c in aggregators if c in columns]
     if found_aggregators:
         rep.pass_("aggregators", f"found columns: {found_aggregators}")
     else:
         rep.warn("aggregators", f"none of the recommended aggregator columns found: {aggregators}")
 
-    # Check price columns
-    for col in ("Price", "BasePrice"):
-        if col in df.columns:
-            is_numeric = pd.api.types.is_numeric_dtype(df[col])
-            if is_numeric:
-                rep.pass_(col, "numeric data type confirmed")
-            else:
-                rep.warn(col, f"column found but not numeric (type: {df[col].dtype})")
-        else:
-            rep.warn(col, "column missing; will need to be computed later")
-    
-    # Check for promotion flag or discount
-    has_promo_flag = any(col for col in df.columns if "promo" in col.lower())
-    has_discount = any(col for col in df.columns if "discount" in col.lower())
+
+@rule("promotion_indicator", SCHEMA)
+def _check_promotion_indicator(rep: ValidationReport, columns: List[str]) -> None:
+    has_promo_flag = any(col for col in columns if "promo" in col.lower())
+    has_discount = any(col for col in columns if "discount" in col.lower())
     
     if has_promo_flag or has_discount:
         rep.pass_("promotion_indicator", "found promotion flag or discount column")
     else:
         rep.warn("promotion_indicator", "no promotion indicator found; will need to be derived")
-    
-    # Check if dataframe is empty
-    if df.empty:
-        rep.fail("data_empty", "Dataset is empty")
-    else:
-        rep.pass_("records_count", f"{len(df)} records")
-        
-    # Check for date ranges if available
-    if "Date" in df.columns:
-        try:
-            # Convert to datetime if not already
-            if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
-                df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-            
-            if not df["Date"].isna().all():
-                min_date = df["Date"].min().date()
-                max_date = df["Date"].max().date()
-                date_range = (max_date - min_date).days + 1
-                rep.pass_("date_range", f"from {min_date} to {max_date} ({date_range} days)")
-        except Exception as e:
-            rep.warn("date_range", f"error analyzing date range: {str(e)}")
-    
-    return rep
\ No newline at end of file
+
+
+@rule("numeric_columns", DATA, needs=lambda params: [("stats",)])
+def _check_numeric(rep: ValidationReport, data: DatasetView, *, columns: List[str]) -> None:
+    stats = data.stats
+    for col in columns:
+        if col in stats.columns:
+            is_numeric = pd.api.types.is_numeric_dtype(stats.dtypes[col])
+            if is_numeric:
+                rep.pass_(col, "numeric data type confirmed")
+            else:
+                rep.warn(col, f"column found but not numeric (type: {stats.dtypes[col]})")
+        else:
+            rep.warn(col, "column missing; will need to be computed later")
+
+
+@rule("date_range", DATA, needs=lambda params: [("dates", params["column"])])
+def _check_date_range(rep: ValidationReport, data: DatasetView, *, column: str) -> None:
+    if column not in data.columns:
+        return
+    dates = data.dates(column)
+    try:
+        if dates.error is not None:
+            raise dates.error
+
+        if not dates.all_missing:
+            min_date = dates.min.date()
+            max_date = dates.max.date()
+            date_range = (max_date - min_date).days + 1
+            rep.pass_("date_range", f"from {min_date} to {max_date} ({date_range} days)")
+            check_date_format(dates, rep, column)
+    except Exception as e:
+        rep.warn("date_range", f"error analyzing date range: {str(e)}")
+
+
+# Compiled once the module's rules are registered
+PI_PLAN = compile_plan(promo_intensity_spec())
+
+# Registered with the service (see ``app.pipelines``)
+PIPELINE = Pipeline(PI_PLAN, {"data": PI_COLUMNS})
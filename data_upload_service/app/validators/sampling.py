@@ -0,0 +1,280 @@
+"""
+Quick estimates from a random sample of the rows (``mode=sample``).
+
+The structural checks – a plan's preflight – still see the full header,
+while the data-level figures are estimated from a ``Sample`` of each
+dataset: the missing rate of each column, the rate of values that fail
+to coerce to the type the plan expects (``dtypes`` expectations and
+``parse_dates`` columns) and the duplicate row rate. Each estimate comes
+with a 95% confidence interval, quoted in its row's message and attached
+to the row as ``interval``. When a sample holds the whole dataset the
+figures are exact.
+"""
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .base import ValidationReport, hash_rows, infer_date_format, parse_dates, stream_rows
+from .engine import TRANSFORM, Plan
+
+# Two-sided 95% quantile of the standard normal distribution
+_Z = 1.959963984540054
+
+
+class Sample(NamedTuple):
+    """
+    Rows drawn at random from a dataset of ``total`` rows – a count if
+    ``exact``, else an estimate (e.g. from the size of a file). Duplicate
+    rows are counted on ``row_hashes``, hashes of the rows' full content,
+    if ``frame`` only holds the columns checked (default: on ``frame``).
+    """
+    frame: pd.DataFrame
+    total: int
+    exact: bool = True
+    row_hashes: Optional[np.ndarray] = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the sample is the whole dataset."""
+        return self.exact and len(self.frame) >= self.total
+
+
+def random_rows(df: pd.DataFrame, size: int, seed: int = 0) -> Sample:
+    """A simple random sample of ``size`` rows of ``df`` (all of them if fewer)."""
+    if len(df) <= size:
+        return Sample(df, len(df))
+    rows = np.sort(np.random.default_rng(seed).choice(len(df), size, replace=False))
+    return Sample(df.iloc[rows].reset_index(drop=True), len(df))
+
+
+def reservoir(chunks: Iterable[pd.DataFrame], size: int, seed: int = 0) -> Sample:
+    """
+    A uniform sample of ``size`` rows of a stream of row chunks, taken in
+    one pass with bounded memory (reservoir sampling, a chunk at a time).
+    """
+    rng = np.random.default_rng(seed)
+    kept: Optional[pd.DataFrame] = None
+    empty: Optional[pd.DataFrame] = None
+    seen = 0
+    for chunk in chunks:
+        if empty is None:
+            empty = chunk.iloc[:0]
+        if not len(chunk):
+            continue
+        index = seen + np.arange(len(chunk))
+        seen += len(chunk)
+        # row i takes slot i while the reservoir fills, then a random slot
+        # below i + 1 – if that is one of the reservoir's
+        slots = np.where(index < size, index, rng.integers(0, index + 1))
+        take = np.flatnonzero(slots < size)
+        # of the rows drawn into one slot, the last one stays
+        _, last = np.unique(slots[take][::-1], return_index=True)
+        take = take[len(take) - 1 - last]
+        new = chunk.iloc[take].set_axis(slots[take])
+        kept = new if kept is None else pd.concat([kept.drop(new.index, errors="ignore"), new])
+    if kept is None:
+        return Sample(empty if empty is not None else pd.DataFrame(), 0)
+    frame = kept.sort_index().reset_index(drop=True)
+    # chunks' categoricals concatenate to object when their labels differ
+    categorical = {c: "category" for c, t in empty.dtypes.items() if isinstance(t, pd.CategoricalDtype)}
+    return Sample(frame.astype(categorical), seen)
+
+
+def wilson(k: int, n: int, total: Optional[int] = None) -> Tuple[float, float]:
+    """
+    95% Wilson score interval of a rate seen ``k`` times in ``n`` draws;
+    narrowed by the finite-population correction when the draws come
+    from ``total`` rows, down to the rate itself when they are all of them.
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    if total is not None and total > 1:
+        if n >= total:
+            return p, p
+        n = n * (total - 1) / (total - n)
+    z2 = _Z * _Z
+    centre = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = _Z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def poisson(k: int) -> Tuple[float, float]:
+    """95% interval of a Poisson mean observed as ``k`` (Byar's approximation)."""
+    low = 0.0
+    if k > 0:
+        low = k * (1 - 1 / (9 * k) - _Z / (3 * math.sqrt(k))) ** 3
+    high = (k + 1) * (1 - 1 / (9 * (k + 1)) + _Z / (3 * math.sqrt(k + 1))) ** 3
+    return low, high
+
+
+def _pct(rate: float) -> str:
+    return f"{rate:.2%}"
+
+
+def _estimated(
+    rep: ValidationReport,
+    check: str,
+    column: Optional[str],
+    k: int,
+    n: int,
+    sample: Sample,
+    what: str,
+    status: str,
+) -> None:
+    """Report the rate ``k / n`` of rows that are ``what``, exactly or with its interval."""
+    rate = k / n
+    if sample.complete:
+        low = high = rate
+        msg = f"{k} {what} ({_pct(rate)})"
+    else:
+        low, high = wilson(k, n, round(sample.total * n / len(sample.frame)))
+        msg = f"~{_pct(rate)} {what} (95% CI {_pct(low)}–{_pct(high)})"
+    rep.add(check, status, msg, column, interval={"estimate": rate, "low": low, "high": high})
+
+
+def _transform(plan: Plan, name: str, frame: pd.DataFrame) -> None:
+    """Apply the dataset's transform rules (e.g. column renames) to ``frame``; their rows are dropped."""
+    with stream_rows(None):
+        for step in plan.steps:
+            if step.rule.phase == TRANSFORM and step.datasets[0] == name:
+                step.rule.fn(ValidationReport(), frame, **step.params)
+
+
+def _critical(plan: Plan, name: str) -> List[str]:
+    return [
+        column
+        for step in plan.steps if step.name == "missing" and name in step.datasets
+        for column in step.params.get("critical") or []
+    ]
+
+
+def _expected_types(plan: Plan, name: str) -> Dict[str, str]:
+    """Columns the plan expects numbers or dates in: column → "number" or "date"."""
+    kinds: Dict[str, str] = {}
+    for step in plan.steps:
+        if step.name == "dtypes" and name in step.datasets:
+            for column, dtype in step.params.get("expected", {}).items():
+                kind = np.dtype(dtype).kind
+                if kind in "iuf":
+                    kinds[column] = "number"
+                elif kind == "M":
+                    kinds[column] = "date"
+    for column in plan.spec["datasets"][name].get("parse_dates", []):
+        kinds[column] = "date"
+    return kinds
+
+
+def _coerced(values: pd.Series, kind: str) -> pd.Series:
+    if kind == "date":
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        fmt, _ = infer_date_format(values.dropna())
+        return parse_dates(values, fmt)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values
+    return pd.to_numeric(values.astype(object), errors="coerce")
+
+
+def _duplicates(rep: ValidationReport, check: str, sample: Sample) -> None:
+    """
+    Duplicate rows. A sample of a fraction f of the rows holds about f² of
+    the pairs of equal rows, so the pairs seen are scaled up by the number
+    of pairs of rows over the number of sampled pairs.
+    """
+    n = len(sample.frame)
+    hashes = sample.row_hashes if sample.row_hashes is not None else hash_rows(sample.frame)
+    _, counts = np.unique(hashes, return_counts=True)
+    if sample.complete:
+        k = int(n - len(counts))
+        rep.add(
+            check, "success_with_warning" if k else "success", f"{k} duplicate rows ({_pct(k / n)})",
+            interval={"estimate": k / n, "low": k / n, "high": k / n},
+        )
+        return
+    pairs = int((counts * (counts - 1) // 2).sum())
+    total = sample.total
+    scale = (total - 1) / (n - 1) if n > 1 else float(total)
+    rate, (low, high) = pairs * scale / n, poisson(pairs)
+    low, high = min(1.0, low * scale / n), min(1.0, high * scale / n)
+    rate = min(1.0, rate)
+    if pairs:
+        status, msg = "success_with_warning", f"~{_pct(rate)} duplicate rows (95% CI {_pct(low)}–{_pct(high)})"
+    else:
+        status, msg = "success", f"no duplicate rows in the sample (at most ~{_pct(high)} at 95%)"
+    rep.add(check, status, msg, interval={"estimate": rate, "low": low, "high": high})
+
+
+def _estimate_dataset(rep: ValidationReport, plan: Plan, name: str, sample: Sample, suffix: str) -> None:
+    if not sample.total:
+        rep.fail(f"data_empty{suffix}", "Dataset is empty")
+        return
+    rows = f"{sample.total} records" if sample.exact else f"~{sample.total} records (estimated)"
+    rep.pass_(f"records_count{suffix}", rows)
+
+    frame = sample.frame.copy()
+    _transform(plan, name, frame)
+    n = len(frame)
+    critical = set(_critical(plan, name))
+    for column, k in frame.isna().sum().items():
+        if k:
+            status = "fail" if column in critical else "success_with_warning"
+            _estimated(rep, f"missing_rate{suffix}", column, int(k), n, sample, "missing", status)
+
+    for column, kind in _expected_types(plan, name).items():
+        if column not in frame.columns:
+            continue
+        values = frame[column]
+        present = values.notna()
+        m = int(present.sum())
+        if not m:
+            continue
+        k = int((present & _coerced(values, kind).isna()).sum())
+        status = "fail" if k == m else "success_with_warning" if k else "success"
+        what = "not a date" if kind == "date" else "not a number"
+        _estimated(rep, f"coercion_rate{suffix}", column, k, m, sample, what, status)
+
+    _duplicates(rep, f"duplicate_rate{suffix}", sample._replace(frame=frame))
+
+
+def estimate(
+    plan: Plan,
+    headers: Dict[str, List[str]],
+    samples: Dict[str, Sample],
+    *,
+    fail_fast: bool = False,
+) -> ValidationReport:
+    """
+    The ``mode=sample`` report of ``plan``: its preflight on the full
+    ``headers`` – returned as is if it fails – then, dataset by dataset,
+    the figures estimated from ``samples``. With ``fail_fast`` the report
+    ends at its first failed row.
+    """
+    plan.check_inputs(samples)
+    plan.check_inputs(headers)
+    rep = plan.preflight(headers, fail_fast=fail_fast)
+    if not rep.ok:
+        return rep
+
+    sizes = [samples[name] for name in plan.datasets]
+    if all(sample.complete for sample in sizes):
+        rep.pass_("sample", "the sample is every row: figures are exact")
+    else:
+        drawn = sum(len(sample.frame) for sample in sizes)
+        total = sum(sample.total for sample in sizes)
+        rep.warn(
+            "sample",
+            f"figures estimated from {drawn} of ~{total} rows (95% confidence intervals); "
+            "validate with mode=full for exact results",
+        )
+    several = len(plan.datasets) > 1
+    for name in plan.datasets:
+        _estimate_dataset(rep, plan, name, samples[name], f"_{name}" if several else "")
+
+    if fail_fast and not rep.ok:
+        rows = rep.rows()
+        first = next(i for i, row in enumerate(rows) if row["status"] == "fail")
+        return ValidationReport.from_rows(rows[:first + 1])
+    return rep
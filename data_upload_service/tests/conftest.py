@@ -7,6 +7,14 @@ import io
 from data_upload_service.app.main import app
 from data_upload_service.app.validators.base import ValidationReport
 
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path_factory, monkeypatch):
+    """Keep on-disk caches out of the shared temp dir, and reports per test"""
+    from data_upload_service.app import cache, config
+    monkeypatch.setattr(config, "FRAME_CACHE_DIR", str(tmp_path_factory.mktemp("frames")))
+    monkeypatch.setattr(cache, "_report_cache", None)
+    monkeypatch.setattr(config, "JOB_DIR", str(tmp_path_factory.mktemp("jobs")))
+
 @pytest.fixture
 def client():
     """Return a TestClient for the FastAPI app"""
@@ -0,0 +1,106 @@
+# data_upload_service/tests/test_cache.py
+import json
+import os
+import time
+
+import pandas as pd
+
+from data_upload_service.app.cache import FrameCache, ReportCache
+from data_upload_service.app.validators.base import ValidationReport
+
+def _chunks(n):
+    return [pd.DataFrame({"a": list(range(n)), "b": ["x"] * n})]
+
+def test_frame_cache_round_trip(tmp_path):
+    """Stored chunks are replayed unchanged"""
+    cache = FrameCache(str(tmp_path), max_bytes=1 << 20)
+    assert cache.get("k") is None
+    stored = list(cache.store("k", _chunks(3)))
+    replayed = list(cache.get("k"))
+    assert len(replayed) == len(stored) == 1
+    pd.testing.assert_frame_equal(replayed[0], stored[0])
+
+def test_frame_cache_skips_incomplete_entries(tmp_path):
+    """An entry is only committed once every chunk was consumed"""
+    cache = FrameCache(str(tmp_path), max_bytes=1 << 20)
+    it = cache.store("k", _chunks(3) + _chunks(2))
+    next(it)
+    it.close()
+    assert cache.get("k") is None
+    assert os.listdir(tmp_path) == []
+
+def test_frame_cache_evicts_least_recently_used(tmp_path):
+    """Entries beyond the size budget are evicted oldest-use first"""
+    cache = FrameCache(str(tmp_path), max_bytes=1 << 20)
+    list(cache.store("old", _chunks(10)))
+    list(cache.store("new", _chunks(10)))
+    entry_size = sum(e.stat().st_size for e in os.scandir(tmp_path / "old"))
+
+    past = time.time() - 60
+    os.utime(tmp_path / "old", (past, past))
+    cache.get("new")
+    cache.max_bytes = 2 * entry_size
+    list(cache.store("newest", _chunks(10)))
+
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+    assert cache.get("newest") is not None
+
+def _report(msg):
+    rep = ValidationReport()
+    rep.fail("check", msg)
+    return rep
+
+def test_report_cache_evicts_least_recently_used():
+    """The memory tier stays within its byte budget, oldest entry first"""
+    one = len(json.dumps(_report("x" * 10).rows()))
+    reports = ReportCache(max_bytes=2 * one)
+    reports.put("a", _report("a" * 10))
+    reports.put("b", _report("b" * 10))
+    assert reports.get("a") is not None       # a is now the most recent
+    reports.put("c", _report("c" * 10))
+
+    assert reports.get("b") is None
+    assert reports.get("a").rows() == _report("a" * 10).rows()
+    assert reports.stats()["bytes"] <= 2 * one
+    assert reports.stats()["misses"] == 1
+
+def test_report_cache_disk_tier(tmp_path):
+    """A report stored by one process is served from disk to another"""
+    ReportCache(1024, directory=str(tmp_path), disk_max_bytes=1024).put("k", _report("boom"))
+    other = ReportCache(1024, directory=str(tmp_path), disk_max_bytes=1024)
+
+    assert other.get("k").rows() == _report("boom").rows()
+    assert other.get("k") is not None
+    assert other.stats()["disk_hits"] == 1
+    assert other.stats()["memory_hits"] == 1
+
+def test_report_cache_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    """The async accessors read and write the disk tier on worker threads"""
+    import asyncio
+    import threading
+    reports = ReportCache(1024, directory=str(tmp_path), disk_max_bytes=1024)
+    threads = []
+    for name in ("_read_disk", "_write_disk"):
+        def _record(*args, _io=getattr(reports, name)):
+            threads.append(threading.current_thread())
+            return _io(*args)
+        monkeypatch.setattr(reports, name, _record)
+
+    async def _use():
+        assert await reports.get_async("k") is None
+        await reports.put_async("k", _report("boom"))
+        fresh = ReportCache(1024, directory=str(tmp_path), disk_max_bytes=1024)
+        return (await fresh.get_async("k")).rows()
+
+    assert asyncio.run(_use()) == _report("boom").rows()
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+def test_report_cache_without_budget_keeps_nothing(tmp_path):
+    """A budget of 0 turns off the disk tier too"""
+    reports = ReportCache(0, directory=str(tmp_path), disk_max_bytes=1024)
+    reports.put("k", _report("boom"))
+
+    assert reports.get("k") is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,74 @@
+# data_upload_service/tests/test_category_forecasting.py
+import pandas as pd
+
+from data_upload_service.app.validators.category_forecasting import validate_category_forecasting
+
+def _frame(brands, periods=12, freq="MS"):
+    """One row per brand and period"""
+    dates = pd.date_range("2023-01-01", periods=periods, freq=freq)
+    return pd.concat(
+        [pd.DataFrame({"Date": dates, "Brand": b, "Sales": 1.0}) for b in brands],
+        ignore_index=True,
+    )
+
+def _row(rep, check):
+    r = next(r for r in rep.rows() if r["check"] == check)
+    return r["status"], r["msg"]
+
+def test_series_share_dates():
+    """The same date in different series is not a duplicate"""
+    rep = validate_category_forecasting(_frame(["A", "B", "C"]))
+    assert _row(rep, "duplicate_dates") == ("success", "")
+    assert _row(rep, "date_gaps") == ("success", "no missing monthly periods")
+
+def test_duplicates_and_gaps_per_series():
+    df = _frame(["A", "B", "C"])
+    df = pd.concat([df.drop([3, 4, 15]), df.iloc[[0, 0, 13]]], ignore_index=True)
+    chunks = iter([df.iloc[:10].copy(), df.iloc[10:].copy()])
+    rep = validate_category_forecasting(chunks)
+    assert _row(rep, "duplicate_dates") == (
+        "fail", "3 duplicate dates in 2 of 3 series; worst: Brand=A (2); Brand=B (1)"
+    )
+    assert _row(rep, "date_gaps") == (
+        "success_with_warning",
+        "3 missing monthly periods in 2 of 3 series; worst: Brand=A (2); Brand=B (1)",
+    )
+
+def test_weekly_gap_without_series_columns():
+    df = _frame(["A"], periods=10, freq="W").drop(columns="Brand").drop(4)
+    df["Date"] = df["Date"].astype(str)
+    rep = validate_category_forecasting(df)
+    assert _row(rep, "date_gaps") == ("success_with_warning", "1 missing weekly periods")
+
+def test_month_end_dates_are_monthly():
+    """Month-ends 28 to 31 days apart are one month apart"""
+    rep = validate_category_forecasting(_frame(["A", "B"], freq="M"))
+    assert _row(rep, "date_gaps") == ("success", "no missing monthly periods")
+
+    rep = validate_category_forecasting(_frame(["A"], freq="M").drop(columns="Brand").drop(5))
+    assert _row(rep, "date_gaps") == ("success_with_warning", "1 missing monthly periods")
+
+def test_quarter_end_gap():
+    df = _frame(["A"], periods=8, freq="Q").drop(columns="Brand").drop(3)
+    rep = validate_category_forecasting(df)
+    assert _row(rep, "date_gaps") == ("success_with_warning", "1 missing quarterly periods")
+
+def test_series_of_different_frequencies():
+    """Each series is checked against its own frequency"""
+    df = pd.concat([_frame(["A"]), _frame(["B"], periods=20, freq="W")], ignore_index=True)
+    rep = validate_category_forecasting(df)
+    assert _row(rep, "date_gaps") == ("success", "no missing monthly/weekly periods")
+
+    rep = validate_category_forecasting(df.drop(15))
+    assert _row(rep, "date_gaps") == (
+        "success_with_warning",
+        "1 missing monthly/weekly periods in 1 of 2 series; worst: Brand=B (1)",
+    )
+
+def test_fiscal_year_computed_at_runtime():
+    rep = validate_category_forecasting(_frame(["A"]))
+    row = next(r for r in rep.rows() if r["check"] == "fiscal_year")
+    assert row == {
+        "check": "fiscal_year", "status": "success_with_warning",
+        "msg": "will compute at runtime (start=4)", "column": None,
+    }
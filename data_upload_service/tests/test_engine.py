@@ -0,0 +1,121 @@
+# data_upload_service/tests/test_engine.py
+import itertools
+
+import pandas as pd
+import pytest
+
+from data_upload_service.app.pipelines import get_pipeline
+from data_upload_service.app.validators.base import column_threads, stream_rows
+from data_upload_service.app.validators.engine import compile_plan
+from data_upload_service.app.validators.mmm import _MMM_KEYS, MMM_PLAN
+
+def _spec(*rules):
+    return {"label": "Test", "datasets": {"data": {}}, "rules": list(rules)}
+
+def test_accumulators_are_shared():
+    """Every dataset is profiled once, however many rules read it"""
+    assert MMM_PLAN.accumulators == {
+        "media": [("stats",), ("periods",), ("keys", tuple(_MMM_KEYS))],
+        "sales": [("stats",), ("periods",), ("keys", tuple(_MMM_KEYS))],
+    }
+
+def test_rows_keep_spec_order():
+    """Schema rules run before the scan, but report in spec order"""
+    plan = compile_plan(_spec(
+        {"rule": "record_count", "dataset": "data"},
+        {"rule": "required_columns", "dataset": "data", "required": ["a", "z"], "check": "req"},
+    ))
+    rep = plan.run({"data": iter([pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [2]})])})
+    assert [r["check"] for r in rep.rows()] == ["records_count", "req"]
+    assert rep.rows()[0]["msg"] == "2 records"
+
+def test_schema_rows_stream_before_the_scan():
+    """A sink gets each rule's rows as it completes, not in spec order at the end"""
+    plan = compile_plan(_spec(
+        {"rule": "record_count", "dataset": "data"},
+        {"rule": "required_columns", "dataset": "data", "required": ["a"], "check": "req"},
+    ))
+    events = []
+    def _chunks():
+        for i in range(3):
+            events.append(f"chunk {i}")
+            yield pd.DataFrame({"a": [i]})
+    with stream_rows(lambda row: events.append(row["check"])):
+        rep = plan.run({"data": _chunks()})
+    assert events == ["chunk 0", "req", "chunk 1", "chunk 2", "records_count"]
+    assert [r["check"] for r in rep.rows()] == ["records_count", "req"]
+
+def test_column_threads_give_the_same_report(sample_cf_data):
+    """Parsing dates and running the accumulators on a thread pool changes nothing"""
+    from concurrent.futures import ThreadPoolExecutor
+    plan = get_pipeline("category_forecasting").plan
+    def _chunks():
+        return {"data": (sample_cf_data.iloc[i:i + 7].copy() for i in range(0, len(sample_cf_data), 7))}
+    inline = plan.run(_chunks())
+    with ThreadPoolExecutor(4) as pool, column_threads(pool):
+        threaded = plan.run(_chunks())
+    assert threaded.rows() == inline.rows()
+
+def test_preflight_skips_data_rules():
+    plan = compile_plan(_spec(
+        {"rule": "clean_columns", "dataset": "data"},
+        {"rule": "missing", "dataset": "data"},
+        {"rule": "required_columns", "dataset": "data", "required": ["a"], "check": "req"},
+    ))
+    rep = plan.preflight({"data": [" a"]})
+    assert [(r["check"], r["status"]) for r in rep.rows()] == [
+        ("cleanup", "success"), ("req", "success"),
+    ]
+    assert plan.preflight({}) is None
+
+def test_compile_errors():
+    with pytest.raises(ValueError, match="Unknown rule: nope"):
+        compile_plan(_spec({"rule": "nope", "dataset": "data"}))
+    with pytest.raises(ValueError, match="unknown datasets"):
+        compile_plan(_spec({"rule": "missing", "dataset": "other"}))
+
+def test_missing_dataset():
+    plan = compile_plan(_spec({"rule": "missing", "dataset": "data"}))
+    with pytest.raises(ValueError, match="Test expects a DataFrame with key 'data'"):
+        plan.run({})
+
+def test_dependents_of_failed_checks_are_skipped():
+    """A failed prerequisite skips its dependents, and theirs in turn"""
+    plan = compile_plan(_spec(
+        {"rule": "required_columns", "dataset": "data", "required": ["z"], "check": "req"},
+        {"rule": "record_count", "dataset": "data", "requires": ["req"]},
+        {"rule": "missing", "dataset": "data", "requires": ["record_count"]},
+    ))
+
+    def _never_read():
+        raise AssertionError("scanned a dataset no runnable rule reads")
+        yield
+
+    rows = plan.run({"data": itertools.chain([pd.DataFrame({"a": [1]})], _never_read())}).rows()
+    assert [(r["check"], r["status"], r["msg"]) for r in rows] == [
+        ("req", "fail", "missing columns: ['z']"),
+        ("record_count", "skipped", "req failed"),
+        ("missing", "skipped", "record_count failed"),
+    ]
+
+def test_prerequisites_must_run_first():
+    with pytest.raises(ValueError, match="which runs after it"):
+        compile_plan(_spec(
+            {"rule": "required_columns", "dataset": "data", "required": [], "check": "req",
+             "requires": ["record_count"]},
+            {"rule": "record_count", "dataset": "data"},
+        ))
+    with pytest.raises(ValueError, match="unknown rule id 'nope'"):
+        compile_plan(_spec({"rule": "missing", "dataset": "data", "requires": ["nope"]}))
+
+def test_fail_fast_skips_the_scan():
+    plan = compile_plan(_spec(
+        {"rule": "record_count", "dataset": "data"},
+        {"rule": "required_columns", "dataset": "data", "required": ["z"], "check": "req"},
+        {"rule": "missing", "dataset": "data"},
+    ))
+    chunks = iter([pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [2]})])
+    rep = plan.run({"data": chunks}, fail_fast=True)
+    assert [r["check"] for r in rep.rows()] == ["req"]
+    assert not rep.ok
+    assert len(list(chunks)) == 1  # only the header chunk was read
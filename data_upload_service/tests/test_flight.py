@@ -0,0 +1,72 @@
+# data_upload_service/tests/test_flight.py
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+flight = pytest.importorskip("pyarrow.flight")
+
+from data_upload_service.app.flight import ValidationFlightServer, validate_remote
+from data_upload_service.app.validator_dispatcher import dispatch_validation
+
+@pytest.fixture
+def flight_client():
+    """A client of a Flight server on a free local port"""
+    server = ValidationFlightServer("grpc://localhost:0")
+    client = flight.FlightClient(f"grpc://localhost:{server.port}")
+    yield client
+    client.close()
+    server.shutdown()
+
+def test_flight_report_matches_dispatch(flight_client, sample_cf_data):
+    rep = validate_remote(flight_client, "category_forecasting", {"data": pa.Table.from_pandas(sample_cf_data)})
+    expected = dispatch_validation("category_forecasting", {"data": sample_cf_data.copy()})
+    assert rep.rows() == expected.rows()
+    assert rep.ok == expected.ok
+
+def test_flight_stages_datasets(flight_client, sample_mmm_media_data, sample_mmm_sales_data):
+    """All datasets but the last go through DoPut"""
+    tables = {
+        "media": pa.Table.from_pandas(sample_mmm_media_data),
+        "sales": pa.Table.from_pandas(sample_mmm_sales_data),
+    }
+    rep = validate_remote(flight_client, "mmm", tables)
+    expected = dispatch_validation(
+        "mmm", {"media": sample_mmm_media_data.copy(), "sales": sample_mmm_sales_data.copy()}
+    )
+    assert rep.rows() == expected.rows()
+
+def test_flight_unknown_pipeline(flight_client, sample_cf_data):
+    with pytest.raises(flight.FlightServerError, match="Unknown pipeline"):
+        validate_remote(flight_client, "nope", {"data": pa.Table.from_pandas(sample_cf_data)})
+
+def test_staging_is_bounded(monkeypatch):
+    """Staged datasets are evicted over budget or once expired, and dropped when taken"""
+    from data_upload_service.app import flight as flight_app
+    table = pa.table({"x": list(range(1000))})
+    staging = flight_app._Staging(2 * table.nbytes, ttl=60)
+    staging.put("a", "media", table)
+    staging.put("b", "media", table)
+    staging.put("c", "media", table)
+    assert staging.take("a") == {}
+    assert staging.nbytes == 2 * table.nbytes
+    assert list(staging.take("b")) == ["media"]
+    assert staging.nbytes == table.nbytes
+    with pytest.raises(flight.FlightServerError, match="staging budget"):
+        staging.put("d", "media", pa.concat_tables([table] * 3))
+
+    clock = iter([0.0, 0.0, 100.0])
+    monkeypatch.setattr(flight_app, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+    expiring = flight_app._Staging(10 * table.nbytes, ttl=60)
+    expiring.put("a", "media", table)
+    assert expiring.take("a") == {}
+    assert expiring.nbytes == 0
+
+def test_flight_validation_times_out(flight_client, sample_cf_data, monkeypatch):
+    """Flight validations run on the executor, within the request timeout"""
+    import time
+    from data_upload_service.app import config, flight as flight_app
+    monkeypatch.setattr(config, "TIMEOUT_S", 0.05)
+    monkeypatch.setattr(flight_app, "dispatch_tables", lambda *args, **kwargs: time.sleep(0.5))
+    with pytest.raises(flight.FlightTimedOutError, match="did not finish"):
+        validate_remote(flight_client, "category_forecasting", {"data": pa.Table.from_pandas(sample_cf_data)})
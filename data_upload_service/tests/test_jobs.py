@@ -0,0 +1,82 @@
+# data_upload_service/tests/test_jobs.py
+import time
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from data_upload_service.app import config
+from data_upload_service.app.jobs import DONE, RUNNING, JobStore, job_store
+from data_upload_service.app.loaders import Upload
+from data_upload_service.app.main import app
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(config, "JOB_POLL_S", 0.02)
+
+def _wait_for(client, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_job_matches_synchronous_validation(sample_cf_csv, fast_polling):
+    """A queued job ends with the report /validate/file gives"""
+    content = sample_cf_csv.getvalue()
+    files = {"files": ("f.csv", content, "text/csv")}
+    with TestClient(app) as client:
+        submitted = client.post("/api/v1/jobs", files=files, data={"pipeline": "category_forecasting"})
+        assert submitted.status_code == status.HTTP_202_ACCEPTED
+        assert submitted.json()["status"] == "queued"
+
+        job = _wait_for(client, submitted.json()["id"])
+        sync = client.post("/api/v1/validate/file", files=files, data={"pipeline": "category_forecasting"})
+
+    assert job["status"] == DONE
+    assert job["progress"] == 1
+    assert job["result"] == sync.json()
+
+def test_failed_job_reports_error(fast_polling):
+    """Validation errors end the job as failed, with the message"""
+    files = {"files": ("f.csv", b"a,b\n1,2", "text/csv")}
+    with TestClient(app) as client:
+        submitted = client.post("/api/v1/jobs", files=files, data={"pipeline": "unknown"})
+        job = _wait_for(client, submitted.json()["id"])
+
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert job["result"] is None
+
+def test_job_survives_worker_restart(sample_cf_csv, fast_polling, monkeypatch):
+    """A job left running by a dead worker is run again once its lease lapses"""
+    monkeypatch.setattr(config, "JOB_LEASE_S", 0.05)
+    upload = Upload("f.csv", sample_cf_csv.getvalue(), "digest")
+    job = job_store().create("category_forecasting", {"data": upload})
+    assert job_store().claim("dead-worker").status == RUNNING
+    time.sleep(0.1)
+
+    with TestClient(app) as client:
+        finished = _wait_for(client, job.id)
+
+    assert finished["status"] == DONE
+    assert finished["result"]["rows"]
+
+def test_unknown_job(client):
+    response = client.get("/api/v1/jobs/nope")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_job_gives_up_after_max_attempts(tmp_path, monkeypatch):
+    """A job whose workers keep dying is eventually failed"""
+    monkeypatch.setattr(config, "JOB_LEASE_S", 0)
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 2)
+    store = JobStore(str(tmp_path))
+    job = store.create("category_forecasting", {"data": Upload("f.csv", b"a\n1", "d")})
+    assert store.claim("w1") is not None
+    time.sleep(0.01)
+    assert store.claim("w2") is not None
+    time.sleep(0.01)
+    assert store.claim("w3") is None
+    assert store.get(job.id).status == "failed"
@@ -0,0 +1,46 @@
+# data_upload_service/tests/test_mmm.py
+import pandas as pd
+
+from data_upload_service.app.validators.mmm import _MMM_MEDIA, _MMM_SALES, validate_mmm
+
+def _frame(required, brands, months, weeks_per_month=4):
+    """A dataset with every required column, one row per brand and week"""
+    rows = []
+    for brand in brands:
+        for month in months:
+            for week in range(weeks_per_month):
+                rows.append({"Brand": brand, "Year": 2023, "Month": month, "Week": week})
+    df = pd.DataFrame(rows)
+    for col in required:
+        if col not in df.columns:
+            df[col] = "x"
+    df["Amount_Spent"] = df["D1"] = df["Price"] = 1.0
+    return df
+
+def _row(rep, check):
+    return next(r for r in rep.rows() if r["check"] == check)
+
+def test_aligned_datasets():
+    media = _frame(_MMM_MEDIA["required"], ["A", "B"], [1, 2])
+    sales = _frame(_MMM_SALES["required"], ["B", "A"], [2, 1])
+    rep = validate_mmm(media, sales)
+    assert _row(rep, "time_alignment")["status"] == "success"
+    assert _row(rep, "key_alignment") == {
+        "check": "key_alignment", "status": "success",
+        "msg": "All 16 keys match between datasets", "column": None,
+    }
+
+def test_orphan_keys_are_counted_and_quoted():
+    """Same periods but other brands: time aligns, keys do not"""
+    media = _frame(_MMM_MEDIA["required"], ["A", "B"], [1])
+    sales = _frame(_MMM_SALES["required"], ["A", "C"], [1])
+    sales["Year"] = sales["Year"].astype(float)  # 2023.0 joins with 2023
+    chunks = [sales.iloc[i:i + 3] for i in range(0, len(sales), 3)]
+    rep = validate_mmm(media, iter(chunks))
+    assert _row(rep, "time_alignment")["status"] == "success"
+    row = _row(rep, "key_alignment")
+    assert row["status"] == "success_with_warning"
+    assert row["msg"].startswith(
+        "4 keys in media but not in sales, e.g. [('x', 'x', 'x', 'x', 'B', 2023, 1, 0), "
+    )
+    assert "; 4 keys in sales but not in media, e.g. [('x', 'x', 'x', 'x', 'C', 2023.0, 1, 0)" in row["msg"]
@@ -0,0 +1,61 @@
+# data_upload_service/tests/test_pipelines.py
+import json
+import sys
+
+import pytest
+
+from data_upload_service.app import config, pipelines
+from data_upload_service.app.loaders import file_key
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A pipeline directory of its own; registrations undone afterwards"""
+    monkeypatch.setattr(config, "PIPELINE_DIR", str(tmp_path))
+    monkeypatch.setattr(pipelines, "_registered", {})
+    pipelines.refresh()
+    yield tmp_path
+    pipelines.refresh()
+
+_SPEC = {
+    "label": "Stores",
+    "datasets": {"stores": {}, "visits": {}},
+    "rules": [
+        {"rule": "required_columns", "dataset": "stores", "required": ["Store"], "check": "stores"},
+        {"rule": "record_count", "dataset": "visits"},
+    ],
+    "columns": {"stores": {"columns": ["Store"]}},
+    "cost": 2,
+}
+
+def test_pipeline_from_config_dir(client, registry):
+    """A spec dropped in PIPELINE_DIR is a pipeline, compiled on first use"""
+    (registry / "stores.json").write_text(json.dumps(_SPEC))
+    assert "stores" in pipelines.pipeline_names()
+    assert "stores" not in pipelines._loaded
+
+    pipeline = pipelines.get_pipeline("stores")
+    assert pipeline.keys == ["stores", "visits"]
+    assert pipeline.cost == 2.0
+    assert pipeline.columns["stores"].resolve(["Store", "Other"])[0] == ["Store"]
+
+    data = {"stores": [{"Store": 1}], "visits": [{"Day": 1}]}
+    response = client.post("/api/v1/validate", json={"pipeline": "stores", "data": data})
+    assert response.json()["rows"] == [
+        {"check": "stores", "status": "success", "msg": "all required columns present", "column": None},
+        {"check": "records_count", "status": "success", "msg": "1 records", "column": None},
+    ]
+
+def test_registered_pipelines_load_lazily(registry):
+    pipelines.register("later", "data_upload_service.tests.not_a_module:PIPELINE")
+    assert "data_upload_service.tests.not_a_module" not in sys.modules
+    with pytest.raises(ModuleNotFoundError):
+        pipelines.get_pipeline("later")
+
+    pipelines.register("later", _SPEC)
+    assert file_key("later", 1, 2, {}) == "visits"
+    assert file_key("unknown", 0, 2, {}) == "data"
+
+def test_unknown_pipeline(registry):
+    with pytest.raises(ValueError, match="Unknown pipeline: nope"):
+        pipelines.get_pipeline("nope")
+    assert pipelines.pipeline_version("nope") == ""
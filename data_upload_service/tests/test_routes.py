@@ -1,5 +1,7 @@
 # data_upload_service/tests/test_routes.py
+import io
 import json
+import pandas as pd
 import pytest
 from fastapi import status
 
@@ -142,4 +144,652 @@ def test_missing_required_data(client):
     }
     
     response = client.post("/api/v1/validate", json=data)
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+# Chunked (streaming) validation tests
+def _post_files(client, pipeline, files, **data):
+    return client.post(
+        "/api/v1/validate/file",
+        files=files,
+        data={"pipeline": pipeline, **data}
+    )
+
+@pytest.mark.parametrize("pipeline,csv_data", [
+    ("category_forecasting", """Date,Market,Brand,Sales
+2023-01-01,US,A,1000
+2023-01-01,US,B,
+not a date,UK,A,1100
+2023-01-03,,B,900"""),
+    ("promo_intensity", """Date,Channel,Brand,PPG,SalesValue,Volume,Price
+2023-01-01,Retail,A,P1,100,10,
+2023-01-05,Retail,A,P1,120,12,x
+2022-12-30,,A,P1,90,9,10"""),
+])
+def test_chunked_file_matches_whole_file(client, pipeline, csv_data):
+    """Streaming a CSV in chunks gives the same report as loading it whole"""
+    whole = _post_files(client, pipeline, {"files": ("d.csv", csv_data.encode(), "text/csv")})
+    chunked = _post_files(
+        client, pipeline, {"files": ("d.csv", csv_data.encode(), "text/csv")}, chunksize="1"
+    )
+    assert whole.status_code == chunked.status_code == status.HTTP_200_OK
+    assert chunked.json() == whole.json()
+
+def _complete_mmm_csv(df):
+    """CSV bytes of an MMM sample with every required column present"""
+    df = df.copy()
+    for col in ["Channel", "Variant", "PackType", "PPG", "PackSize"]:
+        df[col] = "x"
+    return df.to_csv(index=False).encode()
+
+def test_chunked_mmm_files_match_whole_files(client, sample_mmm_media_data, sample_mmm_sales_data):
+    """MMM reports are identical with and without chunked reading"""
+    sales_data = sample_mmm_sales_data.assign(Month=[1, 2])
+    media, sales = _complete_mmm_csv(sample_mmm_media_data), _complete_mmm_csv(sales_data)
+    files = lambda: [
+        ("files", ("media.csv", media, "text/csv")),
+        ("files", ("sales.csv", sales, "text/csv")),
+    ]
+    whole = _post_files(client, "mmm", files())
+    chunked = _post_files(client, "mmm", files(), chunksize="1")
+    assert chunked.json() == whole.json()
+    check_names = [row["check"] for row in chunked.json()["rows"]]
+    assert "time_alignment" in check_names
+
+# Executor tests
+def test_process_executor_matches_thread_executor(client, sample_cf_csv, monkeypatch):
+    """Process-pool validation returns the same report as the thread pool"""
+    from data_upload_service.app import config, executor
+    files = {"files": ("d.csv", sample_cf_csv.getvalue(), "text/csv")}
+    in_thread = _post_files(client, "category_forecasting", files)
+
+    executor.shutdown_executor()
+    monkeypatch.setattr(config, "EXECUTOR", "process")
+    monkeypatch.setattr(config, "MAX_WORKERS", 1)
+    try:
+        in_process = _post_files(client, "category_forecasting", files)
+    finally:
+        executor.shutdown_executor()
+
+    assert in_process.status_code == status.HTTP_200_OK
+    assert in_process.json() == in_thread.json()
+
+def test_validation_timeout(client, sample_cf_data, monkeypatch):
+    """A validation exceeding the timeout is answered with 504"""
+    import time
+    from data_upload_service.app import config, validator_dispatcher
+    monkeypatch.setattr(config, "TIMEOUT_S", 0.05)
+    monkeypatch.setattr(validator_dispatcher, "dispatch_validation", lambda *a, **kw: time.sleep(0.5))
+    data = {"pipeline": "category_forecasting", "data": {"data": sample_cf_data.to_dict(orient="records")}}
+    response = client.post("/api/v1/validate", json=data)
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+# Spooled upload tests
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    """Spool every non-trivial upload to a temp dir owned by the test"""
+    from data_upload_service.app import config
+    monkeypatch.setattr(config, "SPOOL_THRESHOLD_BYTES", 16)
+    monkeypatch.setattr(config, "SPOOL_DIR", str(tmp_path))
+    return tmp_path
+
+def _xlsx_bytes(df):
+    import io
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+def test_spooled_uploads_match_in_memory(client, sample_cf_csv, sample_cf_data, monkeypatch, tmp_path):
+    """Memory-mapped parsing gives the same report as in-memory parsing"""
+    from data_upload_service.app import config
+    uploads = [
+        {"files": ("d.csv", sample_cf_csv.getvalue(), "text/csv")},
+        {"files": ("d.xlsx", _xlsx_bytes(sample_cf_data), "application/octet-stream")},
+    ]
+    in_memory = [_post_files(client, "category_forecasting", f).json() for f in uploads]
+
+    monkeypatch.setattr(config, "SPOOL_THRESHOLD_BYTES", 16)
+    monkeypatch.setattr(config, "SPOOL_DIR", str(tmp_path))
+    spooled = [_post_files(client, "category_forecasting", f).json() for f in uploads]
+    chunked = _post_files(client, "category_forecasting", uploads[0], chunksize="1").json()
+
+    assert spooled == in_memory
+    assert chunked == in_memory[0]
+    assert list(tmp_path.iterdir()) == []
+
+def test_sharded_csv_matches_whole_file(client, spool_dir, monkeypatch):
+    """Scanning a CSV in byte-range shards gives the whole-file report"""
+    import numpy as np
+    import pandas as pd
+    from data_upload_service.app import cache, config, executor
+    from data_upload_service.app.loaders import SpooledFile, csv_ranges
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Date": rng.choice(pd.date_range("2023-01-01", periods=40).strftime("%d/%m/%Y"), 300),
+        "Market": rng.choice(["US", "UK", None], 300),
+        "Brand": rng.choice(list("ABC"), 300),
+        "Sales": rng.random(300),
+    })
+    data = df.to_csv(index=False).encode()
+    files = {"files": ("d.csv", data, "text/csv")}
+    whole = _post_files(client, "category_forecasting", files).json()
+
+    path = spool_dir / "d.csv"
+    path.write_bytes(data)
+    ranges = csv_ranges(SpooledFile(str(path), len(data)), 1000)
+    assert len(ranges) > 2
+    assert b"".join(data[a:b] for a, b in ranges) == data[data.index(b"\n") + 1:]
+    assert all(data[a - 1:a] == b"\n" for a, _ in ranges)
+    path.unlink()
+
+    monkeypatch.setattr(cache, "_report_cache", None)
+    monkeypatch.setattr(config, "CSV_SHARD_MIN_BYTES", 1)
+    monkeypatch.setattr(config, "CSV_SHARD_BYTES", 1000)
+    monkeypatch.setattr(config, "CSV_SHARD_WORKERS", 2)
+    try:
+        sharded = _post_files(client, "category_forecasting", files).json()
+    finally:
+        executor.shutdown_executor()
+    assert sharded == whole
+
+def _pool_worker_state():
+    from data_upload_service.app import executor
+    return executor.in_pool_worker(), executor._shard_executor
+
+def test_process_workers_do_not_shard(client, spool_dir, sample_cf_csv, monkeypatch):
+    """Under the process executor, workers scan big CSVs whole"""
+    import asyncio
+    from data_upload_service.app import cache, config, executor
+    files = {"files": ("d.csv", sample_cf_csv.getvalue(), "text/csv")}
+    whole = _post_files(client, "category_forecasting", files).json()
+
+    executor.shutdown_executor()
+    monkeypatch.setattr(cache, "_report_cache", None)
+    monkeypatch.setattr(config, "EXECUTOR", "process")
+    monkeypatch.setattr(config, "MAX_WORKERS", 1)
+    monkeypatch.setattr(config, "CSV_SHARD_MIN_BYTES", 1)
+    monkeypatch.setattr(config, "CSV_SHARD_BYTES", 16)
+    try:
+        in_process = _post_files(client, "category_forecasting", files).json()
+        state = asyncio.run(executor.run_within(10, _pool_worker_state))
+    finally:
+        executor.shutdown_executor()
+    assert in_process == whole
+    assert state == (True, None)
+    assert not executor.in_pool_worker()
+
+def test_spooled_upload_removed_on_failure(client, spool_dir):
+    """Temp files are removed when parsing fails"""
+    response = _post_files(
+        client, "category_forecasting",
+        {"files": ("broken.xlsx", b"definitely not a workbook", "application/octet-stream")}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert list(spool_dir.iterdir()) == []
+
+# Column projection tests
+@pytest.mark.parametrize("pipeline,csv_data", [
+    ("category_forecasting", """Date,Market,Brand,Sales
+2023-01-01,US,A,
+2023-01-02,US,A,5"""),
+    ("promo_intensity", """Date,Channel,Brand,PPG,SalesValue,Volume,Extra
+2023-01-01,Retail,A,P1,100,10,
+2023-01-02,Retail,A,P1,120,12,x"""),
+])
+def test_nulls_outside_the_plan_match_json(client, pipeline, csv_data):
+    """Columns no check names still count in the missing check, as in /validate"""
+    df = pd.read_csv(io.StringIO(csv_data))
+    records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    json_rows = client.post("/api/v1/validate", json={"pipeline": pipeline, "data": {"data": records}}).json()["rows"]
+    file_rows = _post_files(client, pipeline, {"files": ("d.csv", csv_data.encode(), "text/csv")}).json()["rows"]
+    assert file_rows == json_rows
+    assert [r for r in file_rows if r["check"] == "missing"] == [{
+        "check": "missing", "status": "success_with_warning", "msg": "1 missing (50.00%)",
+        "column": "Sales" if pipeline == "category_forecasting" else "Extra",
+    }]
+
+def test_unplanned_columns_keep_planned_dtypes(client):
+    """Planned columns are still matched and typed when every column is read"""
+    csv_data = """date, brand ,Unrelated Metric,promo_flag,Channel,PPG,SalesValue,Volume
+2023-01-01,A,,1,Retail,P1,100,10
+2023-01-02,B,,0,Retail,P1,120,12"""
+    cf = _post_files(client, "category_forecasting", {"files": ("d.csv", csv_data.encode(), "text/csv")})
+    rows = cf.json()["rows"]
+    assert {"check": "dimension_check", "status": "success", "msg": "found Channel, Brand, PPG", "column": None} in rows
+    assert {"check": "missing", "status": "success_with_warning", "msg": "2 missing (100.00%)", "column": "Unrelated Metric"} in rows
+
+    pi = _post_files(client, "promo_intensity", {"files": ("d.csv", csv_data.encode(), "text/csv")})
+    rows = {r["check"]: r for r in pi.json()["rows"]}
+    assert rows["promotion_indicator"]["status"] == "success"
+
+# Header pre-flight tests
+def test_preflight_rejects_missing_columns_before_parsing(client, monkeypatch):
+    """Structural failures are reported from the header alone"""
+    from data_upload_service.app import validator_dispatcher
+    def _no_parse(*args, **kwargs):
+        raise AssertionError("data should not be parsed")
+    monkeypatch.setattr(validator_dispatcher, "read_upload", _no_parse)
+
+    csv_data = b"Market,Brand,Sales\nUS,A,1\n"
+    cf = _post_files(client, "category_forecasting", {"files": ("d.csv", csv_data, "text/csv")})
+    assert cf.status_code == status.HTTP_200_OK
+    assert cf.json()["ok"] is False
+    assert {"check": "date_column", "status": "fail", "msg": "'Date' not found", "column": None} in cf.json()["rows"]
+
+    pi = _post_files(client, "promo_intensity", {"files": ("d.csv", csv_data, "text/csv")})
+    assert [r["status"] for r in pi.json()["rows"] if r["check"] == "required_cols"] == ["fail"]
+
+def test_mmm_preflight_failure_matches_full_validation(client, sample_mmm_media_csv, sample_mmm_sales_csv):
+    """Pre-flight reports the same required-column failures as the full run"""
+    files = [
+        ("files", ("media.csv", sample_mmm_media_csv, "text/csv")),
+        ("files", ("sales.csv", sample_mmm_sales_csv, "text/csv")),
+    ]
+    rows = _post_files(client, "mmm", files).json()["rows"]
+    assert [(r["check"], r["status"]) for r in rows] == [
+        ("section", "success"), ("required_media", "fail"), ("time_coverage_media", "skipped"),
+        ("section", "success"), ("required_sales", "fail"), ("time_coverage_sales", "skipped"),
+        ("time_alignment", "skipped"), ("key_alignment", "skipped"),
+    ]
+
+def test_fail_fast(client, sample_mmm_media_csv, sample_mmm_sales_csv):
+    """With fail_fast the report ends at the first failed check"""
+    files = [
+        ("files", ("media.csv", sample_mmm_media_csv, "text/csv")),
+        ("files", ("sales.csv", sample_mmm_sales_csv, "text/csv")),
+    ]
+    rows = _post_files(client, "mmm", files, fail_fast="true").json()["rows"]
+    assert [(r["check"], r["status"]) for r in rows] == [
+        ("section", "success"), ("required_media", "fail"),
+    ]
+
+# Streaming Excel tests
+def _workbook_bytes(sheets):
+    import io
+    import pandas as pd
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return buf.getvalue()
+
+def test_xlsx_sheet_selection_and_chunking(client, sample_cf_data, sample_pi_data):
+    """Any worksheet can be validated; chunk size does not change the report"""
+    content = _workbook_bytes({"notes": sample_pi_data, "cf": sample_cf_data})
+    files = {"files": ("d.xlsx", content, "application/octet-stream")}
+
+    by_name = _post_files(client, "category_forecasting", files, sheet="cf").json()
+    by_index = _post_files(client, "category_forecasting", files, sheet="1").json()
+    chunked = _post_files(client, "category_forecasting", files, sheet="cf", chunksize="1").json()
+    assert by_name == by_index == chunked
+    assert {"check": "records_count", "status": "success", "msg": "2 records", "column": None} in by_name["rows"]
+
+    first = _post_files(client, "promo_intensity", files).json()
+    assert [r["status"] for r in first["rows"] if r["check"] == "required_cols"] == ["success"]
+
+    missing = _post_files(client, "category_forecasting", files, sheet="nope")
+    assert missing.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_xlsx_blank_rows_count_like_read_excel():
+    """Interior blank rows are kept as empty rows; trailing ones are not"""
+    import io
+    import pandas as pd
+    from openpyxl import Workbook
+    from data_upload_service.app.loaders import iter_xlsx
+    wb = Workbook()
+    for row in (["Date", "Sales"], ["2023-01-01", 1], [None, None], [], ["2023-01-03", 3], [None, None]):
+        wb.active.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    expected = pd.read_excel(io.BytesIO(buf.getvalue()))
+    chunks = list(iter_xlsx(io.BytesIO(buf.getvalue()), chunksize=2))
+    got = pd.concat(chunks, ignore_index=True)
+    assert len(got) == len(expected) == 4
+    assert got["Sales"].isna().tolist() == expected["Sales"].isna().tolist()
+
+# Parse cache tests
+def test_repeat_xlsx_upload_skips_parsing(client, sample_cf_data, monkeypatch):
+    """An identical workbook is served from the parse cache"""
+    from data_upload_service.app import loaders
+    files = {"files": ("d.xlsx", _xlsx_bytes(sample_cf_data), "application/octet-stream")}
+
+    first = _post_files(client, "category_forecasting", files)
+
+    def _no_parse(*args, **kwargs):
+        raise AssertionError("workbook should not be parsed again")
+    monkeypatch.setattr(loaders, "iter_xlsx", _no_parse)
+    second = _post_files(client, "category_forecasting", files)
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.json() == first.json()
+
+def test_repeat_upload_served_from_report_cache(client, sample_cf_csv, monkeypatch):
+    """An identical upload is answered from the report cache"""
+    from data_upload_service.app import validator_dispatcher
+    content = sample_cf_csv.getvalue()
+    first = _post_files(client, "category_forecasting", {"files": ("f.csv", content, "text/csv")})
+    assert first.status_code == status.HTTP_200_OK
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError("validated again")
+    monkeypatch.setattr(validator_dispatcher, "dispatch_validation", _unexpected)
+    second = _post_files(client, "category_forecasting", {"files": ("f.csv", content, "text/csv")})
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.json() == first.json()
+    stats = client.get("/api/v1/cache/stats").json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_concurrent_identical_uploads_share_one_validation(sample_cf_csv, monkeypatch):
+    """Identical uploads in flight together are validated once"""
+    import asyncio
+    import threading
+    import time
+    import httpx
+    from data_upload_service.app import validator_dispatcher
+    from data_upload_service.app.main import app
+    from data_upload_service.app.validators.base import ValidationReport
+    calls = []
+
+    def _slow(*args, **kwargs):
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return ValidationReport()
+    monkeypatch.setattr(validator_dispatcher, "dispatch_validation", _slow)
+    content = sample_cf_csv.getvalue()
+
+    async def _post_all():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as ac:
+            return await asyncio.gather(*[
+                ac.post(
+                    "/api/v1/validate/file",
+                    files={"files": ("f.csv", content, "text/csv")},
+                    data={"pipeline": "category_forecasting"},
+                )
+                for _ in range(4)
+            ])
+
+    responses = asyncio.run(_post_all())
+    assert [r.status_code for r in responses] == [status.HTTP_200_OK] * 4
+    assert len({r.text for r in responses}) == 1
+    assert len(calls) == 1
+
+def test_cancelled_leader_keeps_shared_uploads(sample_cf_csv, spool_dir, monkeypatch):
+    """A request whose upload feeds a shared run can go away before it starts"""
+    import asyncio
+    import io
+    import time
+    from starlette.datastructures import UploadFile
+    from data_upload_service.app import cache, config, executor, routes
+    monkeypatch.setattr(cache, "_report_cache", None)
+    monkeypatch.setattr(config, "MAX_CONCURRENCY", 1)
+    content = sample_cf_csv.getvalue()
+
+    def _request():
+        upload = UploadFile(file=io.BytesIO(content), filename="f.csv")
+        return asyncio.ensure_future(routes.validate_file(
+            pipeline="category_forecasting", files=[upload], file_keys=None,
+            chunksize=None, sheet=None, fail_fast=False,
+        ))
+
+    async def _run():
+        busy = asyncio.ensure_future(executor.run_within(10, time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        leader = _request()
+        await asyncio.sleep(0.05)
+        follower = _request()
+        await asyncio.sleep(0.05)
+        leader.cancel()  # its client went away while the run was queued
+        report = await follower
+        await busy
+        await asyncio.sleep(0.05)
+        return report
+
+    assert asyncio.run(_run()).ok
+    assert list(spool_dir.iterdir()) == []
+
+# Streaming tests
+def _events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_stream_matches_report(client, sample_cf_csv):
+    """The streamed rows are the report /validate/file returns, header checks first"""
+    files = {"files": ("f.csv", sample_cf_csv.getvalue(), "text/csv")}
+    data = {"pipeline": "category_forecasting", "chunksize": "1"}
+    streamed = client.post("/api/v1/validate/file/stream", files=files, data=data)
+    report = client.post("/api/v1/validate/file", files=files, data=data).json()
+
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    events = _events(streamed)
+    rows = [{k: v for k, v in e.items() if k != "event"} for e in events if e["event"] == "row"]
+    assert sorted(map(json.dumps, rows)) == sorted(map(json.dumps, report["rows"]))
+    assert rows[0]["check"] == "dimension_check"
+    progress = [e for e in events if e["event"] == "progress"]
+    assert progress and progress[-1]["rows"] == 2
+    assert progress[-1]["bytes_read"] == progress[-1]["total_bytes"]
+    assert events[-1] == {"event": "done", "ok": report["ok"], "stopped": False}
+
+def test_stream_stops_on_first_failure(client):
+    """With stop_on_fail the stream ends at the first failed check"""
+    csv = b"Date,Market,Brand,Sales\nnot-a-date,US,B,1\n"
+    response = client.post(
+        "/api/v1/validate/file/stream",
+        files={"files": ("f.csv", csv, "text/csv")},
+        data={"pipeline": "category_forecasting", "stop_on_fail": "true"},
+    )
+    events = _events(response)
+    rows = [e for e in events if e["event"] == "row"]
+    assert rows[-1]["status"] == "fail"
+    assert all(r["status"] != "fail" for r in rows[:-1])
+    assert events[-1] == {"event": "done", "ok": False, "stopped": True}
+
+def test_stream_as_server_sent_events(client, sample_cf_csv):
+    """Clients accepting text/event-stream get SSE framing"""
+    response = client.post(
+        "/api/v1/validate/file/stream",
+        files={"files": ("f.csv", sample_cf_csv.getvalue(), "text/csv")},
+        data={"pipeline": "unknown"},
+        headers={"Accept": "text/event-stream"},
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.endswith('event: error\ndata: {"detail": "Unknown pipeline: unknown"}\n\n')
+
+def test_sample_mode_on_a_small_upload_is_exact(client, sample_cf_data, sample_cf_csv):
+    """A sample holding every row reports exact figures"""
+    response = client.post("/api/v1/validate", json={
+        "pipeline": "category_forecasting",
+        "mode": "sample",
+        "data": {"data": sample_cf_data.to_dict(orient="records")},
+    })
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    rows = {row["check"]: row for row in result["rows"]}
+    assert rows["sample"]["status"] == "success"
+    assert rows["records_count"]["msg"] == "2 records"
+    assert rows["duplicate_rate"]["msg"] == "0 duplicate rows (0.00%)"
+    assert result["estimates"] == [
+        {"check": "coercion_rate", "column": "Date", "estimate": 0.0, "low": 0.0, "high": 0.0},
+        {"check": "duplicate_rate", "column": None, "estimate": 0.0, "low": 0.0, "high": 0.0},
+    ]
+
+    response = _post_files(
+        client, "category_forecasting",
+        {"files": ("sample.csv", sample_cf_csv, "text/csv")}, mode="sample",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert {row["check"]: row for row in response.json()["rows"]}["sample"]["status"] == "success"
+
+def test_sample_mode_estimates_with_intervals(client, monkeypatch):
+    from data_upload_service.app import config
+    monkeypatch.setattr(config, "SAMPLE_ROWS", 50)
+    lines = ["Date,Market,Brand,Sales"] + [
+        f"2023-01-{d % 28 + 1:02d},{'' if d % 5 == 0 else 'US'},B{d % 7},{d}" for d in range(1000)
+    ]
+    response = _post_files(
+        client, "category_forecasting",
+        {"files": ("big.csv", "\n".join(lines).encode(), "text/csv")}, mode="sample",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    rows = {row["check"]: row for row in result["rows"]}
+    assert rows["sample"]["status"] == "success_with_warning"
+    assert rows["records_count"]["msg"].endswith("records (estimated)")
+    (missing,) = [e for e in result["estimates"] if e["check"] == "missing_rate"]
+    assert missing["column"] == "Market"
+    assert missing["low"] <= missing["estimate"] <= missing["high"]
+    assert missing["low"] < 0.2 < missing["high"]
+
+def test_sample_size_is_part_of_the_cache_key(client, sample_cf_data, monkeypatch):
+    """Sampled reports are only reused for the same sample size"""
+    from data_upload_service.app import config
+    body = {
+        "pipeline": "category_forecasting",
+        "mode": "sample",
+        "data": {"data": sample_cf_data.to_dict(orient="records")},
+    }
+    assert client.post("/api/v1/validate", json=body).status_code == status.HTTP_200_OK
+    monkeypatch.setattr(config, "SAMPLE_ROWS", 5)
+    assert client.post("/api/v1/validate", json=body).status_code == status.HTTP_200_OK
+    assert client.post("/api/v1/validate", json=body).status_code == status.HTTP_200_OK
+
+    stats = client.get("/api/v1/cache/stats").json()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+def test_unknown_mode_is_rejected(client, sample_cf_data):
+    response = client.post("/api/v1/validate", json={
+        "pipeline": "category_forecasting",
+        "mode": "guess",
+        "data": {"data": sample_cf_data.to_dict(orient="records")},
+    })
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+# Columnar and NDJSON payload tests
+def _post_ndjson(client, body, **params):
+    return client.post(
+        "/api/v1/validate",
+        params=params,
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+def test_columnar_and_ndjson_payloads_match_records(client, sample_cf_data):
+    records = sample_cf_data.to_dict(orient="records")
+    # a Sales value no Arrow column can hold next to numbers: read by pandas
+    dirty = [*records, {**records[0], "Sales": "n/a"}]
+    for data in (records, dirty):
+        frame = pd.DataFrame(data)
+        expected = client.post("/api/v1/validate", json={
+            "pipeline": "category_forecasting", "data": {"data": data},
+        }).json()
+        columnar = client.post("/api/v1/validate", json={
+            "pipeline": "category_forecasting",
+            "data": {"data": {"columns": frame.to_dict(orient="list")}},
+        })
+        ndjson = _post_ndjson(
+            client, "\n".join(json.dumps(r) for r in data), pipeline="category_forecasting"
+        )
+        assert columnar.status_code == ndjson.status_code == status.HTTP_200_OK
+        assert columnar.json() == expected
+        assert ndjson.json() == expected
+
+def test_large_ndjson_body_is_spooled_and_released(client, sample_cf_data, spool_dir):
+    body = sample_cf_data.to_json(orient="records", lines=True)
+    response = _post_ndjson(client, body, pipeline="category_forecasting", mode="sample")
+    assert response.status_code == status.HTTP_200_OK
+    assert {row["check"]: row for row in response.json()["rows"]}["records_count"]["msg"] == "2 records"
+    assert list(spool_dir.iterdir()) == []
+
+def test_bad_payloads_are_rejected(client, sample_cf_data):
+    response = client.post("/api/v1/validate", json={
+        "pipeline": "category_forecasting",
+        "data": {"data": {"columns": {"Date": ["2023-01-01"], "Sales": [1, 2]}}},
+    })
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/api/v1/validate", json={"pipeline": "category_forecasting"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["loc"] == ["body", "data"]
+    response = _post_ndjson(client, sample_cf_data.to_json(orient="records", lines=True))
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["loc"] == ["query", "pipeline"]
+
+def test_json_body_is_parsed_on_the_executor(client, sample_cf_data, monkeypatch):
+    """Large JSON bodies are decoded off the event loop, like NDJSON ones"""
+    import threading
+    from data_upload_service.app import routes, validator_dispatcher
+    threads = []
+    def _parse(body):
+        threads.append(threading.current_thread().name)
+        return validator_dispatcher.parse_records(body)
+    monkeypatch.setattr(routes, "parse_records", _parse)
+    response = client.post("/api/v1/validate", json={
+        "pipeline": "category_forecasting", "data": {"data": sample_cf_data.to_dict(orient="records")},
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert len(threads) == 1 and threads[0].startswith("validation")
+
+# Parquet and Arrow IPC upload tests
+def _columnar_files(df):
+    """The frame as Parquet (row groups of 3 rows) and as Arrow IPC file and stream"""
+    import io
+    import pyarrow as pa
+    buf = io.BytesIO()
+    df.to_parquet(buf, row_group_size=3)
+    files = {"d.parquet": buf.getvalue()}
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name, new in (("d.arrow", pa.ipc.new_file), ("d.arrows", pa.ipc.new_stream)):
+        buf = io.BytesIO()
+        with new(buf, table.schema) as writer:
+            writer.write_table(table, max_chunksize=4)
+        files[name] = buf.getvalue()
+    return files
+
+def _pi_frame():
+    return pd.DataFrame({
+        "Date": pd.date_range("2023-01-01", periods=10, freq="W"),
+        "Channel": ["Retail", None] * 5,
+        "Brand": ["TechBrand"] * 10,
+        "PPG": ["Product1", "Product2"] * 5,
+        "SalesValue": [1000.0, None] + [1100.0] * 8,
+        "Volume": range(10),
+        "Price": [10.0] * 10,
+    })
+
+@pytest.mark.parametrize("pipeline,frame", [
+    ("category_forecasting", lambda: pd.DataFrame({
+        "Date": pd.to_datetime(["2023-01-01", "2023-02-01", None, "2023-04-01"] * 3),
+        "Market": ["US", "US", "UK", None] * 3,
+        "Brand": ["TechBrand"] * 12,
+        "Sales": [1000, 1200, 900, 1100] * 3,
+    })),
+    ("promo_intensity", _pi_frame),
+])
+def test_columnar_uploads_match_csv(client, spool_dir, pipeline, frame):
+    """Parquet and Arrow uploads – spooled, so memory-mapped – report as their CSV does"""
+    df = frame()
+    expected = _post_files(
+        client, pipeline, {"files": ("d.csv", df.to_csv(index=False).encode(), "text/csv")}
+    ).json()
+    for name, data in _columnar_files(df).items():
+        for options in ({}, {"chunksize": "2"}):
+            response = _post_files(client, pipeline, {"files": (name, data)}, **options)
+            assert response.status_code == status.HTTP_200_OK, name
+            assert response.json() == expected, name
+    assert list(spool_dir.iterdir()) == []
+
+def test_parquet_statistics_answer_without_a_scan(client, monkeypatch):
+    """Row counts, nulls, dtypes and the date range come from Parquet metadata"""
+    from data_upload_service.app.loaders import ArrowUpload
+    reads = []
+    frames = ArrowUpload.frames
+    def _frames(self, columns=None, dtype=None, chunksize=None):
+        reads.append(chunksize)
+        return frames(self, columns, dtype, chunksize)
+    monkeypatch.setattr(ArrowUpload, "frames", _frames)
+
+    data = _columnar_files(_pi_frame())["d.parquet"]
+    rows = _post_files(client, "promo_intensity", {"files": ("d.parquet", data)}).json()["rows"]
+    rows = {(row["check"], row["column"]): row for row in rows}
+    assert rows[("records_count", None)]["msg"] == "10 records"
+    assert rows[("missing", "SalesValue")]["msg"] == "1 missing (10.00%)"
+    assert rows[("date_range", None)]["msg"] == "from 2023-01-01 to 2023-03-05 (64 days)"
+    # only the head of the file was read
+    assert len(reads) == 1
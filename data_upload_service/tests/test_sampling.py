@@ -0,0 +1,65 @@
+# data_upload_service/tests/test_sampling.py
+import io
+
+import numpy as np
+import pandas as pd
+
+from data_upload_service.app import config
+from data_upload_service.app.loaders import Upload, sample_csv
+from data_upload_service.app.validator_dispatcher import dispatch_uploads
+from data_upload_service.app.validators.sampling import reservoir, wilson
+
+def _rows(rep, check):
+    return [r for r in rep.rows() if r["check"] == check]
+
+def _csv(n, seed=1):
+    """Category forecasting rows, ~10% of them missing their Market"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Date": pd.date_range("2020-01-01", periods=n, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "Market": np.where(rng.random(n) < 0.1, "", "US"),
+        "Brand": rng.choice(["A", "B", "C"], n),
+        "Sales": rng.integers(0, 1000, n),
+    })
+    return df, df.to_csv(index=False).encode()
+
+def test_reservoir_is_uniform_and_keeps_categoricals():
+    df = pd.DataFrame({"i": np.arange(1000), "c": pd.Categorical(["x", "y"] * 500)})
+    chunks = lambda: (df.iloc[i:i + 64].copy() for i in range(0, len(df), 64))
+    means = []
+    for seed in range(200):
+        sample = reservoir(chunks(), 50, seed)
+        assert sample.total == 1000 and sample.exact and not sample.complete
+        assert len(sample.frame) == 50 and sample.frame["i"].is_unique
+        assert isinstance(sample.frame["c"].dtype, pd.CategoricalDtype)
+        means.append(sample.frame["i"].mean())
+    # the mean of 50 of 0..999 has sd ~40; of 200 such means, ~3
+    assert abs(np.mean(means) - 499.5) < 12
+    assert reservoir(chunks(), 5000).complete
+
+def test_wilson_narrows_to_the_rate_on_the_whole_population():
+    low, high = wilson(10, 100)
+    assert low < 0.1 < high
+    narrower = wilson(10, 100, total=200)
+    assert low < narrower[0] < narrower[1] < high
+    assert wilson(10, 100, total=100) == (0.1, 0.1)
+
+def test_small_csv_sample_is_exact():
+    df, data = _csv(300)
+    sample = sample_csv(data, 1000, header=list(df.columns))
+    assert sample.complete and sample.total == 300
+    assert len(sample.frame) == 300
+
+def test_csv_sample_estimates_cover_the_true_rates(monkeypatch):
+    monkeypatch.setattr(config, "SAMPLE_ROWS", 2000)
+    df, data = _csv(60_000)
+    upload = Upload("big.csv", data, "big")
+    rep = dispatch_uploads("category_forecasting", {"data": upload}, mode="sample")
+    assert _rows(rep, "sample")[0]["status"] == "success_with_warning"
+    count = _rows(rep, "records_count")[0]["msg"]
+    assert count.startswith("~") and abs(int(count[1:].split()[0]) - 60_000) < 3000
+    (missing,) = _rows(rep, "missing_rate")
+    truth = (df["Market"] == "").mean()
+    assert missing["column"] == "Market"
+    assert missing["interval"]["low"] < truth < missing["interval"]["high"]
+    assert "95% CI" in missing["msg"]
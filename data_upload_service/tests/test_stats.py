@@ -0,0 +1,149 @@
+# data_upload_service/tests/test_stats.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_upload_service.app.validators.base import (
+    DateStats, FrameStats, ValidationReport, check_missing, infer_date_format,
+    parse_dates,
+)
+
+_FULL = ("distinct", "range")
+
+def _frame(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "brand": rng.choice(["A", "B", "C", None], n),
+        "spend": np.where(rng.random(n) < 0.1, np.nan, rng.random(n) * 100),
+        "date": pd.date_range("2023-01-01", periods=n, freq="D"),
+        "flag": rng.random(n) < 0.5,
+    })
+
+def test_chunked_profile_matches_whole_frame():
+    """Profiling row chunks gives the numbers of the whole frame"""
+    df = _frame()
+    whole = FrameStats.of(df, *_FULL)
+    chunked = FrameStats(*_FULL)
+    for start in range(0, len(df), 128):
+        chunked.update(df.iloc[start:start + 128])
+
+    assert chunked.n_rows == whole.n_rows == len(df)
+    pd.testing.assert_series_equal(chunked.null_counts, whole.null_counts)
+    pd.testing.assert_series_equal(chunked.distinct, whole.distinct)
+    pd.testing.assert_series_equal(chunked.minimum, whole.minimum)
+    assert chunked.dtypes == whole.dtypes
+
+def test_merged_shard_profiles_match_whole_frame():
+    """Profiles of consecutive shards merge into the whole frame's"""
+    df = _frame()
+    whole = FrameStats.of(df, *_FULL)
+    merged = FrameStats(*_FULL)
+    for start in range(0, len(df), 300):
+        merged.merge(FrameStats.of(df.iloc[start:start + 300], *_FULL))
+
+    assert merged.n_rows == whole.n_rows
+    pd.testing.assert_series_equal(merged.null_counts, whole.null_counts)
+    pd.testing.assert_series_equal(merged.distinct, whole.distinct)
+    pd.testing.assert_series_equal(merged.maximum, whole.maximum)
+    assert merged.dtypes == whole.dtypes
+
+def test_profile_values():
+    """Null counts, min/max and distinct estimates match pandas"""
+    df = _frame()
+    stats = FrameStats.of(df, *_FULL)
+
+    assert stats.null_counts.to_dict() == df.isna().sum().to_dict()
+    assert stats.minimum["spend"] == df["spend"].min()
+    assert stats.maximum["id"] == len(df) - 1
+    assert stats.minimum["date"] == pd.Timestamp("2023-01-01")
+    assert stats.minimum["brand"] is None and stats.minimum["flag"] is None
+    assert stats.distinct["brand"] == 3
+    assert stats.distinct["flag"] == 2
+    for col in ("id", "spend", "date"):
+        assert abs(stats.distinct[col] - df[col].nunique()) <= 0.1 * df[col].nunique()
+
+def test_default_profile_counts_nulls_only():
+    """Without opting in, distinct counts and min/max are not computed"""
+    df = _frame()
+    stats = FrameStats()
+    for start in range(0, len(df), 128):
+        stats.update(df.iloc[start:start + 128])
+
+    assert stats.null_counts.to_dict() == df.isna().sum().to_dict()
+    assert stats.dtypes == FrameStats.of(df, *_FULL).dtypes
+    with pytest.raises(ValueError, match="'distinct' was not profiled"):
+        stats.distinct
+    with pytest.raises(ValueError, match="'range' was not profiled"):
+        stats.maximum
+
+def test_dtypes_merge_across_chunks():
+    """A column that turns float in a later chunk is profiled as float"""
+    stats = FrameStats(*_FULL)
+    stats.update(pd.DataFrame({"x": [1, 2], "y": ["a", "b"]}))
+    stats.update(pd.DataFrame({"x": [np.nan, 4.5], "y": [1, 2]}))
+    assert str(stats.dtypes["x"]) == "float64"
+    assert str(stats.dtypes["y"]) == "object"
+    assert stats.maximum["x"] == 4.5
+    assert stats.null_counts["x"] == 1
+
+def test_categorical_chunks_profile_like_strings():
+    """Hierarchy columns loaded as categoricals count like their labels"""
+    df = _frame()
+    plain = FrameStats.of(df, *_FULL)
+    chunked = FrameStats(*_FULL)
+    for start in range(0, len(df), 128):
+        chunk = df.iloc[start:start + 128].astype({"brand": "category"})
+        chunked.update(chunk)
+
+    pd.testing.assert_series_equal(chunked.null_counts, plain.null_counts)
+    pd.testing.assert_series_equal(chunked.distinct, plain.distinct)
+    assert chunked.dtypes["brand"] == df["brand"].astype("category").dtype
+
+def test_check_missing_on_wide_frame():
+    """Only the columns with nulls are reported, in column order"""
+    df = pd.DataFrame(np.ones((10, 500)), columns=[f"c{i}" for i in range(500)])
+    df.iloc[:3, 7] = np.nan
+    df.iloc[:1, 400] = np.nan
+    rep = ValidationReport()
+    check_missing(FrameStats.of(df), rep, critical=["c400"])
+    assert rep.rows() == [
+        {"check": "missing", "status": "success_with_warning", "msg": "3 missing (30.00%)", "column": "c7"},
+        {"check": "missing", "status": "fail", "msg": "1 missing (10.00%)", "column": "c400"},
+    ]
+
+def test_report_prints_every_status():
+    rep = ValidationReport()
+    rep.pass_("a")
+    rep.warn("b", "careful", column="x")
+    rep.fail("c", "broken")
+    rep.skip("d", "c failed")
+    assert str(rep).splitlines() == [
+        "✅ a", "⚠️ b (x): careful", "❌ c: broken", "⏭️ d: c failed", "— ✖︎ FAIL —",
+    ]
+
+def test_frame_without_columns():
+    """A frame with no columns profiles as empty"""
+    stats = FrameStats.of(pd.DataFrame())
+    assert stats.empty
+    assert stats.columns == []
+
+def test_date_format_inference():
+    assert infer_date_format(["2023-01-31", "2023-02-01T10:00"]) == ("ISO8601", False)
+    assert infer_date_format(["31/01/2023", "01/02/2023"]) == ("%d/%m/%Y", False)
+    assert infer_date_format(["01/02/2023", "02/03/2023"]) == ("%m/%d/%Y", True)
+    assert infer_date_format(["01/02/2023", "not a date"]) == (None, False)
+
+def test_parse_dates_maps_unique_values():
+    values = pd.Series(["31/01/2023", None, "01/02/2023", "31/01/2023", "junk"], index=list("abcde"))
+    parsed = parse_dates(values, "%d/%m/%Y")
+    expected = pd.to_datetime(values, format="%d/%m/%Y", errors="coerce")
+    pd.testing.assert_series_equal(parsed, expected)
+
+def test_format_is_kept_across_chunks():
+    """Later chunks are parsed with the format inferred from the first"""
+    dates = DateStats()
+    dates.update(pd.Series(["01/02/2023", "03/04/2023"]))
+    assert (dates.format, dates.ambiguous) == ("%m/%d/%Y", True)
+    dates.update(pd.Series(["25/12/2023"]))
+    assert (dates.n_rows, dates.n_valid) == (3, 2)